@@ -0,0 +1,106 @@
+"""Add display_flags and api_signature to user_weather_settings
+
+Revision ID: 3c1f8e2a9b47
+Revises: 6d9475ed2ff6
+Create Date: 2026-10-19 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f8e2a9b47'
+down_revision: Union[str, Sequence[str], None] = '6d9475ed2ff6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DISPLAY_FLAGS_SQL = (
+    '(CASE WHEN show_temperature THEN 1 ELSE 0 END) | '
+    '(CASE WHEN show_feels_like THEN 2 ELSE 0 END) | '
+    '(CASE WHEN show_humidity THEN 4 ELSE 0 END) | '
+    '(CASE WHEN show_pressure THEN 8 ELSE 0 END) | '
+    '(CASE WHEN show_wind THEN 16 ELSE 0 END) | '
+    '(CASE WHEN show_precipitation THEN 32 ELSE 0 END) | '
+    '(CASE WHEN show_precipitation_probability THEN 64 ELSE 0 END) | '
+    '(CASE WHEN show_cloud_cover THEN 128 ELSE 0 END) | '
+    '(CASE WHEN show_uv_index THEN 256 ELSE 0 END) | '
+    '(CASE WHEN show_visibility THEN 512 ELSE 0 END) | '
+    '(CASE WHEN show_dew_point THEN 1024 ELSE 0 END) | '
+    '(CASE WHEN show_solar_radiation THEN 2048 ELSE 0 END) | '
+    '(CASE WHEN show_daily_temperature THEN 4096 ELSE 0 END) | '
+    '(CASE WHEN show_daily_precipitation THEN 8192 ELSE 0 END) | '
+    '(CASE WHEN show_daily_wind THEN 16384 ELSE 0 END) | '
+    '(CASE WHEN show_sunrise_sunset THEN 32768 ELSE 0 END) | '
+    '(CASE WHEN show_daylight_duration THEN 65536 ELSE 0 END) | '
+    '(CASE WHEN show_sunshine_duration THEN 131072 ELSE 0 END) | '
+    '(CASE WHEN show_daily_uv THEN 262144 ELSE 0 END) | '
+    '(CASE WHEN show_current_weather THEN 524288 ELSE 0 END)'
+)
+
+API_SIGNATURE_SQL = (
+    "rtrim((CASE WHEN show_temperature THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN show_humidity THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN show_dew_point THEN 'dew_point_2m,' ELSE '' END) || "
+    "(CASE WHEN show_feels_like THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN show_pressure THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN show_cloud_cover THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_direction_10m,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_gusts_10m,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'shortwave_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'direct_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'diffuse_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation_probability THEN 'precipitation_probability,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'rain,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'showers,' ELSE '' END) || "
+    "'weather_code,' || "
+    "(CASE WHEN show_visibility THEN 'visibility,' ELSE '' END) || "
+    "(CASE WHEN show_uv_index THEN 'uv_index,' ELSE '' END) || "
+    "'is_day,', ',') || "
+    "'|' || "
+    "rtrim('weather_code,' || "
+    "(CASE WHEN show_daily_temperature THEN 'temperature_2m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'temperature_2m_min,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'apparent_temperature_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'apparent_temperature_min,' ELSE '' END) || "
+    "(CASE WHEN show_sunrise_sunset THEN 'sunrise,' ELSE '' END) || "
+    "(CASE WHEN show_sunrise_sunset THEN 'sunset,' ELSE '' END) || "
+    "(CASE WHEN show_daylight_duration THEN 'daylight_duration,' ELSE '' END) || "
+    "(CASE WHEN show_sunshine_duration THEN 'sunshine_duration,' ELSE '' END) || "
+    "(CASE WHEN show_daily_uv THEN 'uv_index_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_uv THEN 'uv_index_clear_sky_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_sum,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_hours,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_probability_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_speed_10m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_gusts_10m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_direction_10m_dominant,' ELSE '' END), ',') || "
+    "'|' || "
+    "rtrim((CASE WHEN show_current_weather THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'is_day,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'weather_code,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'wind_direction_10m,' ELSE '' END), ',')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_weather_settings', sa.Column('display_flags', sa.Integer(), sa.Computed(DISPLAY_FLAGS_SQL, persisted=True), nullable=True))
+    op.add_column('user_weather_settings', sa.Column('api_signature', sa.Text(), sa.Computed(API_SIGNATURE_SQL, persisted=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_weather_settings', 'api_signature')
+    op.drop_column('user_weather_settings', 'display_flags')
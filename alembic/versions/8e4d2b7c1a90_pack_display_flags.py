@@ -0,0 +1,194 @@
+"""Pack show_* flags into display_flags bitmask
+
+Revision ID: 8e4d2b7c1a90
+Revises: 3c1f8e2a9b47
+Create Date: 2026-10-19 11:47:05.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4d2b7c1a90'
+down_revision: Union[str, Sequence[str], None] = '3c1f8e2a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Біт прапорця = позиція у списку (див. db.models.DISPLAY_FLAGS)
+DISPLAY_FLAGS = [
+    'show_temperature',
+    'show_feels_like',
+    'show_humidity',
+    'show_pressure',
+    'show_wind',
+    'show_precipitation',
+    'show_precipitation_probability',
+    'show_cloud_cover',
+    'show_uv_index',
+    'show_visibility',
+    'show_dew_point',
+    'show_solar_radiation',
+    'show_daily_temperature',
+    'show_daily_precipitation',
+    'show_daily_wind',
+    'show_sunrise_sunset',
+    'show_daylight_duration',
+    'show_sunshine_duration',
+    'show_daily_uv',
+    'show_current_weather',
+]
+
+DEFAULT_DISPLAY_FLAGS = 848247
+
+API_SIGNATURE_SQL = (
+    "rtrim((CASE WHEN (display_flags & 1) <> 0 THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 4) <> 0 THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 1024) <> 0 THEN 'dew_point_2m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 2) <> 0 THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 8) <> 0 THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 128) <> 0 THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16) <> 0 THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16) <> 0 THEN 'wind_direction_10m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16) <> 0 THEN 'wind_gusts_10m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 2048) <> 0 THEN 'shortwave_radiation,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 2048) <> 0 THEN 'direct_radiation,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 2048) <> 0 THEN 'diffuse_radiation,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 32) <> 0 THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 64) <> 0 THEN 'precipitation_probability,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 32) <> 0 THEN 'rain,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 32) <> 0 THEN 'showers,' ELSE '' END) || "
+    "'weather_code,' || "
+    "(CASE WHEN (display_flags & 512) <> 0 THEN 'visibility,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 256) <> 0 THEN 'uv_index,' ELSE '' END) || "
+    "'is_day,', ',') || "
+    "'|' || "
+    "rtrim('weather_code,' || "
+    "(CASE WHEN (display_flags & 4096) <> 0 THEN 'temperature_2m_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 4096) <> 0 THEN 'temperature_2m_min,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 4096) <> 0 THEN 'apparent_temperature_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 4096) <> 0 THEN 'apparent_temperature_min,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 32768) <> 0 THEN 'sunrise,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 32768) <> 0 THEN 'sunset,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 65536) <> 0 THEN 'daylight_duration,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 131072) <> 0 THEN 'sunshine_duration,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 262144) <> 0 THEN 'uv_index_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 262144) <> 0 THEN 'uv_index_clear_sky_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 8192) <> 0 THEN 'precipitation_sum,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 8192) <> 0 THEN 'precipitation_hours,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 8192) <> 0 THEN 'precipitation_probability_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16384) <> 0 THEN 'wind_speed_10m_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16384) <> 0 THEN 'wind_gusts_10m_max,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 16384) <> 0 THEN 'wind_direction_10m_dominant,' ELSE '' END), ',') || "
+    "'|' || "
+    "rtrim((CASE WHEN (display_flags & 524288) <> 0 THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'is_day,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'weather_code,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN (display_flags & 524288) <> 0 THEN 'wind_direction_10m,' ELSE '' END), ',')"
+)
+
+OLD_DISPLAY_FLAGS_SQL = (
+    '(CASE WHEN show_temperature THEN 1 ELSE 0 END) | '
+    '(CASE WHEN show_feels_like THEN 2 ELSE 0 END) | '
+    '(CASE WHEN show_humidity THEN 4 ELSE 0 END) | '
+    '(CASE WHEN show_pressure THEN 8 ELSE 0 END) | '
+    '(CASE WHEN show_wind THEN 16 ELSE 0 END) | '
+    '(CASE WHEN show_precipitation THEN 32 ELSE 0 END) | '
+    '(CASE WHEN show_precipitation_probability THEN 64 ELSE 0 END) | '
+    '(CASE WHEN show_cloud_cover THEN 128 ELSE 0 END) | '
+    '(CASE WHEN show_uv_index THEN 256 ELSE 0 END) | '
+    '(CASE WHEN show_visibility THEN 512 ELSE 0 END) | '
+    '(CASE WHEN show_dew_point THEN 1024 ELSE 0 END) | '
+    '(CASE WHEN show_solar_radiation THEN 2048 ELSE 0 END) | '
+    '(CASE WHEN show_daily_temperature THEN 4096 ELSE 0 END) | '
+    '(CASE WHEN show_daily_precipitation THEN 8192 ELSE 0 END) | '
+    '(CASE WHEN show_daily_wind THEN 16384 ELSE 0 END) | '
+    '(CASE WHEN show_sunrise_sunset THEN 32768 ELSE 0 END) | '
+    '(CASE WHEN show_daylight_duration THEN 65536 ELSE 0 END) | '
+    '(CASE WHEN show_sunshine_duration THEN 131072 ELSE 0 END) | '
+    '(CASE WHEN show_daily_uv THEN 262144 ELSE 0 END) | '
+    '(CASE WHEN show_current_weather THEN 524288 ELSE 0 END)'
+)
+
+OLD_API_SIGNATURE_SQL = (
+    "rtrim((CASE WHEN show_temperature THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN show_humidity THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN show_dew_point THEN 'dew_point_2m,' ELSE '' END) || "
+    "(CASE WHEN show_feels_like THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN show_pressure THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN show_cloud_cover THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_direction_10m,' ELSE '' END) || "
+    "(CASE WHEN show_wind THEN 'wind_gusts_10m,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'shortwave_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'direct_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_solar_radiation THEN 'diffuse_radiation,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation_probability THEN 'precipitation_probability,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'rain,' ELSE '' END) || "
+    "(CASE WHEN show_precipitation THEN 'showers,' ELSE '' END) || "
+    "'weather_code,' || "
+    "(CASE WHEN show_visibility THEN 'visibility,' ELSE '' END) || "
+    "(CASE WHEN show_uv_index THEN 'uv_index,' ELSE '' END) || "
+    "'is_day,', ',') || "
+    "'|' || "
+    "rtrim('weather_code,' || "
+    "(CASE WHEN show_daily_temperature THEN 'temperature_2m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'temperature_2m_min,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'apparent_temperature_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_temperature THEN 'apparent_temperature_min,' ELSE '' END) || "
+    "(CASE WHEN show_sunrise_sunset THEN 'sunrise,' ELSE '' END) || "
+    "(CASE WHEN show_sunrise_sunset THEN 'sunset,' ELSE '' END) || "
+    "(CASE WHEN show_daylight_duration THEN 'daylight_duration,' ELSE '' END) || "
+    "(CASE WHEN show_sunshine_duration THEN 'sunshine_duration,' ELSE '' END) || "
+    "(CASE WHEN show_daily_uv THEN 'uv_index_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_uv THEN 'uv_index_clear_sky_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_sum,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_hours,' ELSE '' END) || "
+    "(CASE WHEN show_daily_precipitation THEN 'precipitation_probability_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_speed_10m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_gusts_10m_max,' ELSE '' END) || "
+    "(CASE WHEN show_daily_wind THEN 'wind_direction_10m_dominant,' ELSE '' END), ',') || "
+    "'|' || "
+    "rtrim((CASE WHEN show_current_weather THEN 'temperature_2m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'relative_humidity_2m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'apparent_temperature,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'is_day,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'precipitation,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'weather_code,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'cloud_cover,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'pressure_msl,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'wind_speed_10m,' ELSE '' END) || "
+    "(CASE WHEN show_current_weather THEN 'wind_direction_10m,' ELSE '' END), ',')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # api_signature залежить від show_* — перебудовуємо його поверх display_flags
+    op.drop_column('user_weather_settings', 'api_signature')
+    op.execute('ALTER TABLE user_weather_settings ALTER COLUMN display_flags DROP EXPRESSION')
+    op.alter_column('user_weather_settings', 'display_flags', nullable=False, server_default=str(DEFAULT_DISPLAY_FLAGS))
+    for name in DISPLAY_FLAGS:
+        op.drop_column('user_weather_settings', name)
+    op.add_column('user_weather_settings', sa.Column('api_signature', sa.Text(), sa.Computed(API_SIGNATURE_SQL, persisted=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_weather_settings', 'api_signature')
+    for index, name in enumerate(DISPLAY_FLAGS):
+        op.add_column('user_weather_settings', sa.Column(name, sa.Boolean(), nullable=True))
+        op.execute(f'UPDATE user_weather_settings SET {name} = (display_flags & {1 << index}) <> 0')
+    op.drop_column('user_weather_settings', 'display_flags')
+    op.add_column('user_weather_settings', sa.Column('display_flags', sa.Integer(), sa.Computed(OLD_DISPLAY_FLAGS_SQL, persisted=True), nullable=True))
+    op.add_column('user_weather_settings', sa.Column('api_signature', sa.Text(), sa.Computed(OLD_API_SIGNATURE_SQL, persisted=True), nullable=True))
@@ -0,0 +1,51 @@
+"""Store notification time as minute of day
+
+Revision ID: b52f0c9d7e13
+Revises: 8e4d2b7c1a90
+Create Date: 2026-10-19 13:05:22.417690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52f0c9d7e13'
+down_revision: Union[str, Sequence[str], None] = '8e4d2b7c1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_weather_settings', sa.Column('notification_minute', sa.SmallInteger(), nullable=True))
+    # Некоректні рядки (не HH:MM) перетворюються на NULL
+    op.execute(
+        "UPDATE user_weather_settings "
+        "SET notification_minute = split_part(notification_time, ':', 1)::int * 60 "
+        "+ split_part(notification_time, ':', 2)::int "
+        "WHERE notification_time ~ '^([01][0-9]|2[0-3]):[0-5][0-9]$'"
+    )
+    op.drop_column('user_weather_settings', 'notification_time')
+    op.create_index(
+        'ix_user_weather_settings_notification_minute',
+        'user_weather_settings',
+        ['notification_minute'],
+        unique=False,
+        postgresql_where=sa.text('notification_enabled IS true'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_weather_settings_notification_minute', table_name='user_weather_settings')
+    op.add_column('user_weather_settings', sa.Column('notification_time', sa.String(length=5), nullable=True))
+    op.execute(
+        "UPDATE user_weather_settings "
+        "SET notification_time = lpad((notification_minute / 60)::text, 2, '0') "
+        "|| ':' || lpad((notification_minute % 60)::text, 2, '0') "
+        "WHERE notification_minute IS NOT NULL"
+    )
+    op.drop_column('user_weather_settings', 'notification_minute')
@@ -0,0 +1,41 @@
+"""Add weather alert rules
+
+Revision ID: c3e81f4a9d52
+Revises: a91c6d3e7f25
+Create Date: 2026-10-19 18:04:12.416930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e81f4a9d52'
+down_revision: Union[str, Sequence[str], None] = 'a91c6d3e7f25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('weather_alert_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('operator', sa.String(length=2), nullable=False),
+    sa.Column('threshold', sa.Float(), nullable=False),
+    sa.Column('last_alert_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'metric', 'operator', 'threshold', name='uq_weather_alert_rule')
+    )
+    op.create_index(op.f('ix_weather_alert_rules_user_id'), 'weather_alert_rules', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_weather_alert_rules_user_id'), table_name='weather_alert_rules')
+    op.drop_table('weather_alert_rules')
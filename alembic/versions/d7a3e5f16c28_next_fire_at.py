@@ -0,0 +1,47 @@
+"""Precompute next notification instant in UTC
+
+Revision ID: d7a3e5f16c28
+Revises: b52f0c9d7e13
+Create Date: 2026-10-19 14:12:47.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e5f16c28'
+down_revision: Union[str, Sequence[str], None] = 'b52f0c9d7e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_weather_settings', sa.Column('resolved_timezone', sa.String(length=100), nullable=True))
+    # Значення заповнює планувальник при старті (backfill_next_fire_at)
+    op.add_column('user_weather_settings', sa.Column('next_fire_at', sa.DateTime(timezone=True), nullable=True))
+    op.drop_index('ix_user_weather_settings_notification_minute', table_name='user_weather_settings')
+    op.create_index(
+        'ix_user_weather_settings_next_fire_at',
+        'user_weather_settings',
+        ['next_fire_at'],
+        unique=False,
+        postgresql_where=sa.text('notification_enabled IS true'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_weather_settings_next_fire_at', table_name='user_weather_settings')
+    op.create_index(
+        'ix_user_weather_settings_notification_minute',
+        'user_weather_settings',
+        ['notification_minute'],
+        unique=False,
+        postgresql_where=sa.text('notification_enabled IS true'),
+    )
+    op.drop_column('user_weather_settings', 'next_fire_at')
+    op.drop_column('user_weather_settings', 'resolved_timezone')
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from bot.logger_config import logger
+from bot.notifications import SHARD_REBALANCE, forecast_cell
+from bot.sharding import ShardLeases
+from db.crud import (
+    claim_alert_rules,
+    enqueue_notifications,
+    get_alert_candidates,
+)
+from db.models import WeatherAlertRule
+from db.session import async_session
+from services.alerts import (
+    ALERT_PARAMS,
+    index_rules,
+    render_alert,
+    summarize_forecast,
+    triggered_rules,
+)
+from services.weather import get_cached_weather_batch
+
+# Прогноз для всіх клітинок оновлюється раз на ALERT_INTERVAL, правила
+# перевіряються одразу після оновлення на найближчі ALERT_HORIZON
+ALERT_INTERVAL = timedelta(hours=1)
+ALERT_HORIZON = timedelta(hours=24)
+# Після спрацювання правило мовчить добу, щоб та сама подія не повторювалась щогодини
+ALERT_COOLDOWN = timedelta(hours=24)
+
+
+class AlertEvaluator:
+    # Правила користувача перевіряє процес, що тримає його шард планувальника:
+    # кожне правило — рівно в одному процесі
+
+    def __init__(
+        self, interval: timedelta = ALERT_INTERVAL, shards: Optional[ShardLeases] = None
+    ):
+        self.interval = interval
+        self.shards = shards
+
+    async def evaluate(self, now: datetime) -> int:
+        quiet_since = now - ALERT_COOLDOWN
+        owned = None
+        if self.shards is not None:
+            owned = (self.shards.num_shards, set(self.shards.owned))
+        async with async_session() as session:
+            candidates = await get_alert_candidates(session, quiet_since, owned)
+        if not candidates:
+            return 0
+
+        cells: Dict[Tuple[float, float], List[WeatherAlertRule]] = {}
+        cities: Dict[int, str] = {}
+        for rule, latitude, longitude, location_name in candidates:
+            cells.setdefault(forecast_cell(latitude, longitude), []).append(rule)
+            cities[rule.user_id] = location_name or "Ваша локація"
+
+        coordinates = list(cells)
+        # Свіжі прогнози клітинок беремо з кешу, решту — одним пакетним запитом
+        forecasts = await get_cached_weather_batch(coordinates, ALERT_PARAMS)
+
+        matches: Dict[int, List[Tuple[WeatherAlertRule, float]]] = {}
+        for cell, weather_data in zip(coordinates, forecasts):
+            summary = summarize_forecast(weather_data, now, now + ALERT_HORIZON)
+            for rule, value in triggered_rules(index_rules(cells[cell]), summary):
+                matches.setdefault(rule.user_id, []).append((rule, value))
+        if not matches:
+            return 0
+
+        async with async_session() as session:
+            claimed = await claim_alert_rules(
+                session,
+                [rule.id for user_matches in matches.values() for rule, _ in user_matches],
+                quiet_since,
+                now,
+            )
+            notifications = []
+            for user_id, user_matches in matches.items():
+                user_matches = [match for match in user_matches if match[0].id in claimed]
+                if user_matches:
+                    notifications.append(
+                        {
+                            "user_id": user_id,
+                            "fire_at": now,
+                            "text": render_alert(cities[user_id], user_matches),
+                        }
+                    )
+            # Позначка спрацювання і постановка в чергу фіксуються разом
+            await enqueue_notifications(session, notifications)
+            await session.commit()
+
+        logger.info(
+            f"Погодні попередження: {len(candidates)} правил у {len(cells)} клітинках, надіслано {len(notifications)}"
+        )
+        return len(notifications)
+
+    async def run(self) -> None:
+        while True:
+            if self.shards is not None and not self.shards.owned:
+                # Шарди ще не отримано планувальником — чекаємо, а не пропускаємо годину
+                await asyncio.sleep(SHARD_REBALANCE.total_seconds())
+                continue
+            try:
+                await self.evaluate(datetime.now(timezone.utc))
+            except Exception as e:
+                logger.error(f"Помилка перевірки погодних попереджень: {e}")
+            await asyncio.sleep(self.interval.total_seconds())
+
+
+async def weather_alerts_evaluator(shards: Optional[ShardLeases] = None):
+    await AlertEvaluator(shards=shards).run()
@@ -6,26 +6,86 @@ import os
 
 from dotenv import load_dotenv
 
+from bot.alerts import weather_alerts_evaluator
 from bot.notifications import daily_notifications_scheduler
+from bot.outbox import outbox_worker
+from bot.render_cache import install_render_cache
+from bot.sharding import ShardLeases
+from bot.throttling import ThrottlingMiddleware
+from bot.webhook import run_webhook, webhook_secret
+from bot.workers import UpdateIngress
+from config import (
+    UPDATE_WORKERS,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from db.session import engine
 
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
 
-async def main():
+def create_bot() -> Bot:
     bot = Bot(
         token=TELEGRAM_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
     )
+    install_render_cache(bot)
+    return bot
+
+
+def create_dispatcher() -> Dispatcher:
     dp = Dispatcher()
 
     from bot.handlers import register_handlers
 
     register_handlers(dp)
 
-    asyncio.create_task(daily_notifications_scheduler(bot))
+    # Один екземпляр на обидва типи подій: спільні ліміти користувача й чату
+    throttling = ThrottlingMiddleware()
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+    return dp
+
+
+async def main():
+    bot = create_bot()
+    dp = create_dispatcher()
+
+    # Фонові задачі живуть лише в головному процесі, навіть якщо оновлення
+    # обробляють окремі процеси
+    # Шарди отримує планувальник; попередження перевіряються для тих самих шардів
+    shards = ShardLeases(engine)
+    asyncio.create_task(daily_notifications_scheduler(bot, shards))
+    asyncio.create_task(outbox_worker(bot))
+    asyncio.create_task(weather_alerts_evaluator(shards))
 
-    await dp.start_polling(bot)
+    # З UPDATE_WORKERS головний процес лише приймає оновлення і розподіляє їх
+    ingress = UpdateIngress.spawn(dp, UPDATE_WORKERS) if UPDATE_WORKERS > 0 else None
+    target = ingress or dp
+    try:
+        if WEBHOOK_URL:
+            await run_webhook(
+                bot,
+                target,
+                WEBHOOK_URL,
+                WEBHOOK_PATH,
+                WEBAPP_HOST,
+                WEBAPP_PORT,
+                webhook_secret(TELEGRAM_TOKEN, WEBHOOK_SECRET),
+            )
+        elif ingress is not None:
+            await ingress.poll(bot)
+        else:
+            # Без WEBHOOK_URL (локальна розробка) — long polling
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        if ingress is not None:
+            await ingress.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+from bot.logger_config import logger
+
+CallbackHandler = Callable[..., Awaitable[Any]]
+
+
+# Фабрики параметризованих callback_data. Формат "префікс:поле:поле" збігається
+# з рядками, які кнопки використовували раніше, тож старі повідомлення працюють
+
+
+class Toggle(CallbackData, prefix="toggle"):
+    setting: str
+
+
+class SetUnit(CallbackData, prefix="set_unit"):
+    unit_type: str
+    value: str
+
+
+class SetForecast(CallbackData, prefix="set_forecast"):
+    field: str
+    days: int
+
+
+class SetTimezone(CallbackData, prefix="set_timezone"):
+    timezone: str
+
+
+class HourlyPage(CallbackData, prefix="hourly"):
+    offset: int
+    hours: int
+
+
+class CallbackRouter:
+    # Один зареєстрований в aiogram обробник замість фільтра на кожну кнопку:
+    # call.data розбирається один раз, обробник шукається в словниках за
+    # не більше ніж три звернення, скільки б меню не додавалось
+
+    def __init__(self, fallback: Optional[CallbackHandler] = None):
+        self.fallback = fallback
+        self._exact: Dict[str, CallbackHandler] = {}
+        self._factories: Dict[
+            Tuple[str, Optional[str]], Tuple[CallbackHandler, Type[CallbackData]]
+        ] = {}
+        self._wants_state: Dict[CallbackHandler, bool] = {}
+
+    def _remember(self, handler: CallbackHandler) -> None:
+        self._wants_state[handler] = "state" in inspect.signature(handler).parameters
+
+    def action(self, data: str, handler: CallbackHandler) -> None:
+        self._exact[data] = handler
+        self._remember(handler)
+
+    def factory(
+        self,
+        factory: Type[CallbackData],
+        handler: CallbackHandler,
+        action: Optional[str] = None,
+    ) -> None:
+        # action звужує маршрут до значення першого поля, напр. set_forecast:days
+        self._factories[(factory.__prefix__, action)] = (handler, factory)
+        self._remember(handler)
+
+    def resolve(
+        self, data: Optional[str]
+    ) -> Tuple[Optional[CallbackHandler], Dict[str, Any]]:
+        data = data or ""
+        handler = self._exact.get(data)
+        if handler is not None:
+            return handler, {}
+
+        namespace, _, rest = data.partition(":")
+        head = rest.partition(":")[0]
+        entry = self._factories.get((namespace, head)) or self._factories.get(
+            (namespace, None)
+        )
+        if entry is not None:
+            handler, factory = entry
+            try:
+                return handler, {"callback_data": factory.unpack(data)}
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Некоректний callback {data}: {e}")
+        return self.fallback, {}
+
+    async def dispatch(self, call: CallbackQuery, state: FSMContext) -> Any:
+        handler, kwargs = self.resolve(call.data)
+        if handler is None:
+            return None
+        if self._wants_state.get(handler):
+            kwargs["state"] = state
+        return await handler(call, **kwargs)
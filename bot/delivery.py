@@ -0,0 +1,181 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from bot.logger_config import logger
+
+# Ліміти Telegram: ~30 повідомлень/с на бота і ~1/с в один чат
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+DELIVERY_WORKERS = 16
+MAX_ATTEMPTS = 3
+# Відповіді Bad Request, які означають, що чату більше немає (а не помилку в тексті)
+MISSING_CHAT_MARKERS = ("chat not found", "user not found", "peer_id_invalid")
+
+
+def dead_recipient_reason(error: Optional[Exception]) -> Optional[str]:
+    # Причина, з якої отримувачу вже ніколи не доставити повідомлення, або None
+    if isinstance(error, TelegramForbiddenError):
+        message = error.message.lower()
+        if "deactivated" in message:
+            return "deactivated"
+        if "kicked" in message:
+            return "kicked"
+        return "blocked"
+    if isinstance(error, TelegramBadRequest):
+        message = error.message.lower()
+        if any(marker in message for marker in MISSING_CHAT_MARKERS):
+            return "chat_not_found"
+    return None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # Черга на замку зберігає порядок, у якому воркери просили токени
+        self._lock = asyncio.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        # Нова частка спільного ліміту; запас не може перевищувати нову місткість
+        self._refill(time.monotonic())
+        self.rate = rate
+        # Щонайменше один токен, інакше дрібна частка ніколи б не дала відправити
+        self.capacity = max(rate, 1)
+        self._tokens = min(self._tokens, self.capacity)
+
+    def is_full(self, now: float) -> bool:
+        # Повне і вільне відро нічим не відрізняється від нового
+        if self._lock.locked() or now < self._paused_until:
+            return False
+        return self._tokens + (now - self._updated) * self.rate >= self.capacity
+
+    def _refill(self, now: float) -> None:
+        if now <= self._updated:
+            return
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        # Після паузи відро наповнюється з нуля, щоб не вистрілити всім запасом одразу
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DeliveryPipeline:
+    def __init__(
+        self,
+        bot,
+        workers: int = DELIVERY_WORKERS,
+        rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self.bucket = TokenBucket(rate)
+        # Відра чатів живуть між викликами deliver, інакше кожна порція
+        # починала б з повного відра і ліміт 1/с у чат не діяв би між порціями
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+    def share_rate(self, members: int) -> None:
+        # Ліміт Telegram — на бота, а не на процес: кожен з members процесів
+        # отримує рівну частку
+        rate = self.rate / max(members, 1)
+        if rate != self.bucket.rate:
+            self.bucket.set_rate(rate)
+            logger.info(f"Швидкість доставки: {rate:.1f} повідомл./с ({members} процесів)")
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+        return bucket
+
+    def _prune_chat_buckets(self) -> None:
+        # Забуваємо лише відра, що вже наповнилися: це не послаблює ліміт, а
+        # словник обмежений чатами за останню секунду й поточною порцією
+        now = time.monotonic()
+        for chat_id in [
+            chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.is_full(now)
+        ]:
+            del self._chat_buckets[chat_id]
+
+    async def deliver(
+        self, messages: List[Tuple[int, str]], **send_kwargs: Any
+    ) -> List[Optional[Exception]]:
+        # Результат для кожного повідомлення в тому ж порядку: None або помилка
+        results: List[Optional[Exception]] = [None] * len(messages)
+        if not messages:
+            return results
+
+        self._prune_chat_buckets()
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, message in enumerate(messages):
+            queue.put_nowait((index, message))
+
+        async def worker():
+            while not queue.empty():
+                index, (chat_id, text) = queue.get_nowait()
+                results[index] = await self._send(
+                    chat_id, text, self._chat_bucket(chat_id), send_kwargs
+                )
+
+        started = time.monotonic()
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.workers, len(messages))))
+        )
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        sent = results.count(None)
+        logger.info(
+            f"Доставлено {sent}/{len(messages)} повідомлень за {elapsed:.1f} с ({sent / elapsed:.1f} повідомл./с)"
+        )
+        return results
+
+    async def _send(
+        self, chat_id: int, text: str, chat_bucket: TokenBucket, send_kwargs: dict
+    ) -> Optional[Exception]:
+        error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            await chat_bucket.acquire()
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, **send_kwargs)
+                return None
+            except TelegramRetryAfter as e:
+                # Flood control стосується всього бота — зупиняємо спільне відро
+                logger.warning(f"Telegram просить зачекати {e.retry_after} с (чат {chat_id})")
+                self.bucket.pause(e.retry_after)
+                error = e
+            except Exception as e:
+                return e
+        return error
@@ -1,4 +1,4 @@
-from bot.handlers.commands import start_handler, help_handler, settings_handler
+from bot.handlers.commands import start_handler, help_handler, settings_handler, alert_handler
 from bot.handlers.text import text_handler
 from bot.handlers.menu_callbacks import help_callback_handler, main_menu_callback, settings_menu_callback
 from bot.handlers.settings_callbacks import edit_notifications_display_callback, location_settings_callback, units_settings_callback, display_settings_callback
@@ -8,64 +8,73 @@ from bot.handlers.location_callbacks import set_location_callback, timezone_call
 from bot.handlers.forecast_callbacks import forecast_settings_callback, forecast_days_callback, set_forecast_days_callback, forecast_past_days_callback, set_forecast_past_days_callback
 from bot.handlers.notifications_callbacks import notifications_settings_callback, notifications_time_callback
 from bot.handlers.fallback import unknown_callback
+from bot.handlers.inline import inline_query_handler
 from aiogram import Dispatcher
+from bot.callbacks import CallbackRouter, HourlyPage, SetForecast, SetTimezone, SetUnit, Toggle
 from aiogram.filters import Command
 
-def register_handlers(dp: Dispatcher):
-    # Команди
+def build_callback_router() -> CallbackRouter:
+    router = CallbackRouter(fallback=unknown_callback)
 
-    dp.callback_query.register(edit_notifications_display_callback, lambda c: c.data == "notifications:edit_display")
-    dp.message.register(start_handler, Command("start"))
-    dp.message.register(help_handler, Command("help"))
-    dp.message.register(settings_handler, Command("settings"))
-    
-    # Текстові повідомлення
-    dp.message.register(text_handler)
-    
-    # Callback
-    dp.callback_query.register(main_menu_callback, lambda c: c.data == "menu:main")
-    dp.callback_query.register(settings_menu_callback, lambda c: c.data == "menu:settings")
-    dp.callback_query.register(help_callback_handler, lambda c: c.data == "action:help")
+    router.action("notifications:edit_display", edit_notifications_display_callback)
+    router.action("menu:main", main_menu_callback)
+    router.action("menu:settings", settings_menu_callback)
+    router.action("action:help", help_callback_handler)
 
     # Settings
-    dp.callback_query.register(location_settings_callback, lambda c: c.data == "settings:location")
-    dp.callback_query.register(units_settings_callback, lambda c: c.data == "settings:units")
-    dp.callback_query.register(display_settings_callback, lambda c: c.data == "settings:display")
+    router.action("settings:location", location_settings_callback)
+    router.action("settings:units", units_settings_callback)
+    router.action("settings:display", display_settings_callback)
 
     # Weather
-    dp.callback_query.register(current_weather_callback, lambda c: c.data == "weather:current")
-    dp.callback_query.register(weekly_weather_callback, lambda c: c.data == "weather:weekly")
-    dp.callback_query.register(hourly_weather_callback, lambda c: c.data == "weather:hourly")
-    dp.callback_query.register(today_weather_callback, lambda c: c.data == "weather:today")
-    dp.callback_query.register(three_days_weather_callback, lambda c: c.data == "weather:3days")
-    
+    router.action("weather:current", current_weather_callback)
+    router.action("weather:weekly", weekly_weather_callback)
+    router.action("weather:hourly", hourly_weather_callback)
+    router.factory(HourlyPage, hourly_weather_callback)
+    router.action("weather:today", today_weather_callback)
+    router.action("weather:3days", three_days_weather_callback)
+
     # Units callbacks
-    dp.callback_query.register(toggle_setting_callback, lambda c: c.data.startswith("toggle:"))
-    dp.callback_query.register(set_unit_callback, lambda c: c.data.startswith("set_unit:"))
-    
+    router.factory(Toggle, toggle_setting_callback)
+    router.factory(SetUnit, set_unit_callback)
+    router.factory(SetUnit, set_timeformat_callback, action="timeformat")
+
     # Specific unit callbacks
-    dp.callback_query.register(temperature_unit_callback, lambda c: c.data == "units:temperature")
-    dp.callback_query.register(wind_speed_unit_callback, lambda c: c.data == "units:wind_speed")
-    dp.callback_query.register(precipitation_unit_callback, lambda c: c.data == "units:precipitation")
+    router.action("units:temperature", temperature_unit_callback)
+    router.action("units:wind_speed", wind_speed_unit_callback)
+    router.action("units:precipitation", precipitation_unit_callback)
+    router.action("units:timeformat", timeformat_unit_callback)
 
-    # Timeformat callbacks
-    dp.callback_query.register(timeformat_unit_callback, lambda call: call.data == "units:timeformat")
-    dp.callback_query.register(set_timeformat_callback, lambda call: call.data.startswith("set_unit:timeformat:"))
-    
     # Location callbacks
-    dp.callback_query.register(set_location_callback, lambda c: c.data == "location:set")
-    dp.callback_query.register(timezone_callback, lambda c: c.data == "location:timezone")
-    dp.callback_query.register(set_timezone_callback, lambda c: c.data.startswith("set_timezone:"))
-    
+    router.action("location:set", set_location_callback)
+    router.action("location:timezone", timezone_callback)
+    router.factory(SetTimezone, set_timezone_callback)
+
     # Forecast callbacks
-    dp.callback_query.register(forecast_settings_callback, lambda c: c.data == "settings:forecast")
-    dp.callback_query.register(forecast_days_callback, lambda c: c.data == "forecast:days")
-    dp.callback_query.register(set_forecast_days_callback, lambda c: c.data.startswith("set_forecast:days:"))
-    dp.callback_query.register(forecast_past_days_callback, lambda c: c.data == "forecast:past_days")
-    dp.callback_query.register(set_forecast_past_days_callback, lambda c: c.data.startswith("set_forecast:past_days:"))
-    
+    router.action("settings:forecast", forecast_settings_callback)
+    router.action("forecast:days", forecast_days_callback)
+    router.factory(SetForecast, set_forecast_days_callback, action="days")
+    router.action("forecast:past_days", forecast_past_days_callback)
+    router.factory(SetForecast, set_forecast_past_days_callback, action="past_days")
+
     # Notifications callbacks
-    dp.callback_query.register(notifications_settings_callback, lambda c: c.data == "settings:notifications")
-    dp.callback_query.register(notifications_time_callback, lambda c: c.data == "notifications:time")
-    
-    dp.callback_query.register(unknown_callback)
+    router.action("settings:notifications", notifications_settings_callback)
+    router.action("notifications:time", notifications_time_callback)
+    return router
+
+
+def register_handlers(dp: Dispatcher):
+    # Команди
+    dp.message.register(start_handler, Command("start"))
+    dp.message.register(help_handler, Command("help"))
+    dp.message.register(settings_handler, Command("settings"))
+    dp.message.register(alert_handler, Command("alert"))
+
+    # Текстові повідомлення
+    dp.message.register(text_handler)
+
+    # Callback: один обробник, маршрут за call.data шукається в словнику
+    dp.callback_query.register(build_callback_router().dispatch)
+
+    # Inline-режим: @бот місто
+    dp.inline_query.register(inline_query_handler)
@@ -1,10 +1,18 @@
 from bot.logger_config import logger
 from aiogram import types
+from aiogram.filters import CommandObject
 from aiogram.types import Message
 from bot.keyboards import WeatherKeyboards
-from db.crud import get_user_settings_summary
+from db.crud import (
+    add_alert_rule,
+    delete_alert_rules,
+    get_alert_rules,
+    get_user_settings_summary,
+    get_user_weather_settings,
+)
 from db.database import get_session
 from db.utils import get_or_create_user
+from services.alerts import MAX_ALERT_RULES, format_alert_rule, parse_alert_rule
 
 
 async def start_handler(message: Message):
@@ -46,3 +54,65 @@ async def settings_handler(message: Message):
     await message.reply(
         summary, reply_markup=WeatherKeyboards.settings_menu(), parse_mode="Markdown"
     )
+
+
+ALERT_HELP = """
+⚠️ **Погодні попередження**
+Бот перевіряє прогноз на добу вперед і пише, коли умова справджується:
+`/alert rain > 5` — опади понад 5 мм
+`/alert temp < -10` — температура нижче -10 °C
+`/alert wind > 50` — вітер понад 50 км/год
+`/alert frost` — мороз, `/alert heat` — спека
+`/alert del 3` — видалити правило, `/alert off` — видалити всі
+"""
+
+
+async def alert_handler(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    args = (command.args or "").strip()
+    logger.info(f"/alert від користувача {user_id}: {args}")
+
+    async for session in get_session():
+        if args.lower() == "off":
+            removed = await delete_alert_rules(session, user_id)
+            await message.reply(f"🗑 Видалено правил: {removed}")
+            return
+
+        if args.lower().startswith("del"):
+            try:
+                rule_id = int(args[3:].strip())
+            except ValueError:
+                await message.reply("❌ Вкажіть номер правила, напр. `/alert del 3`", parse_mode="Markdown")
+                return
+            removed = await delete_alert_rules(session, user_id, rule_id)
+            await message.reply("🗑 Правило видалено" if removed else "❌ Правило не знайдено")
+            return
+
+        rules = await get_alert_rules(session, user_id)
+        if not args:
+            if rules:
+                lines = [
+                    f"{rule.id}. {format_alert_rule(rule.metric, rule.operator, rule.threshold)}"
+                    for rule in rules
+                ]
+                text = "📋 **Ваші правила:**\n" + "\n".join(lines) + "\n" + ALERT_HELP
+            else:
+                text = ALERT_HELP
+            await message.reply(text, parse_mode="Markdown")
+            return
+
+        try:
+            metric, operator, threshold = parse_alert_rule(args)
+        except ValueError as e:
+            await message.reply(f"❌ {e}")
+            return
+        if len(rules) >= MAX_ALERT_RULES:
+            await message.reply(f"❌ Не більше {MAX_ALERT_RULES} правил. Видаліть зайві: `/alert del N`", parse_mode="Markdown")
+            return
+
+        settings = await get_user_weather_settings(session, user_id)
+        await add_alert_rule(session, user_id, metric, operator, threshold)
+        text = f"✅ Попередження додано: {format_alert_rule(metric, operator, threshold)}"
+        if settings.latitude is None or settings.longitude is None:
+            text += "\n📍 Вкажіть локацію, щоб правило почало працювати"
+        await message.reply(text)
@@ -1,9 +1,14 @@
 from bot.logger_config import logger
-from datetime import datetime
 from aiogram.types import CallbackQuery
+from bot.callbacks import SetForecast
+from bot.handlers.settings_callbacks import answer_if_unchanged
 from bot.keyboards import WeatherKeyboards
 from db.database import get_session
-from db.crud import get_user_weather_settings, update_user_units
+from db.crud import (
+    get_user_weather_settings,
+    update_forecast_settings,
+    update_user_units,
+)
 
 
 async def forecast_settings_callback(call: CallbackQuery):
@@ -41,18 +46,17 @@ async def forecast_days_callback(call: CallbackQuery):
     )
 
 
-async def set_forecast_days_callback(call: CallbackQuery):
+async def set_forecast_days_callback(call: CallbackQuery, callback_data: SetForecast):
+    days = callback_data.days
+    if await answer_if_unchanged(call, "forecast_days", days):
+        return
     await call.answer()
 
-    _, _, days_str = call.data.split(":", 2)
-    days = int(days_str)
-
     try:
         async for session in get_session():
-            settings = await get_user_weather_settings(session, call.from_user.id)
-            settings.forecast_days = days
-            settings.updated_at = datetime.now()
-            await session.commit()
+            await update_forecast_settings(
+                session, call.from_user.id, forecast_days=days
+            )
 
         await call.answer(f"Встановлено {days} днів прогнозу", show_alert=True)
         await forecast_settings_callback(call)
@@ -78,12 +82,14 @@ async def forecast_past_days_callback(call: CallbackQuery):
     )
 
 
-async def set_forecast_past_days_callback(call: CallbackQuery):
+async def set_forecast_past_days_callback(
+    call: CallbackQuery, callback_data: SetForecast
+):
+    days = callback_data.days
+    if await answer_if_unchanged(call, "past_days", days):
+        return
     await call.answer()
 
-    _, _, days_str = call.data.split(":", 2)
-    days = int(days_str)
-
     try:
         async for session in get_session():
             await update_user_units(session, call.from_user.id, past_days=days)
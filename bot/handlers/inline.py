@@ -0,0 +1,100 @@
+import hashlib
+from typing import List
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from bot.handlers.utils import format_weather_response, get_weather_description
+from bot.logger_config import logger
+from services.cache import TTLCache
+from services.geocode import normalize_query, search_places
+from services.markdown import escape_markdown
+from services.views import CURRENT_VIEW_FIELDS
+from services.weather import get_cached_weather_batch
+
+# Inline-запит надходить на кожне натискання клавіші, тому відповідь спершу
+# шукається в кеші: Telegram тримає її cache_time секунд у себе, ми — у пам'яті
+INLINE_CACHE_TIME = 300
+INLINE_ERROR_CACHE_TIME = 5
+INLINE_RESULTS_SIZE = 2048
+# Не довше за кеш прогнозів: інакше віддавали б застарілу погоду
+INLINE_RESULTS_TTL = 300.0
+# Однакові для всіх користувачів параметри — результати спільні (is_personal=False)
+INLINE_PARAMS = {
+    "current": ",".join(CURRENT_VIEW_FIELDS),
+    "daily": "weather_code,temperature_2m_max,temperature_2m_min",
+    "forecast_days": 3,
+    "timezone": "auto",
+    "temperature_unit": "celsius",
+    "wind_speed_unit": "kmh",
+}
+
+_inline_results = TTLCache(INLINE_RESULTS_SIZE, INLINE_RESULTS_TTL)
+
+
+def _result_id(place: dict) -> str:
+    point = f"{place['lat']:.4f},{place['lon']:.4f}"
+    return hashlib.blake2b(point.encode(), digest_size=8).hexdigest()
+
+
+async def build_inline_results(places: List[dict]) -> List[InlineQueryResultArticle]:
+    # Прогнози всіх кандидатів: з кешу, відсутні — одним пакетним запитом
+    forecasts = await get_cached_weather_batch(
+        [(place["lat"], place["lon"]) for place in places], INLINE_PARAMS
+    )
+
+    results = []
+    for place, weather_data in zip(places, forecasts):
+        city = place.get("city") or place.get("formatted") or "Невідома локація"
+        # Назви приходять від Geoapify і рендеряться в Markdown-повідомлення
+        location_data = {
+            "city": escape_markdown(city),
+            "state": escape_markdown(place.get("state")),
+            "country": escape_markdown(place.get("country")),
+        }
+        response = await format_weather_response(weather_data, location_data, INLINE_PARAMS)
+
+        current = weather_data.get("current") or {}
+        description = ""
+        if "temperature_2m" in current:
+            description = f"{current['temperature_2m']}°C"
+        if "weather_code" in current:
+            description += f" {get_weather_description(current['weather_code'])}"
+
+        results.append(
+            InlineQueryResultArticle(
+                id=_result_id(place),
+                title=place.get("formatted") or city,
+                description=description.strip() or None,
+                input_message_content=InputTextMessageContent(
+                    message_text=response, parse_mode="Markdown"
+                ),
+            )
+        )
+    return results
+
+
+async def inline_query_handler(query: InlineQuery):
+    text = normalize_query(query.query)
+    if len(text) < 2:
+        await query.answer([], cache_time=INLINE_CACHE_TIME, is_personal=False)
+        return
+
+    results = _inline_results.get(text)
+    if results is None:
+        try:
+            places = await search_places(text)
+            results = await build_inline_results(places) if places else []
+        except Exception as e:
+            # Збій не кешуємо: наступне натискання спробує ще раз
+            logger.warning(f"Помилка inline-запиту '{text}': {str(e)}")
+            await query.answer([], cache_time=INLINE_ERROR_CACHE_TIME, is_personal=False)
+            return
+        _inline_results.put(text, results)
+
+    try:
+        await query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False)
+    except TelegramBadRequest as e:
+        # Відхилені Telegram результати не віддаємо з кешу повторно
+        _inline_results.discard(text)
+        logger.warning(f"Telegram відхилив inline-відповідь '{text}': {str(e)}")
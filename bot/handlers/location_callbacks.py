@@ -1,9 +1,12 @@
-from datetime import datetime
 from aiogram.types import CallbackQuery
-from bot.handlers.settings_callbacks import location_settings_callback
+from bot.callbacks import SetTimezone
+from bot.handlers.settings_callbacks import (
+    answer_if_unchanged,
+    location_settings_callback,
+)
 from bot.keyboards import WeatherKeyboards
 from db.database import get_session
-from db.crud import get_user_weather_settings
+from db.crud import update_user_timezone
 from aiogram.fsm.context import FSMContext
 from bot.states import SettingsStates
 from bot.logger_config import logger
@@ -37,17 +40,15 @@ async def timezone_callback(call: CallbackQuery):
     )
 
 
-async def set_timezone_callback(call: CallbackQuery):
+async def set_timezone_callback(call: CallbackQuery, callback_data: SetTimezone):
+    timezone = callback_data.timezone
+    if await answer_if_unchanged(call, "timezone", timezone):
+        return
     await call.answer()
 
-    _, timezone = call.data.split(":", 1)
-
     try:
         async for session in get_session():
-            settings = await get_user_weather_settings(session, call.from_user.id)
-            settings.timezone = timezone
-            settings.updated_at = datetime.now()
-            await session.commit()
+            await update_user_timezone(session, call.from_user.id, timezone)
 
         await call.answer(f"Часовий пояс встановлено: {timezone}", show_alert=True)
         await location_settings_callback(call)
@@ -2,9 +2,22 @@ from aiogram import types
 from bot.keyboards import WeatherKeyboards
 from db.crud import get_user_settings_summary, get_user_weather_settings
 from db.database import get_session
+from db.models import unpack_display_flags
 from aiogram.types import CallbackQuery
 from bot.logger_config import logger
 
+ALREADY_SET_TEXT = "✅ Вже встановлено"
+
+
+async def answer_if_unchanged(call: CallbackQuery, field: str, value) -> bool:
+    # Обране значення вже збережене: меню не зміниться, тож без запису й правки
+    async for session in get_session():
+        settings = await get_user_weather_settings(session, call.from_user.id)
+    if getattr(settings, field, None) != value:
+        return False
+    await call.answer(ALREADY_SET_TEXT)
+    return True
+
 
 async def units_settings_callback(call: CallbackQuery):
     await call.answer()
@@ -60,21 +73,7 @@ async def display_settings_callback(call: CallbackQuery):
     async for session in get_session():
         settings = await get_user_weather_settings(session, call.from_user.id)
 
-    display_settings = {
-        "show_temperature": settings.show_temperature,
-        "show_feels_like": settings.show_feels_like,
-        "show_humidity": settings.show_humidity,
-        "show_pressure": settings.show_pressure,
-        "show_wind": settings.show_wind,
-        "show_precipitation": settings.show_precipitation,
-        "show_precipitation_probability": settings.show_precipitation_probability,
-        "show_cloud_cover": settings.show_cloud_cover,
-        "show_uv_index": settings.show_uv_index,
-        "show_visibility": settings.show_visibility,
-        "show_daily_temperature": settings.show_daily_temperature,
-        "show_sunrise_sunset": settings.show_sunrise_sunset,
-        "show_daylight_duration": settings.show_daylight_duration,
-    }
+    display_settings = unpack_display_flags(settings.display_flags)
 
     try:
         await call.message.edit_text(
@@ -104,21 +103,7 @@ async def edit_notifications_display_callback(call: CallbackQuery):
     await call.answer()
     async for session in get_session():
         settings = await get_user_weather_settings(session, call.from_user.id)
-    display_settings = {
-        "show_temperature": settings.show_temperature,
-        "show_feels_like": settings.show_feels_like,
-        "show_humidity": settings.show_humidity,
-        "show_pressure": settings.show_pressure,
-        "show_wind": settings.show_wind,
-        "show_precipitation": settings.show_precipitation,
-        "show_precipitation_probability": settings.show_precipitation_probability,
-        "show_cloud_cover": settings.show_cloud_cover,
-        "show_uv_index": settings.show_uv_index,
-        "show_visibility": settings.show_visibility,
-        "show_daily_temperature": settings.show_daily_temperature,
-        "show_sunrise_sunset": settings.show_sunrise_sunset,
-        "show_daylight_duration": settings.show_daylight_duration,
-    }
+    display_settings = unpack_display_flags(settings.display_flags)
     await call.message.edit_text(
         "📊 **Налаштування відображення для сповіщень**\n\nВибери, що показувати в повідомленнях:",
         reply_markup=WeatherKeyboards.display_settings(display_settings),
@@ -1,4 +1,3 @@
-import re
 from bot.logger_config import logger
 from aiogram.types import Message
 from bot.keyboards import WeatherKeyboards
@@ -22,19 +21,21 @@ async def text_handler(message: Message):
 
         if state == "AWAITING_NOTIFICATION_TIME":
 
-            if re.match(r"^\d{2}:\d{2}$", message.text.strip()):
+            try:
                 await save_notification_time(
                     session, message.from_user.id, message.text.strip()
                 )
-                await set_user_state(session, message.from_user.id, None)
-                await message.reply(
-                    f"⏰ Час сповіщень встановлено: {message.text.strip()}",
-                    reply_markup=WeatherKeyboards.main_menu(),
-                )
-            else:
+            except ValueError:
                 await message.reply(
                     "❌ Невірний формат часу. Вкажи у HH:MM (наприклад, 08:30)"
                 )
+                return
+
+            await set_user_state(session, message.from_user.id, None)
+            await message.reply(
+                f"⏰ Час сповіщень встановлено: {message.text.strip()}",
+                reply_markup=WeatherKeyboards.main_menu(),
+            )
             return
 
         place = message.text.strip()
@@ -55,6 +56,7 @@ async def text_handler(message: Message):
                 lat,
                 lon,
                 location_name=f"{city}, {country}" if city and country else place,
+                resolved_timezone=location_data.get("timezone"),
             )
 
             api_params = await get_api_parameters(session, message.from_user.id)
@@ -1,8 +1,9 @@
 from bot.logger_config import logger
-from datetime import datetime
-from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import CallbackQuery
+from bot.callbacks import SetUnit, Toggle
 from bot.handlers.notifications_callbacks import notifications_settings_callback
 from bot.handlers.settings_callbacks import (
+    answer_if_unchanged,
     display_settings_callback,
     units_settings_callback,
 )
@@ -11,11 +12,11 @@ from db.database import get_session
 from db.crud import get_user_weather_settings, toggle_display_setting, update_user_units
 
 
-async def toggle_setting_callback(call: CallbackQuery):
+async def toggle_setting_callback(call: CallbackQuery, callback_data: Toggle):
     logger.info(f"Toggle callback: {call.data} from user {call.from_user.id}")
     await call.answer()
 
-    _, setting_name = call.data.split(":", 1)
+    setting_name = callback_data.setting
 
     try:
         async for session in get_session():
@@ -44,11 +45,12 @@ async def toggle_setting_callback(call: CallbackQuery):
         )
 
 
-async def set_unit_callback(call: CallbackQuery):
+async def set_unit_callback(call: CallbackQuery, callback_data: SetUnit):
+    unit_type, unit_value = callback_data.unit_type, callback_data.value
+    if await answer_if_unchanged(call, unit_type, unit_value):
+        return
     await call.answer()
 
-    _, unit_type, unit_value = call.data.split(":", 2)
-
     try:
         async for session in get_session():
             kwargs = {unit_type: unit_value}
@@ -110,25 +112,11 @@ async def precipitation_unit_callback(call: CallbackQuery):
     async for session in get_session():
         settings = await get_user_weather_settings(session, call.from_user.id)
 
-    precipitation_keyboard = [
-        [
-            InlineKeyboardButton(
-                text=f"{'✅' if settings.precipitation_unit == 'mm' else '⚪'} Міліметри (мм)",
-                callback_data="set_unit:precipitation_unit:mm",
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text=f"{'✅' if settings.precipitation_unit == 'inch' else '⚪'} Дюйми (inch)",
-                callback_data="set_unit:precipitation_unit:inch",
-            )
-        ],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:units")],
-    ]
-
     await call.message.edit_text(
         "🌧️ **Оберіть одиниці опадів:**",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=precipitation_keyboard),
+        reply_markup=WeatherKeyboards.precipitation_unit_selector(
+            settings.precipitation_unit
+        ),
         parse_mode="Markdown",
     )
 
@@ -146,17 +134,15 @@ async def timeformat_unit_callback(call: CallbackQuery):
     )
 
 
-async def set_timeformat_callback(call: CallbackQuery):
+async def set_timeformat_callback(call: CallbackQuery, callback_data: SetUnit):
+    timeformat = callback_data.value
+    if await answer_if_unchanged(call, "timeformat", timeformat):
+        return
     await call.answer()
 
-    _, _, timeformat = call.data.split(":", 2)
-
     try:
         async for session in get_session():
-            settings = await get_user_weather_settings(session, call.from_user.id)
-            settings.timeformat = timeformat
-            settings.updated_at = datetime.now()
-            await session.commit()
+            await update_user_units(session, call.from_user.id, timeformat=timeformat)
 
         await call.answer(f"Формат часу встановлено: {timeformat}", show_alert=True)
         await units_settings_callback(call)
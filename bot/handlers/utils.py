@@ -1,5 +1,58 @@
+import json
+from typing import Optional
+
+from services.cache import TTLCache
+from services.views import FORECAST_SECTIONS
+from services.weather import FORECAST_CACHE_TTL, FORECAST_VERSION_FIELD
+
+# Готові відповіді для однакових прогнозу, локації й параметрів: популярні міста
+# рендеряться один раз на оновлення прогнозу, а не для кожного користувача.
+# Довше за прогноз у кеші відповідь не знадобиться
+RESPONSE_CACHE_SIZE = 2048
+RENDER_LOCALE = "uk"
+
+_response_cache = TTLCache(RESPONSE_CACHE_SIZE, FORECAST_CACHE_TTL)
+
+
+def response_key(
+    weather_data: dict, location_data: dict, api_params: dict
+) -> Optional[tuple]:
+    # Версію прогнозу присвоює кеш прогнозів; прогноз поза кешем не кешується
+    version = weather_data.get(FORECAST_VERSION_FIELD)
+    if version is None:
+        return None
+    # Вкладки — проєкції одного прогнозу: розрізняються секціями й параметрами
+    sections = tuple(section for section in FORECAST_SECTIONS if section in weather_data)
+    # Координати локації в текст не потрапляють — лише назва
+    label = tuple(location_data.get(field, "") for field in ("city", "state", "country"))
+    signature = json.dumps(
+        {
+            key: value
+            for key, value in api_params.items()
+            if key not in ("latitude", "longitude")
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return version, sections, label, signature, RENDER_LOCALE
+
+
 async def format_weather_response(
     weather_data: dict, location_data: dict, api_params: dict
+) -> str:
+    key = response_key(weather_data, location_data, api_params)
+    if key is None:
+        return render_weather_response(weather_data, location_data, api_params)
+
+    response = _response_cache.get(key)
+    if response is None:
+        response = render_weather_response(weather_data, location_data, api_params)
+        _response_cache.put(key, response)
+    return response
+
+
+def render_weather_response(
+    weather_data: dict, location_data: dict, api_params: dict
 ) -> str:
     city = location_data.get("city", "")
     state = location_data.get("state", "")
@@ -1,35 +1,57 @@
 from bot.logger_config import logger
 from aiogram.types import CallbackQuery
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 from db.database import get_session
-from db.crud import get_user_weather_settings, get_api_parameters
-from services.weather import get_weather
+from db.crud import get_user_weather_settings, build_api_parameters
+from db.models import UserWeatherSettings
+from services.weather import get_cached_weather
+from services.hourly import DEFAULT_HOURLY_PAGE, hourly_view, render_hourly_view
+from services.views import WEEK_DAYS, full_window_params, project_forecast
+from bot.callbacks import HourlyPage
 from bot.keyboards import WeatherKeyboards
 from bot.handlers.utils import format_weather_response
 from aiogram.exceptions import TelegramBadRequest
 
 
-async def current_weather_callback(call: CallbackQuery):
-    await call.answer()
-    try:
-        async for session in get_session():
-            api_params = await get_api_parameters(session, call.from_user.id)
-            settings = await get_user_weather_settings(session, call.from_user.id)
-
-        if not settings.latitude or not settings.longitude:
-            await call.message.edit_text(
-                "❌ **Локація не встановлена**\n\nСпочатку встанови свою локацію в налаштуваннях або надішли назву міста.",
-                reply_markup=WeatherKeyboards.location_settings(),
-                parse_mode="Markdown",
-            )
-            return
+async def load_forecast(
+    call: CallbackQuery,
+) -> Optional[Tuple[UserWeatherSettings, Dict[str, Any], Dict[str, Any]]]:
+    # Усі вкладки меню погоди читають одну відповідь на локацію з кешу прогнозів:
+    # перемикання між ними не робить запитів до Open-Meteo
+    async for session in get_session():
+        settings = await get_user_weather_settings(session, call.from_user.id)
 
-        api_params["current"] = (
-            "temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m,wind_direction_10m"
+    if not settings.latitude or not settings.longitude:
+        await call.message.edit_text(
+            "❌ **Локація не встановлена**\n\nСпочатку встанови свою локацію в налаштуваннях або надішли назву міста.",
+            reply_markup=WeatherKeyboards.location_settings(),
+            parse_mode="Markdown",
         )
+        return None
+
+    api_params = build_api_parameters(settings)
+    weather_data = await get_cached_weather(
+        settings.latitude, settings.longitude, full_window_params(api_params)
+    )
+    return settings, api_params, weather_data
 
-        weather_data = await get_weather(
-            settings.latitude, settings.longitude, api_params
+
+async def show_forecast_view(
+    call: CallbackQuery, days: Optional[int], always_current: bool
+):
+    try:
+        loaded = await load_forecast(call)
+        if loaded is None:
+            return
+        settings, api_params, weather_data = loaded
+
+        days = days or settings.forecast_days or WEEK_DAYS
+        include_current = always_current or "current" in api_params
+        view_data = project_forecast(
+            weather_data, settings.past_days, days, include_current
         )
+        view_params = {**api_params, "forecast_days": days}
 
         location_data = {
             "city": settings.location_name or "Невідома локація",
@@ -37,9 +59,7 @@ async def current_weather_callback(call: CallbackQuery):
             "lon": settings.longitude,
         }
 
-        response = await format_weather_response(
-            weather_data, location_data, api_params
-        )
+        response = await format_weather_response(view_data, location_data, view_params)
 
         await call.message.edit_text(
             response,
@@ -55,115 +75,57 @@ async def current_weather_callback(call: CallbackQuery):
                 f"❌ Помилка отримання погоди: {str(e)}",
                 reply_markup=WeatherKeyboards.main_menu(),
             )
-            logger.error(
-                f"Помилка отримання поточної погоди для {call.from_user.id}: {str(e)}"
-            )
+            logger.error(f"Помилка отримання погоди для {call.from_user.id}: {str(e)}")
 
 
-async def weekly_weather_callback(call: CallbackQuery):
-    await call.answer("Отримуємо тижневий прогноз...")
-    await current_weather_callback(call)
+async def current_weather_callback(call: CallbackQuery):
+    await call.answer()
+    # Поточна погода і щоденний прогноз на кількість днів з налаштувань
+    await show_forecast_view(call, None, always_current=True)
 
 
-async def hourly_weather_callback(call: CallbackQuery):
-    await call.answer("Почасовий прогноз поки в розробці", show_alert=True)
+async def weekly_weather_callback(call: CallbackQuery):
+    await call.answer("Отримуємо тижневий прогноз...")
+    await show_forecast_view(call, WEEK_DAYS, always_current=True)
 
 
-async def today_weather_callback(call: CallbackQuery):
-    await call.answer("Отримуємо прогноз на сьогодні...")
+async def hourly_weather_callback(
+    call: CallbackQuery, callback_data: Optional[HourlyPage] = None
+):
+    await call.answer()
+    offset, hours = 0, DEFAULT_HOURLY_PAGE
+    if callback_data is not None:
+        offset, hours = callback_data.offset, callback_data.hours
     try:
-        async for session in get_session():
-            settings = await get_user_weather_settings(session, call.from_user.id)
-            if not settings.latitude or not settings.longitude:
-                await call.message.edit_text(
-                    "❌ Локація не встановлена. Вкажіть місто або координати.",
-                    reply_markup=WeatherKeyboards.main_menu(),
-                )
-                return
-            api_params = await get_api_parameters(session, call.from_user.id)
-            api_params["forecast_days"] = 1
-            api_params["daily"] = (
-                "weather_code,temperature_2m_max,temperature_2m_min,sunrise,sunset,precipitation_sum,precipitation_probability_max,wind_speed_10m_max"
-            )
-
-            weather_data = await get_weather(
-                settings.latitude, settings.longitude, api_params
-            )
-
-            location_data = {
-                "city": settings.location_name or "Невідома локація",
-                "lat": settings.latitude,
-                "lon": settings.longitude,
-            }
-
-            response = await format_weather_response(
-                weather_data, location_data, api_params
-            )
-
-            await call.message.edit_text(
-                response,
-                reply_markup=WeatherKeyboards.weather_type_menu(),
-                parse_mode="Markdown",
-            )
+        loaded = await load_forecast(call)
+        if loaded is None:
+            return
+        settings, _, weather_data = loaded
 
+        view = hourly_view(weather_data, offset, hours, datetime.now(timezone.utc))
+        await call.message.edit_text(
+            render_hourly_view(settings.location_name or "Невідома локація", view),
+            reply_markup=WeatherKeyboards.hourly_pager(view.offset, view.hours, view.total),
+            parse_mode="Markdown",
+        )
     except Exception as e:
         if isinstance(e, TelegramBadRequest) and "message is not modified" in str(e):
             pass
         else:
             await call.message.edit_text(
-                f"❌ Помилка отримання прогнозу: {str(e)}",
+                f"❌ Помилка отримання почасового прогнозу: {str(e)}",
                 reply_markup=WeatherKeyboards.main_menu(),
             )
             logger.error(
-                f"Помилка отримання прогнозу на сьогодні для {call.from_user.id}: {str(e)}"
+                f"Помилка отримання почасового прогнозу для {call.from_user.id}: {str(e)}"
             )
 
 
-async def three_days_weather_callback(call: CallbackQuery):
-    await call.answer("Отримуємо прогноз на 3 дні...")
-    try:
-        async for session in get_session():
-            api_params = await get_api_parameters(session, call.from_user.id)
-            settings = await get_user_weather_settings(session, call.from_user.id)
-
-        if not settings.latitude or not settings.longitude:
-            await call.message.edit_text(
-                "❌ **Локація не встановлена**\n\nСпочатку встанови свою локацію в налаштуваннях або надішли назву міста.",
-                reply_markup=WeatherKeyboards.location_settings(),
-                parse_mode="Markdown",
-            )
-            return
-
-        api_params["current"] = (
-            "temperature_2m,relative_humidity_2m,apparent_temperature,weather_code,wind_speed_10m,wind_direction_10m"
-        )
-        api_params["forecast_days"] = 3
-
-        weather_data = await get_weather(
-            settings.latitude, settings.longitude, api_params
-        )
-
-        location_data = {
-            "city": settings.location_name or "Невідома локація",
-            "lat": settings.latitude,
-            "lon": settings.longitude,
-        }
+async def today_weather_callback(call: CallbackQuery):
+    await call.answer("Отримуємо прогноз на сьогодні...")
+    await show_forecast_view(call, 1, always_current=False)
 
-        response = await format_weather_response(
-            weather_data, location_data, api_params
-        )
 
-        await call.message.edit_text(
-            response,
-            reply_markup=WeatherKeyboards.weather_type_menu(),
-            parse_mode="Markdown",
-        )
-    except Exception as e:
-        if isinstance(e, TelegramBadRequest) and "message is not modified" in str(e):
-            pass
-        else:
-            await call.message.edit_text(
-                f"❌ Помилка отримання погоди: {str(e)}",
-                reply_markup=WeatherKeyboards.main_menu(),
-            )
-            logger.error(f"Помилка отримання погоди для {call.from_user.id}: {str(e)}")
+async def three_days_weather_callback(call: CallbackQuery):
+    await call.answer("Отримуємо прогноз на 3 дні...")
+    await show_forecast_view(call, 3, always_current=True)
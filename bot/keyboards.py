@@ -1,10 +1,55 @@
 
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from functools import lru_cache, wraps
 from typing import Dict, Any
 
+from bot.callbacks import HourlyPage, SetForecast, SetTimezone, SetUnit, Toggle
+from services.hourly import HOURLY_PAGE_SIZES
+
+# Скільки варіантів кожної параметризованої клавіатури тримати в пам'яті
+KEYBOARD_CACHE_SIZE = 256
+_DICT = object()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return (_DICT, tuple(sorted(value.items())))
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, tuple) and value and value[0] is _DICT:
+        return dict(value[1])
+    return value
+
+
+def cached_keyboard(build):
+    # Клавіатура будується один раз на набір аргументів (словники — за вмістом).
+    # Екземпляри спільні для всіх викликів, тож змінювати їх після отримання не можна
+    @lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+    def cached(args, kwargs):
+        return build(*map(_thaw, args), **{key: _thaw(value) for key, value in kwargs})
+
+    @wraps(build)
+    def wrapper(*args, **kwargs):
+        key = (
+            tuple(map(_freeze, args)),
+            tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())),
+        )
+        try:
+            return cached(*key)
+        except TypeError:
+            # Нехешовані значення в аргументах — будуємо без кешу
+            return build(*args, **kwargs)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
 class WeatherKeyboards:
     @staticmethod
+    @cached_keyboard
     def forecast_past_days_selector(current: int = 0) -> InlineKeyboardMarkup:
         keyboard = []
         days_options = [0, 1, 2, 3, 5, 7]
@@ -13,11 +58,12 @@ class WeatherKeyboards:
             text = f"{emoji} {days} {'день' if days == 1 else ('дні' if 1 < days < 5 else 'днів' if days > 0 else 'немає')}"
             keyboard.append([InlineKeyboardButton(
                 text=text,
-                callback_data=f"set_forecast:past_days:{days}"
+                callback_data=SetForecast(field="past_days", days=days).pack()
             )])
         keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:forecast")])
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     @staticmethod
+    @cached_keyboard
     def main_menu() -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(text="🌦️ Поточна погода", callback_data="weather:current")],
@@ -34,6 +80,7 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def settings_menu() -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(text="📍 Локація та часовий пояс", callback_data="settings:location")],
@@ -47,6 +94,7 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def location_settings() -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(text="🌍 Встановити локацію", callback_data="location:set")],
@@ -57,6 +105,7 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def units_settings(current_units: Dict[str, str] = None) -> InlineKeyboardMarkup:
         if not current_units:
             current_units = {
@@ -81,21 +130,23 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def temperature_unit_selector(current: str = 'celsius') -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(
                 text=f"{'✅' if current == 'celsius' else '⚪'} Цельсій (°C)", 
-                callback_data="set_unit:temperature_unit:celsius"
+                callback_data=SetUnit(unit_type="temperature_unit", value="celsius").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{'✅' if current == 'fahrenheit' else '⚪'} Фаренгейт (°F)", 
-                callback_data="set_unit:temperature_unit:fahrenheit"
+                callback_data=SetUnit(unit_type="temperature_unit", value="fahrenheit").pack()
             )],
             [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:units")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def wind_speed_unit_selector(current: str = 'kmh') -> InlineKeyboardMarkup:
         options = {
             'kmh': 'Кілометри/година (км/год)',
@@ -109,7 +160,7 @@ class WeatherKeyboards:
             emoji = "✅" if current == unit else "⚪"
             keyboard.append([InlineKeyboardButton(
                 text=f"{emoji} {label}", 
-                callback_data=f"set_unit:wind_speed_unit:{unit}"
+                callback_data=SetUnit(unit_type="wind_speed_unit", value=unit).pack()
             )])
         
         keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:units")])
@@ -118,21 +169,39 @@ class WeatherKeyboards:
     
 
     @staticmethod
+    @cached_keyboard
+    def precipitation_unit_selector(current: str = 'mm') -> InlineKeyboardMarkup:
+        keyboard = [
+            [InlineKeyboardButton(
+                text=f"{'✅' if current == 'mm' else '⚪'} Міліметри (мм)",
+                callback_data=SetUnit(unit_type="precipitation_unit", value="mm").pack()
+            )],
+            [InlineKeyboardButton(
+                text=f"{'✅' if current == 'inch' else '⚪'} Дюйми (inch)",
+                callback_data=SetUnit(unit_type="precipitation_unit", value="inch").pack()
+            )],
+            [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:units")]
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+    @staticmethod
+    @cached_keyboard
     def timeformat_unit_selector(current: str = 'iso8601') -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(
                 text=f"{'✅' if current == 'iso8601' else '⚪'} ISO8601 (2025-09-28T16:55:01Z)", 
-                callback_data="set_unit:timeformat:iso8601"
+                callback_data=SetUnit(unit_type="timeformat", value="iso8601").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{'✅' if current == 'unixtime' else '⚪'} Unix Timestamp (1625097600)", 
-                callback_data="set_unit:timeformat:unixtime"
+                callback_data=SetUnit(unit_type="timeformat", value="unixtime").pack()
             )],
             [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:units")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @cached_keyboard
     def display_settings(settings: Dict[str, bool] = None) -> InlineKeyboardMarkup:
         if not settings:
             settings = {}
@@ -144,62 +213,63 @@ class WeatherKeyboards:
             [InlineKeyboardButton(text="📊 Що показувати в поточній погоді:", callback_data="noop")],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_temperature')} Температура", 
-                callback_data="toggle:show_temperature"
+                callback_data=Toggle(setting="show_temperature").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_feels_like')} Відчувається як", 
-                callback_data="toggle:show_feels_like"
+                callback_data=Toggle(setting="show_feels_like").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_humidity')} Вологість", 
-                callback_data="toggle:show_humidity"
+                callback_data=Toggle(setting="show_humidity").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_pressure', False)} Тиск", 
-                callback_data="toggle:show_pressure"
+                callback_data=Toggle(setting="show_pressure").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_wind')} Вітер", 
-                callback_data="toggle:show_wind"
+                callback_data=Toggle(setting="show_wind").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_precipitation')} Опади", 
-                callback_data="toggle:show_precipitation"
+                callback_data=Toggle(setting="show_precipitation").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_precipitation_probability')} Ймовірність опадів", 
-                callback_data="toggle:show_precipitation_probability"
+                callback_data=Toggle(setting="show_precipitation_probability").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_cloud_cover', False)} Хмарність", 
-                callback_data="toggle:show_cloud_cover"
+                callback_data=Toggle(setting="show_cloud_cover").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_uv_index')} УФ-індекс", 
-                callback_data="toggle:show_uv_index"
+                callback_data=Toggle(setting="show_uv_index").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_visibility', False)} Видимість", 
-                callback_data="toggle:show_visibility"
+                callback_data=Toggle(setting="show_visibility").pack()
             )],
             [InlineKeyboardButton(text="📅 Денний прогноз:", callback_data="noop")],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_daily_temperature')} Макс/мін температура", 
-                callback_data="toggle:show_daily_temperature"
+                callback_data=Toggle(setting="show_daily_temperature").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_sunrise_sunset')} Схід/захід сонця", 
-                callback_data="toggle:show_sunrise_sunset"
+                callback_data=Toggle(setting="show_sunrise_sunset").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_daylight_duration', False)} Тривалість дня", 
-                callback_data="toggle:show_daylight_duration"
+                callback_data=Toggle(setting="show_daylight_duration").pack()
             )],
             [InlineKeyboardButton(text="⬅️ Назад до налаштувань", callback_data="menu:settings")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def forecast_settings(settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         if not settings:
             settings = {'forecast_days': 7, 'past_days': 0}
@@ -218,6 +288,7 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def forecast_days_selector(current: int = 7) -> InlineKeyboardMarkup:
         keyboard = []
         days_options = [1, 3, 5, 7, 10, 14, 16]
@@ -227,13 +298,14 @@ class WeatherKeyboards:
             text = f"{emoji} {days} {'день' if days == 1 else ('дні' if days < 5 else 'днів')}"
             keyboard.append([InlineKeyboardButton(
                 text=text, 
-                callback_data=f"set_forecast:days:{days}"
+                callback_data=SetForecast(field="days", days=days).pack()
             )])
         
         keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:forecast")])
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def notifications_settings(settings: Dict[str, Any] = None) -> InlineKeyboardMarkup:
         if not settings:
             settings = {'notification_enabled': False, 'notification_time': None}
@@ -244,7 +316,7 @@ class WeatherKeyboards:
         keyboard = [
             [InlineKeyboardButton(
                 text=f"{'✅' if enabled else '❌'} Щоденні сповіщення",
-                callback_data="toggle:notification_enabled"
+                callback_data=Toggle(setting="notification_enabled").pack()
             )],
             [InlineKeyboardButton(
                 text=f"⏰ Час сповіщень: {time_text}",
@@ -259,20 +331,22 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=[row for row in keyboard if row])
 
     @staticmethod
+    @cached_keyboard
     def timezone_selector() -> InlineKeyboardMarkup:
         keyboard = [
-            [InlineKeyboardButton(text="🌐 Автоматично", callback_data="set_timezone:auto")],
-            [InlineKeyboardButton(text="🇺🇦 Київ (Europe/Kyiv)", callback_data="set_timezone:Europe/Kyiv")],
-            [InlineKeyboardButton(text="🌍 GMT", callback_data="set_timezone:GMT")],
-            [InlineKeyboardButton(text="🇺🇸 Нью-Йорк", callback_data="set_timezone:America/New_York")],
-            [InlineKeyboardButton(text="🇬🇧 Лондон", callback_data="set_timezone:Europe/London")],
-            [InlineKeyboardButton(text="🇩🇪 Берлін", callback_data="set_timezone:Europe/Berlin")],
-            [InlineKeyboardButton(text="🇯🇵 Токіо", callback_data="set_timezone:Asia/Tokyo")],
+            [InlineKeyboardButton(text="🌐 Автоматично", callback_data=SetTimezone(timezone="auto").pack())],
+            [InlineKeyboardButton(text="🇺🇦 Київ (Europe/Kyiv)", callback_data=SetTimezone(timezone="Europe/Kyiv").pack())],
+            [InlineKeyboardButton(text="🌍 GMT", callback_data=SetTimezone(timezone="GMT").pack())],
+            [InlineKeyboardButton(text="🇺🇸 Нью-Йорк", callback_data=SetTimezone(timezone="America/New_York").pack())],
+            [InlineKeyboardButton(text="🇬🇧 Лондон", callback_data=SetTimezone(timezone="Europe/London").pack())],
+            [InlineKeyboardButton(text="🇩🇪 Берлін", callback_data=SetTimezone(timezone="Europe/Berlin").pack())],
+            [InlineKeyboardButton(text="🇯🇵 Токіо", callback_data=SetTimezone(timezone="Asia/Tokyo").pack())],
             [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:location")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def weather_type_menu() -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(text="☀️ Поточна погода", callback_data="weather:current")],
@@ -285,6 +359,35 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
+    def hourly_pager(offset: int = 0, hours: int = 6, total: int = 0) -> InlineKeyboardMarkup:
+        navigation = []
+        if offset > 0:
+            navigation.append(InlineKeyboardButton(
+                text=f"◀️ -{hours} год",
+                callback_data=HourlyPage(offset=max(offset - hours, 0), hours=hours).pack()
+            ))
+        if offset + hours < total:
+            navigation.append(InlineKeyboardButton(
+                text=f"+{hours} год ▶️",
+                callback_data=HourlyPage(offset=offset + hours, hours=hours).pack()
+            ))
+        sizes = [
+            InlineKeyboardButton(
+                text=f"{'✅ ' if size == hours else ''}{size} год",
+                callback_data=HourlyPage(offset=offset, hours=size).pack()
+            )
+            for size in HOURLY_PAGE_SIZES
+        ]
+        keyboard = [
+            navigation,
+            sizes,
+            [InlineKeyboardButton(text="⬅️ Назад", callback_data="menu:main")]
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=[row for row in keyboard if row])
+
+    @staticmethod
+    @cached_keyboard
     def confirmation_dialog(action: str, item: str) -> InlineKeyboardMarkup:
         keyboard = [
             [
@@ -295,12 +398,14 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def back_button(callback_data: str = "menu:main") -> InlineKeyboardMarkup:
         return InlineKeyboardMarkup(inline_keyboard=[[
             InlineKeyboardButton(text="⬅️ Назад", callback_data=callback_data)
         ]])
 
     @staticmethod
+    @cached_keyboard
     def location_input_help() -> InlineKeyboardMarkup:
         keyboard = [
             [InlineKeyboardButton(text="📍 Надіслати геолокацію", callback_data="location:share")],
@@ -309,6 +414,7 @@ class WeatherKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
     @staticmethod
+    @cached_keyboard
     def advanced_display_settings(settings: Dict[str, bool] = None) -> InlineKeyboardMarkup:
         if not settings:
             settings = {}
@@ -320,19 +426,19 @@ class WeatherKeyboards:
             [InlineKeyboardButton(text="🔬 Додаткові параметри:", callback_data="noop")],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_dew_point')} Точка роси", 
-                callback_data="toggle:show_dew_point"
+                callback_data=Toggle(setting="show_dew_point").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_solar_radiation')} Сонячна радіація", 
-                callback_data="toggle:show_solar_radiation"
+                callback_data=Toggle(setting="show_solar_radiation").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_sunshine_duration')} Тривалість сонячного світла", 
-                callback_data="toggle:show_sunshine_duration"
+                callback_data=Toggle(setting="show_sunshine_duration").pack()
             )],
             [InlineKeyboardButton(
                 text=f"{get_emoji('show_current_weather')} Поточні умови", 
-                callback_data="toggle:show_current_weather"
+                callback_data=Toggle(setting="show_current_weather").pack()
             )],
             [InlineKeyboardButton(text="⬅️ Назад", callback_data="settings:display")]
         ]
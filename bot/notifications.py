@@ -1,65 +1,565 @@
 import asyncio
-import datetime
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
 from bot.logger_config import logger
 
-from aiogram.enums import ParseMode
-from bot.keyboards import WeatherKeyboards
 from bot.handlers.utils import format_weather_response
-from db.crud import get_api_parameters
-from services.weather import get_weather
+from db.crud import (
+    advance_next_fire_times,
+    build_api_parameters,
+    enqueue_notifications,
+    add_schedule_listener,
+    remove_schedule_listener,
+)
+from services.markdown import escape_markdown
+from services.weather import WeatherService, get_weather_batch
+from services.schedule import next_fire_at_for, parse_schedule_payload
+from bot.sharding import ShardLeases
 from db.models import UserWeatherSettings
-from db.session import async_session
-from sqlalchemy import select
+from db.session import async_session, engine
+from sqlalchemy import select, true
 
+# Скільки часу наперед тримаємо в пам'яті і як часто довантажуємо вікно з БД
+WHEEL_WINDOW = timedelta(hours=6)
+WHEEL_REFRESH = timedelta(minutes=30)
+REFRESH_RETRY = timedelta(minutes=1)
+# Як часто процес звіряє свою частку шардів з кількістю живих учасників
+SHARD_REBALANCE = timedelta(seconds=15)
+# Старіші сповіщення після простою не надсилаємо — лише переносимо на наступну добу
+MAX_LATENESS = timedelta(hours=1)
+# Два знаки (~1 км) — точніше за сітку моделей Open-Meteo, тож прогноз не змінюється
+FORECAST_CELL_DIGITS = 2
+# За скільки до хвилини сповіщення готуємо тексти і скільки тримаємо в пам'яті
+PRERENDER_LEAD = timedelta(minutes=3)
+PRERENDER_LIMIT = 20000
 
-async def daily_notifications_scheduler(bot):
-    while True:
-        now = datetime.datetime.now().strftime("%H:%M")
+
+def following_fire_at(
+    settings: UserWeatherSettings, now: datetime
+) -> Optional[datetime]:
+    return next_fire_at_for(
+        settings.notification_enabled,
+        settings.notification_minute,
+        settings.timezone,
+        settings.resolved_timezone,
+        settings.longitude,
+        now=now,
+    )
+
+
+async def backfill_next_fire_at(session, now: datetime) -> int:
+    # Рядки, створені до появи next_fire_at, отримують розклад при старті
+    result = await session.execute(
+        select(UserWeatherSettings).where(
+            UserWeatherSettings.notification_enabled.is_(True),
+            UserWeatherSettings.next_fire_at.is_(None),
+        )
+    )
+    advanced = await advance_next_fire_times(
+        session,
+        [
+            (settings.user_id, None, following_fire_at(settings, now))
+            for settings in result.scalars().all()
+        ],
+    )
+    await session.commit()
+    return len(advanced)
+
+
+class TimingWheel:
+    # Кошики по хвилинах + купа номерів кошиків: O(log n) на вставку і вибірку,
+    # O(1) на скасування (порожні кошики прибираються з купи ліниво)
+
+    def __init__(self):
+        self._buckets: Dict[int, Set[int]] = {}
+        self._heap: List[int] = []
+        self._slots: Dict[int, int] = {}
+
+    @staticmethod
+    def _slot(moment: datetime) -> int:
+        return int(moment.timestamp()) // 60
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._slots
+
+    def schedule(self, user_id: int, fire_at: Optional[datetime]) -> None:
+        self.cancel(user_id)
+        if fire_at is None:
+            return
+        slot = self._slot(fire_at)
+        bucket = self._buckets.get(slot)
+        if bucket is None:
+            bucket = self._buckets[slot] = set()
+            heapq.heappush(self._heap, slot)
+        bucket.add(user_id)
+        self._slots[user_id] = slot
+
+    def cancel(self, user_id: int) -> None:
+        slot = self._slots.pop(user_id, None)
+        if slot is None:
+            return
+        bucket = self._buckets[slot]
+        bucket.discard(user_id)
+        if not bucket:
+            del self._buckets[slot]
+
+    def next_fire_at(self) -> Optional[datetime]:
+        while self._heap and self._heap[0] not in self._buckets:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return datetime.fromtimestamp(self._heap[0] * 60, timezone.utc)
+
+    def slots_until(self, moment: datetime) -> List[Tuple[datetime, List[int]]]:
+        # Без вилучення: для попередньої підготовки хвилин, що скоро настануть
+        last_slot = self._slot(moment)
+        return [
+            (datetime.fromtimestamp(slot * 60, timezone.utc), list(self._buckets[slot]))
+            for slot in sorted(slot for slot in self._buckets if slot <= last_slot)
+        ]
+
+    def next_slot_after(self, moment: datetime) -> Optional[datetime]:
+        after = self._slot(moment)
+        later = [slot for slot in self._buckets if slot > after]
+        if not later:
+            return None
+        return datetime.fromtimestamp(min(later) * 60, timezone.utc)
+
+    def retain(self, predicate) -> None:
+        for user_id in list(self._slots):
+            if not predicate(user_id):
+                self.cancel(user_id)
+
+    def pop_due(self, now: datetime) -> List[Tuple[datetime, List[int]]]:
+        # Усі хвилини до now включно, від найстарішої — так пропущені після простою
+        # хвилини обробляються в тому ж порядку, що й без нього
+        due_slot = self._slot(now)
+        due = []
+        while self._heap and self._heap[0] <= due_slot:
+            slot = heapq.heappop(self._heap)
+            bucket = self._buckets.pop(slot, None)
+            if not bucket:
+                continue
+            for user_id in bucket:
+                del self._slots[user_id]
+            due.append((datetime.fromtimestamp(slot * 60, timezone.utc), list(bucket)))
+        return due
+
+
+def forecast_cell(latitude: float, longitude: float) -> Tuple[float, float]:
+    return round(latitude, FORECAST_CELL_DIGITS), round(longitude, FORECAST_CELL_DIGITS)
+
+
+def notification_key(settings: UserWeatherSettings) -> Tuple:
+    # Усе, від чого залежить текст сповіщення: параметри запиту, клітинка, назва
+    params = build_api_parameters(settings)
+    request_key = tuple(
+        sorted(
+            (key, value)
+            for key, value in params.items()
+            if key not in ("latitude", "longitude")
+        )
+    )
+    cell = forecast_cell(settings.latitude, settings.longitude)
+    return request_key, cell, settings.location_name or "Ваша локація"
+
+
+async def render_notifications(
+    users_settings: List[UserWeatherSettings],
+) -> Dict[int, str]:
+    # Групуємо за параметрами запиту, всередині — за клітинкою прогнозу: один
+    # пакетний запит на групу параметрів і один рендер на клітинку й назву локації
+    groups: Dict[Tuple, Dict[Tuple[float, float], List[UserWeatherSettings]]] = {}
+    for settings in users_settings:
         try:
-            async with async_session() as session:
+            request_key, cell, _ = notification_key(settings)
+        except ValueError as e:
+            logger.warning(f"Сповіщення для {settings.user_id} пропущено: {e}")
+            continue
+        groups.setdefault(request_key, {}).setdefault(cell, []).append(settings)
+
+    texts: Dict[int, str] = {}
+    requests = 0
+    for request_key, cells in groups.items():
+        params = dict(request_key)
+        coordinates = list(cells)
+        requests += -(-len(coordinates) // WeatherService.MAX_BATCH_LOCATIONS)
+        try:
+            forecasts = await get_weather_batch(coordinates, params)
+        except Exception as e:
+            logger.error(f"Помилка отримання прогнозу для {len(coordinates)} локацій: {e}")
+            continue
+
+        for cell, weather_data in zip(coordinates, forecasts):
+            rendered: Dict[str, str] = {}
+            for settings in cells[cell]:
+                city = settings.location_name or "Ваша локація"
+                if city not in rendered:
+                    # Назва локації від користувача чи геокодера, а текст — Markdown
+                    location_data = {
+                        "city": escape_markdown(city),
+                        "lat": cell[0],
+                        "lon": cell[1],
+                    }
+                    response = await format_weather_response(
+                        weather_data, location_data, params
+                    )
+                    rendered[city] = f"🔔 Щоденна погода:\n\n{response}"
+                texts[settings.user_id] = rendered[city]
+
+    cells_count = sum(len(cells) for cells in groups.values())
+    logger.info(
+        f"Підготовлено сповіщення: {len(users_settings)} користувачів, {cells_count} клітинок, {requests} запитів"
+    )
+    return texts
+
+
+class PrerenderBuffer:
+    # Обмежений буфер готових текстів; запис діє лише для того ж моменту і тих
+    # самих налаштувань, з якими його підготовлено, інакше текст рендериться заново
+
+    def __init__(self, limit: int = PRERENDER_LIMIT):
+        self.limit = limit
+        self._entries: Dict[int, Tuple[datetime, Tuple, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    def put(self, settings: UserWeatherSettings, text: str) -> bool:
+        if len(self._entries) >= self.limit and settings.user_id not in self._entries:
+            return False
+        self._entries[settings.user_id] = (
+            settings.next_fire_at,
+            notification_key(settings),
+            text,
+        )
+        return True
+
+    def take(self, settings: UserWeatherSettings) -> Optional[str]:
+        entry = self._entries.pop(settings.user_id, None)
+        if entry is None:
+            return None
+        fire_at, key, text = entry
+        try:
+            if fire_at == settings.next_fire_at and key == notification_key(settings):
+                return text
+        except ValueError:
+            pass
+        return None
+
+    def discard(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def retain(self, predicate) -> None:
+        for user_id in list(self._entries):
+            if not predicate(user_id):
+                del self._entries[user_id]
+
+    def prune(self, before: datetime) -> None:
+        # Записи, чия хвилина вже минула без розсилки (напр. користувач вимкнув сповіщення)
+        for user_id, (fire_at, _, _) in list(self._entries.items()):
+            if fire_at < before:
+                del self._entries[user_id]
+
+
+class NotificationScheduler:
+    def __init__(
+        self,
+        bot,
+        window: timedelta = WHEEL_WINDOW,
+        shards: Optional[ShardLeases] = None,
+    ):
+        self.bot = bot
+        self.window = window
+        self.shards = shards
+        self.wheel = TimingWheel()
+        self.buffer = PrerenderBuffer()
+        self._prerendered: Set[datetime] = set()
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh = datetime.min.replace(tzinfo=timezone.utc)
+        self._next_rebalance = datetime.min.replace(tzinfo=timezone.utc)
+        self._wakeup = asyncio.Event()
+
+    def owns(self, user_id: int) -> bool:
+        return self.shards is None or self.shards.owns(user_id)
+
+    def _owned_condition(self):
+        if self.shards is None:
+            return true()
+        return (UserWeatherSettings.user_id % self.shards.num_shards).in_(
+            sorted(self.shards.owned)
+        )
+
+    def track(self, user_id: int, next_fire_at: Optional[datetime]) -> None:
+        # Поза завантаженим вікном користувача підхопить наступне оновлення з БД
+        if (
+            self.owns(user_id)
+            and next_fire_at is not None
+            and self._loaded_until is not None
+            and next_fire_at <= self._loaded_until
+        ):
+            self.wheel.schedule(user_id, next_fire_at)
+        else:
+            self.wheel.cancel(user_id)
+
+    def on_schedule_change(self, user_id: int, next_fire_at: Optional[datetime]):
+        self.track(user_id, next_fire_at)
+        self.buffer.discard(user_id)
+        self._wakeup.set()
+
+    def on_schedule_notify(self, payload: str) -> None:
+        try:
+            self.on_schedule_change(*parse_schedule_payload(payload))
+        except ValueError as e:
+            logger.warning(f"Некоректне повідомлення розкладу '{payload}': {e}")
+
+    async def rebalance(self, now: datetime) -> None:
+        if self.shards is None:
+            return
+        try:
+            if not self.shards.started:
+                await self.shards.start()
+                await self.shards.listen(self.on_schedule_notify)
+            changed = await self.shards.rebalance()
+        except Exception as e:
+            logger.error(f"Помилка розподілу шардів планувальника: {e}")
+            # Без з'єднання locks втрачено — не розсилаємо, доки не отримаємо шарди знову
+            await self.shards.close()
+            changed = True
+        self._next_rebalance = now + SHARD_REBALANCE
+        if changed:
+            # Чужих користувачів прибираємо одразу, нові шарди довантажуємо з БД
+            self.wheel.retain(self.owns)
+            self.buffer.retain(self.owns)
+            self._next_refresh = now
+
+    async def refresh_window(self, now: datetime) -> None:
+        horizon = now + self.window
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    UserWeatherSettings.user_id, UserWeatherSettings.next_fire_at
+                ).where(
+                    UserWeatherSettings.notification_enabled.is_(True),
+                    UserWeatherSettings.next_fire_at <= horizon,
+                    self._owned_condition(),
+                )
+            )
+            rows = result.all()
+        self._loaded_until = horizon
+        for user_id, next_fire_at in rows:
+            self.wheel.schedule(user_id, next_fire_at)
+        logger.info(
+            f"Розклад сповіщень оновлено: {len(self.wheel)} до {horizon:%H:%M} UTC"
+        )
 
-                stmt = select(UserWeatherSettings).where(
+    async def dispatch(self, fire_at: datetime, user_ids: List[int]) -> None:
+        async with async_session() as session:
+            # Повторна перевірка в БД відсіює записи, змінені після завантаження вікна
+            result = await session.execute(
+                select(UserWeatherSettings).where(
+                    UserWeatherSettings.user_id.in_(user_ids),
                     UserWeatherSettings.notification_enabled.is_(True),
-                    UserWeatherSettings.notification_time == now,
+                    UserWeatherSettings.next_fire_at <= datetime.now(timezone.utc),
+                    # Шард міг перейти до іншого процесу, поки хвилина чекала в колесі
+                    self._owned_condition(),
+                )
+            )
+            users_settings = result.scalars().all()
+
+            now = datetime.now(timezone.utc)
+            ready, late = [], []
+            for settings in users_settings:
+                if now - settings.next_fire_at > MAX_LATENESS:
+                    late.append(settings)
+                else:
+                    ready.append(settings)
+
+            texts: Dict[int, str] = {}
+            to_render = []
+            for settings in ready:
+                text = self.buffer.take(settings)
+                if text is None:
+                    to_render.append(settings)
+                else:
+                    texts[settings.user_id] = text
+            if to_render:
+                texts.update(await render_notifications(to_render))
+            if ready:
+                logger.info(
+                    f"Сповіщення за {fire_at:%H:%M} UTC: {len(ready) - len(to_render)} з {len(ready)} підготовлено заздалегідь"
+                )
+
+            notifications, enqueued, failed = [], [], []
+            for settings in ready:
+                text = texts.get(settings.user_id)
+                if text is None:
+                    failed.append(settings)
+                    continue
+                enqueued.append(settings)
+                notifications.append(
+                    {
+                        "user_id": settings.user_id,
+                        "fire_at": settings.next_fire_at,
+                        "text": text,
+                    }
+                )
+
+            # Постановка в чергу і перенесення розкладу (запізнілих теж) — одна
+            # транзакція: після збою хвилина обробиться повторно, а дублікати
+            # відсіє (user_id, fire_at). Кого не вдалося підготувати, лишається
+            # з тим самим next_fire_at і повториться, доки не стане запізнілим
+            await enqueue_notifications(session, notifications)
+            await self._advance(session, late + enqueued)
+
+        if failed:
+            logger.error(
+                f"Не вдалося підготувати {len(failed)} сповіщень за {fire_at:%H:%M} UTC, повтор за {REFRESH_RETRY}"
+            )
+            retry_at = datetime.now(timezone.utc) + REFRESH_RETRY
+            self._next_refresh = min(self._next_refresh, retry_at)
+        if late:
+            logger.warning(
+                f"Пропущено {len(late)} сповіщень за {fire_at:%H:%M} UTC: запізнення понад {MAX_LATENESS}"
+            )
+
+    async def prerender(self, now: datetime) -> None:
+        # Прогноз і текст для хвилин у межах PRERENDER_LEAD готуються наперед,
+        # тож у момент розсилки лишається тільки постановка в чергу
+        self._prerendered = {moment for moment in self._prerendered if moment > now}
+        self.buffer.prune(now - MAX_LATENESS)
+
+        for fire_at, user_ids in self.wheel.slots_until(now + PRERENDER_LEAD):
+            if fire_at <= now or fire_at in self._prerendered:
+                continue
+            self._prerendered.add(fire_at)
+
+            pending = [user_id for user_id in user_ids if user_id not in self.buffer]
+            room = self.buffer.limit - len(self.buffer)
+            if len(pending) > room:
+                logger.warning(
+                    f"Буфер сповіщень заповнено: {len(pending) - room} за {fire_at:%H:%M} UTC готуватимуться в момент розсилки"
+                )
+                pending = pending[:room]
+            if not pending:
+                continue
+
+            async with async_session() as session:
+                result = await session.execute(
+                    select(UserWeatherSettings).where(
+                        UserWeatherSettings.user_id.in_(pending),
+                        UserWeatherSettings.notification_enabled.is_(True),
+                        self._owned_condition(),
+                    )
                 )
-                result = await session.execute(stmt)
                 users_settings = result.scalars().all()
 
-                for settings in users_settings:
-                    try:
-                        api_params = await get_api_parameters(session, settings.user_id)
-                        weather_data = await get_weather(
-                            settings.latitude, settings.longitude, api_params
-                        )
+            texts = await render_notifications(users_settings)
+            for settings in users_settings:
+                text = texts.get(settings.user_id)
+                if text is not None:
+                    self.buffer.put(settings, text)
 
-                        location_data = {
-                            "city": settings.location_name or "Ваша локація",
-                            "lat": settings.latitude,
-                            "lon": settings.longitude,
-                        }
+    def _next_prerender_at(self, now: datetime) -> Optional[datetime]:
+        upcoming = self.wheel.next_slot_after(now + PRERENDER_LEAD)
+        return None if upcoming is None else upcoming - PRERENDER_LEAD
 
-                        response = await format_weather_response(
-                            weather_data, location_data, api_params
-                        )
+    async def _advance(self, session, users_settings: List[UserWeatherSettings]):
+        # Переносимо на наступну добу поставлених у чергу і запізнілих — одним
+        # умовним UPDATE на хвилину: якщо користувач змінив розклад після читання,
+        # перемагає його запис
+        if not users_settings:
+            return
+        now = datetime.now(timezone.utc)
+        advances = [
+            (settings.user_id, settings.next_fire_at, following_fire_at(settings, now))
+            for settings in users_settings
+        ]
+        advanced = await advance_next_fire_times(session, advances)
+        await session.commit()
+        for user_id, _, next_fire_at in advances:
+            if user_id in advanced:
+                self.track(user_id, next_fire_at)
 
-                        await bot.send_message(
-                            settings.user_id,
-                            f"🔔 Щоденна погода:\n\n{response}",
-                            reply_markup=WeatherKeyboards.weather_type_menu(),
-                            parse_mode=ParseMode.MARKDOWN,
-                        )
-                        logger.info(
-                            f"Відправлено щоденне повідомлення користувачу {settings.user_id}"
-                        )
+    async def process_due(self, now: datetime) -> None:
+        try:
+            for fire_at, user_ids in self.wheel.pop_due(now):
+                await self.dispatch(fire_at, user_ids)
+        except Exception as e:
+            logger.error(f"Помилка розсилки щоденних сповіщень: {e}")
+            # Невідправлені користувачі повернуться з БД при оновленні вікна
+            self._next_refresh = now + REFRESH_RETRY
+
+    async def _sleep_until(self, moment: datetime) -> None:
+        delay = (moment - datetime.now(timezone.utc)).total_seconds()
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self) -> None:
+        try:
+            async with async_session() as session:
+                count = await backfill_next_fire_at(
+                    session, datetime.now(timezone.utc)
+                )
+                if count:
+                    logger.info(
+                        f"Розраховано розклад сповіщень для {count} користувачів"
+                    )
+        except Exception as e:
+            logger.error(f"Помилка при розрахунку розкладу сповіщень: {e}")
+
+        add_schedule_listener(self.on_schedule_change)
+        try:
+            while True:
+                self._wakeup.clear()
+                now = datetime.now(timezone.utc)
+
+                if now >= self._next_rebalance:
+                    await self.rebalance(now)
 
+                if now >= self._next_refresh:
+                    try:
+                        await self.refresh_window(now)
+                        self._next_refresh = now + WHEEL_REFRESH
                     except Exception as e:
                         logger.error(
-                            f"Помилка надсилання щоденного повідомлення {settings.user_id}: {e}"
+                            f"Помилка при отриманні користувачів для щоденних сповіщень: {e}"
                         )
+                        self._next_refresh = now + REFRESH_RETRY
+
+                await self.process_due(now)
+
+                try:
+                    await self.prerender(now)
+                except Exception as e:
+                    logger.error(f"Помилка попередньої підготовки сповіщень: {e}")
+
+                # Прокидаємося рівно на межі хвилини найближчого кошика або
+                # за PRERENDER_LEAD до наступного, щоб підготувати його тексти
+                wake_at = self._next_refresh
+                if self.shards is not None:
+                    wake_at = min(wake_at, self._next_rebalance)
+                for moment in (self.wheel.next_fire_at(), self._next_prerender_at(now)):
+                    if moment is not None and moment < wake_at:
+                        wake_at = moment
+                await self._sleep_until(wake_at)
+        finally:
+            remove_schedule_listener(self.on_schedule_change)
+            if self.shards is not None:
+                await self.shards.close()
 
-        except Exception as e:
-            logger.error(
-                f"Помилка при отриманні користувачів для щоденних сповіщень: {e}"
-            )
 
-        await asyncio.sleep(60)
+async def daily_notifications_scheduler(bot, shards: Optional[ShardLeases] = None):
+    # Кожен запущений процес бере свою частку шардів, тож екземплярів може бути кілька
+    await NotificationScheduler(bot, shards=shards or ShardLeases(engine)).run()
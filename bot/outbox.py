@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from bot.delivery import DeliveryPipeline, dead_recipient_reason
+from bot.keyboards import WeatherKeyboards
+from bot.logger_config import logger
+from bot.sharding import live_members
+from db.crud import (
+    claim_outbox_batch,
+    complete_outbox_batch,
+    deactivate_users,
+    purge_outbox,
+)
+from db.session import async_session
+
+OUTBOX_BATCH = 300
+# Оренда має перекривати доставку однієї порції (~10 с при 30 повідомл./с) із запасом
+OUTBOX_LEASE = timedelta(minutes=5)
+OUTBOX_POLL_INTERVAL = 1.0
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BASE_BACKOFF = timedelta(seconds=30)
+OUTBOX_MAX_BACKOFF = timedelta(minutes=30)
+OUTBOX_RETENTION = timedelta(days=7)
+OUTBOX_PURGE_INTERVAL = timedelta(hours=1)
+# Як часто перераховуємо частку спільного ліміту Telegram за кількістю процесів
+OUTBOX_RATE_REFRESH = timedelta(seconds=30)
+# Помилки, повтор яких нічого не змінить: бота заблоковано, чату не існує
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest)
+
+
+def retry_delay(attempts: int, error: Exception) -> timedelta:
+    if isinstance(error, TelegramRetryAfter):
+        return timedelta(seconds=error.retry_after)
+    return min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** max(attempts - 1, 0))
+
+
+class OutboxWorker:
+    def __init__(self, bot, pipeline: Optional[DeliveryPipeline] = None):
+        self.bot = bot
+        self.pipeline = pipeline or DeliveryPipeline(bot)
+        self._next_purge = datetime.min.replace(tzinfo=timezone.utc)
+        self._next_rate_refresh = datetime.min.replace(tzinfo=timezone.utc)
+
+    async def refresh_rate(self, session, now: datetime) -> None:
+        if now < self._next_rate_refresh:
+            return
+        self._next_rate_refresh = now + OUTBOX_RATE_REFRESH
+        try:
+            self.pipeline.share_rate(await live_members(session))
+        except Exception as e:
+            # Без відомої кількості процесів лишаємо попередню частку
+            logger.warning(f"Не вдалося визначити кількість процесів доставки: {e}")
+
+    async def process_batch(self) -> int:
+        # Захоплення і завершення — окремі транзакції: під час доставки рядки
+        # не тримають блокувань, від повторного захоплення їх береже оренда
+        async with async_session() as session:
+            await self.refresh_rate(session, datetime.now(timezone.utc))
+            claimed = await claim_outbox_batch(session, OUTBOX_BATCH, OUTBOX_LEASE)
+        if not claimed:
+            return 0
+
+        results = await self.pipeline.deliver(
+            [(item.user_id, item.text) for item in claimed],
+            reply_markup=WeatherKeyboards.weather_type_menu(),
+            parse_mode=ParseMode.MARKDOWN,
+        )
+
+        now = datetime.now(timezone.utc)
+        sent_ids, failures, dead_users = [], [], {}
+        for item, error in zip(claimed, results):
+            if error is None:
+                sent_ids.append(item.id)
+                continue
+            reason = dead_recipient_reason(error)
+            if reason is not None:
+                dead_users[item.user_id] = reason
+            permanent = (
+                reason is not None
+                or isinstance(error, PERMANENT_ERRORS)
+                or item.attempts >= OUTBOX_MAX_ATTEMPTS
+            )
+            failures.append(
+                {
+                    "id": item.id,
+                    "status": "failed" if permanent else "pending",
+                    "next_attempt_at": (
+                        now if permanent else now + retry_delay(item.attempts, error)
+                    ),
+                    "last_error": str(error)[:500],
+                }
+            )
+            if reason is None:
+                logger.error(
+                    f"Помилка надсилання щоденного повідомлення {item.user_id} (спроба {item.attempts}): {error}"
+                )
+
+        async with async_session() as session:
+            await complete_outbox_batch(session, sent_ids, failures)
+            if dead_users:
+                # Одним пакетом: такі користувачі більше не потрапляють у розклад і чергу
+                disabled = await deactivate_users(session, list(dead_users))
+                reasons = ", ".join(sorted(set(dead_users.values())))
+                logger.warning(
+                    f"Вимкнено сповіщення для {disabled} недоступних користувачів ({reasons})"
+                )
+        return len(claimed)
+
+    async def purge(self, now: datetime) -> None:
+        async with async_session() as session:
+            removed = await purge_outbox(session, now - OUTBOX_RETENTION)
+        if removed:
+            logger.info(f"Видалено {removed} старих записів черги сповіщень")
+
+    async def run(self) -> None:
+        while True:
+            processed = 0
+            try:
+                processed = await self.process_batch()
+
+                now = datetime.now(timezone.utc)
+                if now >= self._next_purge:
+                    self._next_purge = now + OUTBOX_PURGE_INTERVAL
+                    await self.purge(now)
+            except Exception as e:
+                logger.error(f"Помилка обробки черги сповіщень: {e}")
+
+            # Повна порція — одразу беремо наступну, інакше чекаємо нових записів
+            if processed < OUTBOX_BATCH:
+                await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+
+async def outbox_worker(bot):
+    await OutboxWorker(bot).run()
@@ -0,0 +1,160 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Message
+
+RENDER_CACHE_SIZE = 10000
+# Після TTL стан повідомлення вважається невідомим і правка йде в Telegram
+RENDER_CACHE_TTL = 3600.0
+NOT_MODIFIED_MARKER = "message is not modified"
+
+MessageKey = Tuple[int, int]
+# Дайджест тексту, дайджест клавіатури і останній Message, повернутий Telegram
+RenderState = Tuple[Optional[str], str, Optional[Message]]
+
+
+def _digest(value) -> str:
+    return hashlib.blake2b(repr(value).encode(), digest_size=16).hexdigest()
+
+
+def text_digest(method) -> str:
+    # Усе, що впливає на вигляд тексту: сам текст, розмітка, сутності, прев'ю
+    return _digest(
+        (
+            method.text,
+            repr(method.parse_mode),
+            method.entities,
+            repr(method.link_preview_options),
+        )
+    )
+
+
+def markup_digest(method) -> str:
+    markup = method.reply_markup
+    return _digest(None if markup is None else markup.model_dump_json())
+
+
+class RenderCache:
+    # Обмежений LRU з TTL: останній показаний вміст кожного повідомлення бота.
+    # Оновлення одного чату обробляє один воркер (bot.workers), а outbox лише
+    # надсилає нові повідомлення, тож інших редакторів у повідомлення немає
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE, ttl: float = RENDER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[MessageKey, Tuple[float, RenderState]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: MessageKey) -> Optional[RenderState]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, state = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return state
+
+    def put(
+        self,
+        key: MessageKey,
+        text: Optional[str],
+        markup: str,
+        message: Optional[Message] = None,
+    ) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, (text, markup, message))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: MessageKey) -> None:
+        self._entries.pop(key, None)
+
+
+class SkipUnchangedEdits(BaseRequestMiddleware):
+    # Middleware сесії бота: правка, що не змінює ні тексту, ні клавіатури,
+    # завершується без запиту до Telegram і повертає останній Message цього
+    # повідомлення, як повернув би сам Telegram
+
+    def __init__(self, cache: Optional[RenderCache] = None):
+        self.cache = cache or RenderCache()
+        self.skipped = 0
+
+    @staticmethod
+    def _key(method) -> Optional[MessageKey]:
+        if method.inline_message_id is not None or method.chat_id is None:
+            return None
+        if not isinstance(method.chat_id, int):
+            return None
+        return method.chat_id, method.message_id
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, SendMessage):
+            result = await make_request(bot, method)
+            if isinstance(method.chat_id, int):
+                self.cache.put(
+                    (method.chat_id, result.message_id),
+                    text_digest(method),
+                    markup_digest(method),
+                    result,
+                )
+            return result
+
+        if not isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            return await make_request(bot, method)
+
+        key = self._key(method)
+        if key is None:
+            return await make_request(bot, method)
+
+        new_text = text_digest(method) if isinstance(method, EditMessageText) else None
+        new_markup = markup_digest(method)
+        known = self.cache.get(key)
+        if known is not None:
+            known_text, known_markup, known_message = known
+            # Без відомого Message правку не пропускаємо: повернути нічого
+            if (
+                known_message is not None
+                and new_markup == known_markup
+                and new_text in (None, known_text)
+            ):
+                self.skipped += 1
+                return known_message
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if NOT_MODIFIED_MARKER in e.message.lower():
+                # Telegram підтвердив поточний вміст повідомлення
+                self._remember(key, new_text, new_markup, known, None)
+            else:
+                self.cache.discard(key)
+            raise
+        self._remember(key, new_text, new_markup, known, result)
+        return result
+
+    def _remember(self, key, new_text, new_markup, known, result: Any) -> None:
+        if new_text is None:
+            # Змінено лише клавіатуру: текст відомий тільки з попереднього запису
+            if known is None:
+                return
+            new_text = known[0]
+        # 'not modified' не повертає Message — лишається попередній, якщо вміст той самий
+        message = result if isinstance(result, Message) else None
+        if message is None and known is not None and known[:2] == (new_text, new_markup):
+            message = known[2]
+        self.cache.put(key, new_text, new_markup, message)
+
+
+def install_render_cache(bot) -> SkipUnchangedEdits:
+    middleware = SkipUnchangedEdits()
+    bot.session.middleware(middleware)
+    return middleware
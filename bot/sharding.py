@@ -0,0 +1,103 @@
+from typing import Callable, Set
+
+from sqlalchemy import text
+
+from bot.logger_config import logger
+from services.schedule import SCHEDULE_CHANNEL
+
+# Користувачі діляться на фіксовану кількість шардів за telegram_id; кожен шард
+# належить рівно одному процесу, поки той тримає advisory lock свого з'єднання
+NUM_SHARDS = 16
+SHARD_LOCK_NAMESPACE = 0x5C4ED
+# Спільний lock з ключем поза діапазоном шардів — ним процес позначає свою участь
+MEMBER_LOCK_KEY = 0xFFFF
+LIVE_MEMBERS_SQL = (
+    "SELECT count(DISTINCT pid) FROM pg_locks "
+    "WHERE locktype = 'advisory' AND granted "
+    "AND classid = :ns AND objid = :key AND objsubid = 2"
+)
+
+
+def shard_of(user_id: int, num_shards: int = NUM_SHARDS) -> int:
+    return user_id % num_shards
+
+
+async def live_members(connection) -> int:
+    # Скільки процесів бота зараз працює (тримають lock участі); не менше одного
+    result = await connection.execute(
+        text(LIVE_MEMBERS_SQL), {"ns": SHARD_LOCK_NAMESPACE, "key": MEMBER_LOCK_KEY}
+    )
+    return max(result.scalar() or 1, 1)
+
+
+class ShardLeases:
+    def __init__(self, engine, num_shards: int = NUM_SHARDS):
+        self.engine = engine
+        self.num_shards = num_shards
+        self.owned: Set[int] = set()
+        self._conn = None
+
+    async def start(self) -> None:
+        # Окреме з'єднання в autocommit: session-level locks живуть, поки воно
+        # відкрите, і звільняються самим Postgres, якщо процес впаде
+        self._conn = await self.engine.connect()
+        await self._conn.execution_options(isolation_level="AUTOCOMMIT")
+        await self._scalar(
+            "SELECT pg_advisory_lock_shared(:ns, :key)", key=MEMBER_LOCK_KEY
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._conn is not None
+
+    async def close(self) -> None:
+        # Закриття з'єднання звільняє всі його locks
+        conn, self._conn = self._conn, None
+        self.owned.clear()
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"Помилка закриття з'єднання шардів: {e}")
+
+    async def _scalar(self, sql: str, **params):
+        result = await self._conn.execute(
+            text(sql), {"ns": SHARD_LOCK_NAMESPACE, **params}
+        )
+        return result.scalar()
+
+    async def rebalance(self) -> bool:
+        # Кожен процес тримає не більше своєї частки: надлишок віддає новим
+        # учасникам, вільні шарди (зокрема від процесу, що впав) забирає собі
+        members = await self._scalar(LIVE_MEMBERS_SQL, key=MEMBER_LOCK_KEY)
+        target = -(-self.num_shards // max(members or 1, 1))
+        before = set(self.owned)
+
+        for shard in sorted(self.owned)[target:]:
+            await self._scalar("SELECT pg_advisory_unlock(:ns, :key)", key=shard)
+            self.owned.discard(shard)
+
+        for shard in range(self.num_shards):
+            if len(self.owned) >= target:
+                break
+            if shard in self.owned:
+                continue
+            if await self._scalar("SELECT pg_try_advisory_lock(:ns, :key)", key=shard):
+                self.owned.add(shard)
+
+        if self.owned != before:
+            logger.info(
+                f"Шарди планувальника: {sorted(self.owned)} ({members} процесів)"
+            )
+            return True
+        return False
+
+    def owns(self, user_id: int) -> bool:
+        return shard_of(user_id, self.num_shards) in self.owned
+
+    async def listen(self, callback: Callable[[str], None]) -> None:
+        raw = await self._conn.get_raw_connection()
+        await raw.driver_connection.add_listener(
+            SCHEDULE_CHANNEL, lambda conn, pid, channel, payload: callback(payload)
+        )
+
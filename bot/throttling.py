@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject
+from limits import RateLimitItem, RateLimitItemPerSecond
+from limits.aio.storage import MemoryStorage
+from limits.aio.strategies import MovingWindowRateLimiter
+
+# Сплеск до 5 дій користувача за 3 с; на чат (групи) — спільний ширший ліміт.
+# Оновлення одного чату обробляє один процес, тож лічильники в пам'яті процесу
+USER_LIMIT = RateLimitItemPerSecond(5, 3)
+CHAT_LIMIT = RateLimitItemPerSecond(20, 3)
+THROTTLED_TEXT = "⏳ Забагато запитів, зачекайте кілька секунд"
+IN_FLIGHT_TEXT = "⏳ Вже виконується..."
+# Повторне натискання чекає на перше не довше, ніж Telegram чекає на відповідь
+IN_FLIGHT_WAIT = 10.0
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        user_limit: RateLimitItem = USER_LIMIT,
+        chat_limit: RateLimitItem = CHAT_LIMIT,
+    ):
+        self.user_limit = user_limit
+        self.chat_limit = chat_limit
+        self.limiter = MovingWindowRateLimiter(MemoryStorage())
+        # Натискання, що зараз обробляються: (користувач, повідомлення, callback_data)
+        self._in_flight: Dict[Tuple[int, Hashable, str], asyncio.Event] = {}
+        self.throttled = 0
+        self.coalesced = 0
+
+    async def _allowed(self, user_id: int, chat_id: Optional[int]) -> bool:
+        if not await self.limiter.hit(self.user_limit, "user", str(user_id)):
+            return False
+        if chat_id is not None and chat_id != user_id:
+            return await self.limiter.hit(self.chat_limit, "chat", str(chat_id))
+        return True
+
+    @staticmethod
+    def _key(user_id: int, event: CallbackQuery) -> Tuple[int, Hashable, str]:
+        # Та сама кнопка під різними повідомленнями — різні дії
+        if event.message is not None:
+            message = (event.message.chat.id, event.message.message_id)
+        else:
+            message = event.inline_message_id
+        return user_id, message, event.data or ""
+
+    async def _await_in_flight(self, event: CallbackQuery, done: asyncio.Event) -> None:
+        # Результат першого натискання — це змінене ним повідомлення: дочекавшись
+        # його, лише знімаємо годинник з кнопки
+        try:
+            await asyncio.wait_for(done.wait(), IN_FLIGHT_WAIT)
+        except asyncio.TimeoutError:
+            await event.answer(IN_FLIGHT_TEXT)
+            return
+        await event.answer()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        chat = data.get("event_chat")
+        is_callback = isinstance(event, CallbackQuery)
+
+        key = self._key(user.id, event) if is_callback else None
+        if key is not None and key in self._in_flight:
+            # Повторне натискання тієї ж кнопки, поки перше ще в роботі
+            self.coalesced += 1
+            await self._await_in_flight(event, self._in_flight[key])
+            return None
+
+        if not await self._allowed(user.id, chat.id if chat else None):
+            self.throttled += 1
+            if is_callback:
+                await event.answer(THROTTLED_TEXT)
+            return None
+
+        if key is None:
+            return await handler(event, data)
+        done = self._in_flight[key] = asyncio.Event()
+        try:
+            return await handler(event, data)
+        finally:
+            del self._in_flight[key]
+            done.set()
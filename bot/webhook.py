@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import hmac
+import signal
+from typing import Awaitable, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from bot.logger_config import logger
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Скільки оновлень обробляються одночасно; понад це запит чекає на вільне місце,
+# і Telegram сам притримує доставку (не більше max_connections запитів разом)
+WEBHOOK_CONCURRENCY = 64
+WEBHOOK_MAX_CONNECTIONS = 40
+# Скільки чекаємо завершення оновлень у роботі при зупинці
+WEBHOOK_DRAIN_TIMEOUT = 25.0
+
+
+def webhook_secret(token: str, secret: Optional[str] = None) -> str:
+    # Без явного секрету — похідний від токена: однаковий для всіх екземплярів
+    # і не вгадується ззовні (Telegram дозволяє лише A-Z, a-z, 0-9, _ і -)
+    return secret or hashlib.sha256(f"webhook:{token}".encode()).hexdigest()
+
+
+class UpdatePool:
+    def __init__(self, limit: int = WEBHOOK_CONCURRENCY):
+        self._slots = asyncio.Semaphore(limit)
+        self._tasks: Set[asyncio.Task] = set()
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def submit(self, job: Awaitable) -> asyncio.Task:
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, job: Awaitable) -> None:
+        try:
+            await job
+        except Exception as e:
+            logger.error(f"Помилка обробки оновлення: {e}")
+        finally:
+            self._slots.release()
+
+    async def drain(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT) -> None:
+        # Нові оновлення більше не приймаються, розпочаті дообробляються
+        self.closed = True
+        if not self._tasks:
+            return
+        logger.info(f"Очікуємо завершення {len(self._tasks)} оновлень")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Перервано {len(pending)} оновлень при зупинці")
+
+
+class WebhookServer:
+    def __init__(self, bot: Bot, dp: Dispatcher, secret: str, pool: Optional[UpdatePool] = None):
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self.pool = pool or UpdatePool()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        received = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(received, self.secret):
+            logger.warning(f"Запит на webhook з невірним секретом від {request.remote}")
+            return web.Response(status=401)
+        if self.pool.closed:
+            # Telegram повторить доставку — оновлення обробить наступний екземпляр
+            return web.Response(status=503)
+
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self.bot}
+            )
+        except Exception as e:
+            logger.warning(f"Некоректне оновлення на webhook: {e}")
+            return web.Response(status=400)
+
+        # Відповідаємо одразу після постановки: обробка не тримає з'єднання Telegram
+        await self.pool.submit(self.dp.feed_update(self.bot, update))
+        return web.Response()
+
+    def build_app(self, path: str) -> web.Application:
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+        return app
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    url: str,
+    path: str,
+    host: str,
+    port: int,
+    secret: str,
+) -> None:
+    server = WebhookServer(bot, dp, secret)
+    runner = web.AppRunner(server.build_app(path))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    await bot.set_webhook(
+        url,
+        secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+    logger.info(f"Webhook запущено на {host}:{port}{path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: зупинка через KeyboardInterrupt, drain у finally
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Зупинка webhook")
+        await server.pool.drain()
+        await runner.cleanup()
+        await bot.session.close()
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import multiprocessing
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from bot.logger_config import logger
+from bot.webhook import UpdatePool
+
+# Віртуальних вузлів на процес: рівномірний розподіл чатів, а при зміні кількості
+# процесів переїжджає лише ~1/N чатів
+RING_REPLICAS = 128
+# Скільки оновлень може чекати в черзі одного процесу, перш ніж ingress пригальмує
+WORKER_QUEUE_SIZE = 1000
+WORKER_JOIN_TIMEOUT = 30.0
+POLLING_TIMEOUT = 30
+POLLING_RETRY = 1.0
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[int], replicas: int = RING_REPLICAS):
+        points = sorted(
+            (_ring_hash(f"{node}:{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: int) -> int:
+        index = bisect_right(self._hashes, _ring_hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def chat_id_of(update: Update) -> int:
+    # Ключ впорядкування: чат події, інакше її автор (inline-запити), інакше саме оновлення
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+class ChatOrderedPool(UpdatePool):
+    # Оновлення різних чатів обробляються паралельно, одного чату — строго по черзі.
+    # Слот пулу займає лише одна задача на чат, що розбирає його чергу: оновлення,
+    # які чекають на попередні з того ж чату, слотів не тримають і інші чати не гальмують
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._chats: Dict[int, Deque] = {}
+
+    async def submit_for(self, chat_id: int, job) -> Optional[asyncio.Task]:
+        pending = self._chats.get(chat_id)
+        if pending is not None:
+            pending.append(job)
+            return None
+        pending = self._chats[chat_id] = deque([job])
+        return await self.submit(self._drain_chat(chat_id, pending))
+
+    async def _drain_chat(self, chat_id: int, pending: Deque) -> None:
+        try:
+            while pending:
+                job = pending.popleft()
+                try:
+                    await job
+                except Exception as e:
+                    # Помилка одного оновлення не зупиняє решту черги чату
+                    logger.error(f"Помилка обробки оновлення: {e}")
+        finally:
+            del self._chats[chat_id]
+            # Після скасування при зупинці недоочікувані корутини закриваються
+            for job in pending:
+                job.close()
+
+
+async def _serve(index: int, queue) -> None:
+    from bot.bot import create_bot, create_dispatcher
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    pool = ChatOrderedPool()
+    loop = asyncio.get_running_loop()
+    logger.info(f"Процес оновлень {index} запущено")
+
+    try:
+        while True:
+            item = await loop.run_in_executor(None, queue.get)
+            if item is None:
+                break
+            chat_id, payload = item
+            try:
+                update = Update.model_validate_json(payload, context={"bot": bot})
+            except Exception as e:
+                logger.warning(f"Некоректне оновлення в процесі {index}: {e}")
+                continue
+            await pool.submit_for(chat_id, dp.feed_update(bot, update))
+    finally:
+        await pool.drain()
+        await bot.session.close()
+        logger.info(f"Процес оновлень {index} зупинено")
+
+
+def worker_main(index: int, queue) -> None:
+    asyncio.run(_serve(index, queue))
+
+
+class UpdateIngress:
+    # Приймає оновлення (polling або webhook) і розподіляє їх між процесами за
+    # chat_id. Має інтерфейс диспетчера (feed_update), тож підставляється у
+    # WebhookServer замість Dispatcher
+
+    def __init__(self, dp: Dispatcher, queues: List[Any]):
+        self.dp = dp
+        self.queues = queues
+        self.ring = HashRing(range(len(queues)))
+        self.processes: List[multiprocessing.Process] = []
+
+    @classmethod
+    def spawn(cls, dp: Dispatcher, workers: int) -> "UpdateIngress":
+        # spawn, а не fork: дочірній процес не успадковує цикл подій і з'єднання БД
+        context = multiprocessing.get_context("spawn")
+        ingress = cls(dp, [context.Queue(WORKER_QUEUE_SIZE) for _ in range(workers)])
+        for index, queue in enumerate(ingress.queues):
+            process = context.Process(
+                target=worker_main, args=(index, queue), name=f"updates-{index}"
+            )
+            process.start()
+            ingress.processes.append(process)
+        logger.info(f"Запущено {workers} процесів обробки оновлень")
+        return ingress
+
+    def resolve_used_update_types(self) -> List[str]:
+        return self.dp.resolve_used_update_types()
+
+    async def feed_update(self, bot: Bot, update: Update) -> None:
+        chat_id = chat_id_of(update)
+        queue = self.queues[self.ring.node_for(chat_id)]
+        payload = update.model_dump_json(exclude_none=True, by_alias=True)
+        # Повна черга блокує лише потік виконавця, а не цикл подій ingress
+        await asyncio.get_running_loop().run_in_executor(
+            None, queue.put, (chat_id, payload)
+        )
+
+    async def poll(self, bot: Bot) -> None:
+        offset: Optional[int] = None
+        allowed_updates = self.resolve_used_update_types()
+        await bot.delete_webhook()
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset,
+                    timeout=POLLING_TIMEOUT,
+                    allowed_updates=allowed_updates,
+                )
+            except Exception as e:
+                logger.error(f"Помилка отримання оновлень: {e}")
+                await asyncio.sleep(POLLING_RETRY)
+                continue
+            # Послідовно: порядок постановки в черги збігається з порядком Telegram
+            for update in updates:
+                await self.feed_update(bot, update)
+                offset = update.update_id + 1
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        for queue in self.queues:
+            await loop.run_in_executor(None, queue.put, None)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, WORKER_JOIN_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"Процес {process.name} не завершився вчасно")
+                process.terminate()
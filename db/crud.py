@@ -1,8 +1,26 @@
 from bot.logger_config import logger
-from datetime import datetime
-from typing import Optional, Dict, Any, List
-
-from sqlalchemy import select, text
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable, Set, Tuple
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Text,
+    cast,
+    delete,
+    exists,
+    func,
+    literal,
+    literal_column,
+    not_,
+    or_,
+    select,
+    text,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import (
@@ -10,14 +28,36 @@ from db.models import (
     UserWeatherSettings,
     UserMessage,
     BotChat,
+    NotificationOutbox,
+    WeatherAlertRule,
     TEMPERATURE_UNITS,
     WIND_SPEED_UNITS,
     PRECIPITATION_UNITS,
+    TIMEFORMAT_OPTIONS,
+    DEFAULT_DISPLAY_FLAGS,
+    DISPLAY_FLAG_BITS,
+    build_api_signature,
+    parse_api_signature,
+    parse_notification_time,
 )
+from services.schedule import SCHEDULE_CHANNEL, next_fire_at_for, schedule_payload
 
 # === КОРИСТУВАЧІ ===
 
 
+PROFILE_FIELDS = ("username", "first_name", "last_name", "language_code")
+
+
+def _insert_defaults(table, now: datetime) -> Dict[str, Any]:
+    # Python-дефолти колонок явно, бо в INSERT усередині CTE SQLAlchemy їх не підставляє
+    values = {}
+    for column in table.columns:
+        if column.default is None:
+            continue
+        values[column.name] = now if column.default.is_callable else column.default.arg
+    return values
+
+
 async def get_or_create_user(
     session: AsyncSession,
     telegram_id: int,
@@ -26,41 +66,78 @@ async def get_or_create_user(
     last_name: str = None,
     language_code: str = "uk",
 ) -> User:
-    stmt = select(User).where(User.telegram_id == telegram_id)
-    result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
-        user = User(
-            telegram_id=telegram_id,
-            username=username,
-            first_name=first_name,
-            last_name=last_name,
-            language_code=language_code,
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        logger.info(f"Створено нового користувача: {telegram_id}")
+    users = User.__table__
+    settings_table = UserWeatherSettings.__table__
+    now = datetime.now()
 
-        # Дефолтні налаштування погоди
-        await create_default_weather_settings(session, telegram_id)
-    else:
-        updated = False
-        for attr, value in [
-            ("username", username),
-            ("first_name", first_name),
-            ("last_name", last_name),
-            ("language_code", language_code),
-        ]:
-            if value and getattr(user, attr) != value:
-                setattr(user, attr, value)
-                updated = True
-        if updated:
-            user.updated_at = datetime.now()
-            await session.commit()
-            logger.info(f"Оновлено інформацію користувача: {telegram_id}")
+    profile = dict(
+        zip(PROFILE_FIELDS, (username, first_name, last_name, language_code))
+    )
+    profile = {name: value for name, value in profile.items() if value}
+
+    # INSERT ... ON CONFLICT DO UPDATE пише рядок лише якщо профіль справді змінився
+    # або користувач був вимкнений через недоставлені повідомлення і повернувся
+    insert_user = pg_insert(users).values(
+        {
+            **_insert_defaults(users, now),
+            "telegram_id": telegram_id,
+            "is_active": True,
+            **profile,
+        }
+    )
+    upsert_user = insert_user.on_conflict_do_update(
+        index_elements=[users.c.telegram_id],
+        set_={
+            **{name: insert_user.excluded[name] for name in profile},
+            "is_active": True,
+            "updated_at": insert_user.excluded.updated_at,
+        },
+        where=or_(
+            users.c.is_active.is_not(True),
+            *(
+                users.c[name].is_distinct_from(insert_user.excluded[name])
+                for name in profile
+            ),
+        ),
+    )
+    written_user = upsert_user.returning(
+        *users.c, literal_column("xmax = 0", Boolean).label("created")
+    ).cte("written_user")
+
+    default_settings = (
+        pg_insert(settings_table)
+        .values({**_insert_defaults(settings_table, now), "user_id": telegram_id})
+        .on_conflict_do_nothing(index_elements=[settings_table.c.user_id])
+        .cte("default_settings")
+    )
 
+    # Незмінений користувач не потрапляє в RETURNING — дочитуємо його з таблиці
+    unchanged_user = select(users, literal(None, Boolean).label("created")).where(
+        users.c.telegram_id == telegram_id,
+        ~exists(select(written_user.c.telegram_id)),
+    )
+    stmt = union_all(select(written_user), unchanged_user).add_cte(default_settings)
+
+    result = await session.execute(
+        select(User, literal_column("created", Boolean))
+        .from_statement(stmt)
+        .execution_options(populate_existing=True)
+    )
+    row = result.one_or_none()
+    await session.commit()
+
+    if row is None:
+        # Паралельний /start вставив користувача після нашого знімка
+        result = await session.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        return result.scalar_one()
+
+    user, created = row
+    if created:
+        logger.info(f"Створено нового користувача: {telegram_id}")
+    elif created is not None:
+        logger.info(f"Оновлено інформацію користувача: {telegram_id}")
     return user
 
 
@@ -86,12 +163,107 @@ async def get_user_weather_settings(
     settings = result.scalar_one_or_none()
 
     if not settings:
+        # Upsert користувача створює і дефолтні налаштування
         await get_or_create_user(session, telegram_id)
-        settings = await create_default_weather_settings(session, telegram_id)
+        settings = (await session.execute(stmt)).scalar_one()
 
     return settings
 
 
+# Колонки, які дозволено змінювати одиночним UPDATE; все інше відхиляється
+DISPLAY_SETTINGS = frozenset(DISPLAY_FLAG_BITS)
+TOGGLEABLE_SETTINGS = DISPLAY_SETTINGS | {"notification_enabled"}
+UPDATABLE_SETTINGS = {
+    "display_flags",
+    "notification_enabled",
+    "latitude",
+    "longitude",
+    "location_name",
+    "elevation",
+    "timezone",
+    "resolved_timezone",
+    "temperature_unit",
+    "wind_speed_unit",
+    "precipitation_unit",
+    "timeformat",
+    "forecast_days",
+    "past_days",
+    "notification_minute",
+}
+# Зміна будь-якої з цих колонок зсуває наступний момент сповіщення
+SCHEDULE_COLUMNS = (
+    UserWeatherSettings.notification_enabled,
+    UserWeatherSettings.notification_minute,
+    UserWeatherSettings.timezone,
+    UserWeatherSettings.resolved_timezone,
+    UserWeatherSettings.longitude,
+)
+SCHEDULE_SETTINGS = frozenset(column.key for column in SCHEDULE_COLUMNS)
+
+# Підписники на зміни розкладу (напр. планувальник, що тримає розклад у пам'яті)
+ScheduleListener = Callable[[int, Optional[datetime]], None]
+_schedule_listeners: List[ScheduleListener] = []
+
+
+def add_schedule_listener(listener: ScheduleListener) -> None:
+    _schedule_listeners.append(listener)
+
+
+def remove_schedule_listener(listener: ScheduleListener) -> None:
+    if listener in _schedule_listeners:
+        _schedule_listeners.remove(listener)
+
+
+def _notify_schedule_listeners(telegram_id: int, next_fire_at: Optional[datetime]):
+    for listener in list(_schedule_listeners):
+        try:
+            listener(telegram_id, next_fire_at)
+        except Exception as e:
+            logger.error(f"Помилка обробника розкладу для {telegram_id}: {e}")
+
+
+async def _update_weather_settings(
+    session: AsyncSession, telegram_id: int, values: Dict[str, Any], *returning
+):
+    unknown = set(values) - UPDATABLE_SETTINGS
+    if unknown:
+        raise ValueError(f"Невідомий параметр: {', '.join(sorted(unknown))}")
+
+    returning = returning or (UserWeatherSettings.id,)
+    reschedule = not SCHEDULE_SETTINGS.isdisjoint(values)
+    stmt = (
+        update(UserWeatherSettings)
+        .where(UserWeatherSettings.user_id == telegram_id)
+        .values(**values, updated_at=datetime.now())
+        .returning(*returning, *(SCHEDULE_COLUMNS if reschedule else ()))
+    )
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        # Рядка ще немає — створюємо дефолтні налаштування і повторюємо UPDATE
+        await get_user_weather_settings(session, telegram_id)
+        row = (await session.execute(stmt)).first()
+
+    next_fire_at = None
+    if reschedule:
+        # Рядок уже заблокований першим UPDATE, тож перерахунок у тій же транзакції;
+        # NOTIFY транзакційний — планувальники інших процесів дізнаються після commit
+        next_fire_at = next_fire_at_for(*row[len(returning) :])
+        await session.execute(
+            update(UserWeatherSettings)
+            .where(UserWeatherSettings.user_id == telegram_id)
+            .values(next_fire_at=next_fire_at)
+            .returning(
+                func.pg_notify(
+                    SCHEDULE_CHANNEL, schedule_payload(telegram_id, next_fire_at)
+                )
+            )
+        )
+    await session.commit()
+    if reschedule:
+        _notify_schedule_listeners(telegram_id, next_fire_at)
+    return row
+
+
 async def update_user_location(
     session: AsyncSession,
     telegram_id: int,
@@ -100,20 +272,32 @@ async def update_user_location(
     location_name: str = None,
     elevation: float = None,
     timezone: str = "auto",
+    resolved_timezone: str = None,
 ) -> None:
-    settings = await get_user_weather_settings(session, telegram_id)
-    settings.latitude = latitude
-    settings.longitude = longitude
-    settings.location_name = location_name
-    settings.elevation = elevation
-    settings.timezone = timezone
-    settings.updated_at = datetime.now()
-    await session.commit()
+    await _update_weather_settings(
+        session,
+        telegram_id,
+        {
+            "latitude": latitude,
+            "longitude": longitude,
+            "location_name": location_name,
+            "elevation": elevation,
+            "timezone": timezone,
+            "resolved_timezone": resolved_timezone,
+        },
+    )
     logger.info(
         f"Оновлено локацію для користувача {telegram_id}: {location_name} ({latitude}, {longitude})"
     )
 
 
+async def update_user_timezone(
+    session: AsyncSession, telegram_id: int, timezone: str
+) -> None:
+    await _update_weather_settings(session, telegram_id, {"timezone": timezone})
+    logger.info(f"Оновлено часовий пояс для користувача {telegram_id}: {timezone}")
+
+
 async def update_user_units(
     session: AsyncSession,
     telegram_id: int,
@@ -123,39 +307,47 @@ async def update_user_units(
     timeformat: str = None,
     past_days: int = None,
 ) -> None:
-    settings = await get_user_weather_settings(session, telegram_id)
+    values = {}
     if temperature_unit in TEMPERATURE_UNITS:
-        settings.temperature_unit = temperature_unit
+        values["temperature_unit"] = temperature_unit
     if wind_speed_unit in WIND_SPEED_UNITS:
-        settings.wind_speed_unit = wind_speed_unit
+        values["wind_speed_unit"] = wind_speed_unit
     if precipitation_unit in PRECIPITATION_UNITS:
-        settings.precipitation_unit = precipitation_unit
-    if timeformat in ["iso8601", "unixtime"]:
-        settings.timeformat = timeformat
+        values["precipitation_unit"] = precipitation_unit
+    if timeformat in TIMEFORMAT_OPTIONS:
+        values["timeformat"] = timeformat
     if past_days is not None and 0 <= past_days <= 92:
-        settings.past_days = past_days
-    settings.updated_at = datetime.now()
-    await session.commit()
+        values["past_days"] = past_days
+    await _update_weather_settings(session, telegram_id, values)
     logger.info(f"Оновлено одиниці виміру та past_days для користувача {telegram_id}")
 
 
 async def toggle_display_setting(
     session: AsyncSession, telegram_id: int, setting_name: str
 ) -> bool:
-    settings = await get_user_weather_settings(session, telegram_id)
-    if hasattr(settings, setting_name):
-        current_value = getattr(settings, setting_name)
-        new_value = not current_value
-        setattr(settings, setting_name, new_value)
-        settings.updated_at = datetime.now()
-        await session.commit()
-        logger.info(
-            f"Перемкнуто {setting_name} для користувача {telegram_id}: {current_value} -> {new_value}"
-        )
-        return new_value
-    else:
+    if setting_name not in TOGGLEABLE_SETTINGS:
         raise ValueError(f"Невідомий параметр: {setting_name}")
 
+    if setting_name in DISPLAY_SETTINGS:
+        # XOR біта прямо в UPDATE — паралельні натискання не губляться
+        flags = UserWeatherSettings.display_flags
+        values = {"display_flags": flags.op("#")(DISPLAY_FLAG_BITS[setting_name])}
+    else:
+        column = getattr(UserWeatherSettings, setting_name)
+        values = {setting_name: not_(func.coalesce(column, False))}
+
+    row = await _update_weather_settings(
+        session,
+        telegram_id,
+        values,
+        getattr(UserWeatherSettings, setting_name),
+    )
+    new_value = bool(row[0])
+    logger.info(
+        f"Перемкнуто {setting_name} для користувача {telegram_id}: {not new_value} -> {new_value}"
+    )
+    return new_value
+
 
 async def update_forecast_settings(
     session: AsyncSession,
@@ -163,13 +355,12 @@ async def update_forecast_settings(
     forecast_days: int = None,
     past_days: int = None,
 ) -> None:
-    settings = await get_user_weather_settings(session, telegram_id)
+    values = {}
     if forecast_days is not None and 1 <= forecast_days <= 16:
-        settings.forecast_days = forecast_days
+        values["forecast_days"] = forecast_days
     if past_days is not None and 0 <= past_days <= 92:
-        settings.past_days = past_days
-    settings.updated_at = datetime.now()
-    await session.commit()
+        values["past_days"] = past_days
+    await _update_weather_settings(session, telegram_id, values)
     logger.info(f"Оновлено налаштування прогнозу для користувача {telegram_id}")
 
 
@@ -179,17 +370,12 @@ async def update_notification_settings(
     notification_enabled: bool = None,
     notification_time: str = None,
 ) -> None:
-    settings = await get_user_weather_settings(session, telegram_id)
+    values = {}
     if notification_enabled is not None:
-        settings.notification_enabled = notification_enabled
+        values["notification_enabled"] = notification_enabled
     if notification_time is not None:
-        try:
-            datetime.strptime(notification_time, "%H:%M")
-            settings.notification_time = notification_time
-        except ValueError:
-            raise ValueError("Час повинен бути у форматі HH:MM")
-    settings.updated_at = datetime.now()
-    await session.commit()
+        values["notification_minute"] = parse_notification_time(notification_time)
+    await _update_weather_settings(session, telegram_id, values)
     logger.info(f"Оновлено налаштування сповіщень для користувача {telegram_id}")
 
 
@@ -198,6 +384,10 @@ async def update_notification_settings(
 
 async def get_api_parameters(session: AsyncSession, telegram_id: int) -> Dict[str, Any]:
     settings = await get_user_weather_settings(session, telegram_id)
+    return build_api_parameters(settings)
+
+
+def build_api_parameters(settings: UserWeatherSettings) -> Dict[str, Any]:
     if not settings.latitude or not settings.longitude:
         raise ValueError(
             "Локація не встановлена. Спочатку вкажіть своє місцезнаходження."
@@ -217,87 +407,14 @@ async def get_api_parameters(session: AsyncSession, telegram_id: int) -> Dict[st
     if settings.elevation is not None:
         params["elevation"] = settings.elevation
 
-    # Hourly
-    hourly_params = []
-    if settings.show_temperature:
-        hourly_params.append("temperature_2m")
-    if settings.show_feels_like:
-        hourly_params.append("apparent_temperature")
-    if settings.show_humidity:
-        hourly_params.append("relative_humidity_2m")
-    if settings.show_pressure:
-        hourly_params.append("pressure_msl")
-    if settings.show_wind:
-        hourly_params.extend(["wind_speed_10m", "wind_direction_10m", "wind_gusts_10m"])
-    if settings.show_precipitation:
-        hourly_params.extend(["precipitation", "rain", "showers"])
-    if settings.show_precipitation_probability:
-        hourly_params.append("precipitation_probability")
-    if settings.show_cloud_cover:
-        hourly_params.append("cloud_cover")
-    if settings.show_uv_index:
-        hourly_params.append("uv_index")
-    if settings.show_visibility:
-        hourly_params.append("visibility")
-    if settings.show_dew_point:
-        hourly_params.append("dew_point_2m")
-    if settings.show_solar_radiation:
-        hourly_params.extend(
-            ["shortwave_radiation", "direct_radiation", "diffuse_radiation"]
-        )
-    hourly_params.extend(["weather_code", "is_day"])
-    if hourly_params:
-        params["hourly"] = ",".join(list(set(hourly_params)))
-
-    # Daily
-    daily_params = ["weather_code"]
-    if settings.show_daily_temperature:
-        daily_params.extend(
-            [
-                "temperature_2m_max",
-                "temperature_2m_min",
-                "apparent_temperature_max",
-                "apparent_temperature_min",
-            ]
-        )
-    if settings.show_daily_precipitation:
-        daily_params.extend(
-            [
-                "precipitation_sum",
-                "precipitation_probability_max",
-                "precipitation_hours",
-            ]
-        )
-    if settings.show_daily_wind:
-        daily_params.extend(
-            ["wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant"]
-        )
-    if settings.show_sunrise_sunset:
-        daily_params.extend(["sunrise", "sunset"])
-    if settings.show_daylight_duration:
-        daily_params.append("daylight_duration")
-    if settings.show_sunshine_duration:
-        daily_params.append("sunshine_duration")
-    if settings.show_daily_uv:
-        daily_params.extend(["uv_index_max", "uv_index_clear_sky_max"])
-    if daily_params:
-        params["daily"] = ",".join(list(set(daily_params)))
-
-    # Current
-    if settings.show_current_weather:
-        current_params = [
-            "temperature_2m",
-            "relative_humidity_2m",
-            "apparent_temperature",
-            "is_day",
-            "precipitation",
-            "weather_code",
-            "cloud_cover",
-            "pressure_msl",
-            "wind_speed_10m",
-            "wind_direction_10m",
-        ]
-        params["current"] = ",".join(current_params)
+    # Підпис параметрів підтримує БД; для ще не збережених об'єктів рахуємо на місці
+    signature = settings.api_signature
+    if signature is None:
+        flags = settings.display_flags
+        if flags is None:
+            flags = DEFAULT_DISPLAY_FLAGS
+        signature = build_api_signature(flags)
+    params.update(parse_api_signature(signature))
 
     return params
 
@@ -390,6 +507,297 @@ async def track_chat_member_update(
         logger.warning(f"Бот видалено з чату {norm_id} ({chat_type})")
 
 
+# === ПЛАНУВАЛЬНИК ===
+
+
+async def advance_next_fire_times(
+    session: AsyncSession,
+    advances: List[Tuple[int, Optional[datetime], Optional[datetime]]],
+) -> Set[int]:
+    # (user_id, прочитаний next_fire_at, новий) — один UPDATE на групу. Рядок
+    # переноситься лише якщо розклад не змінився після читання: інакше новий
+    # next_fire_at від зміни налаштувань уже записано і його не можна затерти.
+    # Без commit — транзакцією керує планувальник; NOTIFY піде разом з нею
+    if not advances:
+        return set()
+
+    moment = DateTime(timezone=True)
+    advance = select(
+        func.unnest(cast([row[0] for row in advances], ARRAY(BigInteger))).label(
+            "user_id"
+        ),
+        func.unnest(cast([row[1] for row in advances], ARRAY(moment))).label(
+            "fired_at"
+        ),
+        func.unnest(cast([row[2] for row in advances], ARRAY(moment))).label(
+            "next_fire_at"
+        ),
+        func.unnest(
+            cast([schedule_payload(row[0], row[2]) for row in advances], ARRAY(Text))
+        ).label("payload"),
+    ).subquery("advance")
+    result = await session.execute(
+        update(UserWeatherSettings)
+        .where(
+            UserWeatherSettings.user_id == advance.c.user_id,
+            UserWeatherSettings.notification_enabled.is_(True),
+            UserWeatherSettings.next_fire_at.is_not_distinct_from(advance.c.fired_at),
+        )
+        .values(next_fire_at=advance.c.next_fire_at)
+        .returning(
+            UserWeatherSettings.user_id,
+            func.pg_notify(SCHEDULE_CHANNEL, advance.c.payload),
+        )
+    )
+    return {row[0] for row in result.all()}
+
+
+# === ЧЕРГА СПОВІЩЕНЬ ===
+
+
+async def enqueue_notifications(
+    session: AsyncSession, notifications: List[Dict[str, Any]]
+) -> None:
+    # Без commit: викликач фіксує постановку разом із перенесенням next_fire_at
+    if not notifications:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": item["user_id"],
+            "fire_at": item["fire_at"],
+            "text": item["text"],
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": datetime.now(),
+        }
+        for item in notifications
+    ]
+    stmt = pg_insert(NotificationOutbox).values(rows)
+    await session.execute(
+        stmt.on_conflict_do_nothing(constraint="uq_notification_outbox_user_fire")
+    )
+
+
+async def claim_outbox_batch(
+    session: AsyncSession, limit: int, lease: timedelta
+) -> List[NotificationOutbox]:
+    # SKIP LOCKED дозволяє кільком воркерам брати різні рядки без очікування;
+    # оренда (next_attempt_at у майбутньому) повертає рядок, якщо воркер впаде
+    now = datetime.now(timezone.utc)
+    claimable = (
+        select(NotificationOutbox.id)
+        .where(
+            NotificationOutbox.status == "pending",
+            NotificationOutbox.next_attempt_at <= now,
+        )
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(claimable))
+        .values(
+            next_attempt_at=now + lease,
+            attempts=NotificationOutbox.attempts + 1,
+        )
+        .returning(NotificationOutbox)
+    )
+    result = await session.execute(
+        select(NotificationOutbox)
+        .from_statement(stmt)
+        .execution_options(populate_existing=True)
+    )
+    claimed = list(result.scalars().all())
+    await session.commit()
+    return claimed
+
+
+async def complete_outbox_batch(
+    session: AsyncSession, sent_ids: List[int], failures: List[Dict[str, Any]]
+) -> None:
+    # failures — словники з id, status, next_attempt_at і last_error
+    if sent_ids:
+        await session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(sent_ids))
+            .values(
+                status="sent",
+                sent_at=datetime.now(timezone.utc),
+                last_error=None,
+            )
+        )
+    if failures:
+        await session.execute(update(NotificationOutbox), failures)
+    await session.commit()
+
+
+async def purge_outbox(session: AsyncSession, older_than: datetime) -> int:
+    result = await session.execute(
+        delete(NotificationOutbox).where(
+            NotificationOutbox.status != "pending",
+            NotificationOutbox.fire_at < older_than,
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def deactivate_users(session: AsyncSession, telegram_ids: List[int]) -> int:
+    # Отримувачі, яким Telegram більше не доставляє (заблокували бота, видалені):
+    # вимикаємо сповіщення, знімаємо з розкладу і скасовуємо їхні рядки в черзі
+    telegram_ids = sorted(set(telegram_ids))
+    if not telegram_ids:
+        return 0
+
+    result = await session.execute(
+        update(User)
+        .where(User.telegram_id.in_(telegram_ids), User.is_active.is_not(False))
+        .values(is_active=False, updated_at=datetime.now())
+    )
+    await session.execute(
+        update(UserWeatherSettings)
+        .where(UserWeatherSettings.user_id.in_(telegram_ids))
+        .values(
+            notification_enabled=False,
+            next_fire_at=None,
+            updated_at=datetime.now(),
+        )
+        .returning(
+            func.pg_notify(
+                SCHEDULE_CHANNEL,
+                func.concat(UserWeatherSettings.user_id, " -"),
+            )
+        )
+    )
+    await session.execute(
+        update(NotificationOutbox)
+        .where(
+            NotificationOutbox.user_id.in_(telegram_ids),
+            NotificationOutbox.status == "pending",
+        )
+        .values(status="failed", last_error="Отримувач недоступний")
+    )
+    await session.commit()
+
+    for telegram_id in telegram_ids:
+        _notify_schedule_listeners(telegram_id, None)
+    return result.rowcount
+
+
+# === ПОГОДНІ ПОПЕРЕДЖЕННЯ ===
+
+
+async def get_alert_rules(
+    session: AsyncSession, telegram_id: int
+) -> List[WeatherAlertRule]:
+    result = await session.execute(
+        select(WeatherAlertRule)
+        .where(WeatherAlertRule.user_id == telegram_id)
+        .order_by(WeatherAlertRule.id)
+    )
+    return list(result.scalars().all())
+
+
+async def add_alert_rule(
+    session: AsyncSession,
+    telegram_id: int,
+    metric: str,
+    operator: str,
+    threshold: float,
+) -> bool:
+    # Повторне додавання того самого правила нічого не змінює
+    result = await session.execute(
+        pg_insert(WeatherAlertRule)
+        .values(
+            user_id=telegram_id,
+            metric=metric,
+            operator=operator,
+            threshold=threshold,
+            created_at=datetime.now(),
+        )
+        .on_conflict_do_nothing(constraint="uq_weather_alert_rule")
+        .returning(WeatherAlertRule.id)
+    )
+    created = result.first() is not None
+    await session.commit()
+    return created
+
+
+async def delete_alert_rules(
+    session: AsyncSession, telegram_id: int, rule_id: Optional[int] = None
+) -> int:
+    stmt = delete(WeatherAlertRule).where(WeatherAlertRule.user_id == telegram_id)
+    if rule_id is not None:
+        stmt = stmt.where(WeatherAlertRule.id == rule_id)
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount
+
+
+async def get_alert_candidates(
+    session: AsyncSession,
+    quiet_since: datetime,
+    shards: Optional[Tuple[int, Set[int]]] = None,
+) -> List:
+    # Правила активних користувачів з локацією, що не спрацьовували після quiet_since;
+    # shards — (кількість шардів, шарди процесу): лише його користувачі
+    stmt = (
+        select(
+            WeatherAlertRule,
+            UserWeatherSettings.latitude,
+            UserWeatherSettings.longitude,
+            UserWeatherSettings.location_name,
+        )
+        .join(
+            UserWeatherSettings,
+            UserWeatherSettings.user_id == WeatherAlertRule.user_id,
+        )
+        .join(User, User.telegram_id == WeatherAlertRule.user_id)
+        .where(
+            User.is_active.is_not(False),
+            UserWeatherSettings.latitude.is_not(None),
+            UserWeatherSettings.longitude.is_not(None),
+            or_(
+                WeatherAlertRule.last_alert_at.is_(None),
+                WeatherAlertRule.last_alert_at <= quiet_since,
+            ),
+        )
+    )
+    if shards is not None:
+        num_shards, owned = shards
+        stmt = stmt.where((WeatherAlertRule.user_id % num_shards).in_(owned))
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+async def claim_alert_rules(
+    session: AsyncSession,
+    rule_ids: List[int],
+    quiet_since: datetime,
+    now: datetime,
+) -> Set[int]:
+    # Умовний UPDATE: з кількох процесів правило за паузу забирає лише один.
+    # Без commit — викликач фіксує його разом із постановкою в чергу
+    if not rule_ids:
+        return set()
+    result = await session.execute(
+        update(WeatherAlertRule)
+        .where(
+            WeatherAlertRule.id.in_(rule_ids),
+            or_(
+                WeatherAlertRule.last_alert_at.is_(None),
+                WeatherAlertRule.last_alert_at <= quiet_since,
+            ),
+        )
+        .values(last_alert_at=now)
+        .returning(WeatherAlertRule.id)
+    )
+    return set(result.scalars().all())
+
+
 # === ЗВІТНІСТЬ ===
 
 
@@ -439,23 +847,20 @@ async def get_settings(session: AsyncSession, telegram_id: int) -> dict:
 async def update_setting(
     session: AsyncSession, telegram_id: int, key: str, value: str
 ) -> None:
-    settings = await get_user_weather_settings(session, telegram_id)
     if key == "temperature_unit" and value in TEMPERATURE_UNITS:
-        settings.temperature_unit = value
+        values = {"temperature_unit": value}
     elif key == "wind_speed_unit" and value in WIND_SPEED_UNITS:
-        settings.wind_speed_unit = value
+        values = {"wind_speed_unit": value}
     elif key == "precipitation_unit" and value in PRECIPITATION_UNITS:
-        settings.precipitation_unit = value
+        values = {"precipitation_unit": value}
     elif key == "timezone":
-        settings.timezone = value
+        values = {"timezone": value}
     elif key == "forecast_days":
         days = int(value)
-        if 1 <= days <= 16:
-            settings.forecast_days = days
+        values = {"forecast_days": days} if 1 <= days <= 16 else {}
     else:
         raise ValueError(f"Невідомий або некоректний параметр: {key}={value}")
-    settings.updated_at = datetime.now()
-    await session.commit()
+    await _update_weather_settings(session, telegram_id, values)
 
 
 async def get_user_state(session, telegram_id: int) -> str | None:
@@ -474,12 +879,11 @@ async def set_user_state(session, telegram_id: int, state: str):
 
 
 async def save_notification_time(session, user_id: int, time_str: str):
-    query = await session.execute(
-        select(UserWeatherSettings).where(UserWeatherSettings.user_id == user_id)
+    await _update_weather_settings(
+        session,
+        user_id,
+        {
+            "notification_minute": parse_notification_time(time_str),
+            "notification_enabled": True,
+        },
     )
-    settings = query.scalar_one_or_none()
-    if settings:
-        settings.notification_time = time_str
-        settings.notification_enabled = True  # якщо хочеш включити сповіщення
-        session.add(settings)
-        await session.commit()
@@ -1,116 +1,27 @@
 from sqlalchemy import (
     Column,
+    Computed,
     Integer,
     BigInteger,
     String,
     DateTime,
     Boolean,
     Float,
+    Index,
+    SmallInteger,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy import ForeignKey
 from datetime import datetime
+from typing import Dict, Optional
 import json
 
 Base = declarative_base()
 
 
-class User(Base):
-    __tablename__ = "users"
-
-    telegram_id = Column(BigInteger, primary_key=True, unique=True, index=True)
-    username = Column(String(255), nullable=True)
-    first_name = Column(String(255), nullable=True)
-    last_name = Column(String(255), nullable=True)
-    language_code = Column(String(10), default="uk")
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    state = Column(String(50), nullable=True)
-
-
-class UserWeatherSettings(Base):
-    __tablename__ = "user_weather_settings"
-
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(
-        BigInteger,
-        ForeignKey("users.telegram_id", ondelete="CASCADE"),
-        nullable=False,
-        unique=True,
-    )
-
-    latitude = Column(Float, nullable=True)
-    longitude = Column(Float, nullable=True)
-    location_name = Column(String(255), nullable=True)
-    elevation = Column(Float, nullable=True)
-    timezone = Column(String(100), default="auto")
-
-    temperature_unit = Column(String(20), default="celsius")
-    wind_speed_unit = Column(String(10), default="kmh")
-    precipitation_unit = Column(String(10), default="mm")
-    timeformat = Column(String(20), default="iso8601")
-
-    forecast_days = Column(Integer, default=7)
-    past_days = Column(Integer, default=0)
-
-    show_temperature = Column(Boolean, default=True)
-    show_feels_like = Column(Boolean, default=True)
-    show_humidity = Column(Boolean, default=True)
-    show_pressure = Column(Boolean, default=False)
-    show_wind = Column(Boolean, default=True)
-    show_precipitation = Column(Boolean, default=True)
-    show_precipitation_probability = Column(Boolean, default=True)
-    show_cloud_cover = Column(Boolean, default=False)
-    show_uv_index = Column(Boolean, default=True)
-    show_visibility = Column(Boolean, default=False)
-    show_dew_point = Column(Boolean, default=False)
-    show_solar_radiation = Column(Boolean, default=False)
-
-    show_daily_temperature = Column(Boolean, default=True)
-    show_daily_precipitation = Column(Boolean, default=True)
-    show_daily_wind = Column(Boolean, default=True)
-    show_sunrise_sunset = Column(Boolean, default=True)
-    show_daylight_duration = Column(Boolean, default=False)
-    show_sunshine_duration = Column(Boolean, default=False)
-    show_daily_uv = Column(Boolean, default=True)
-
-    show_current_weather = Column(Boolean, default=True)
-
-    notification_enabled = Column(Boolean, default=False)
-    notification_time = Column(String(5), nullable=True)
-
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-
-
-class UserMessage(Base):
-    __tablename__ = "user_messages"
-
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.telegram_id"), nullable=True)
-    chat_id = Column(BigInteger, nullable=False)
-    message_text = Column(Text, nullable=False)
-    location_requested = Column(String(255), nullable=True)
-    latitude = Column(Float, nullable=True)
-    longitude = Column(Float, nullable=True)
-    weather_response = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=datetime.now)
-
-
-class BotChat(Base):
-    __tablename__ = "bot_chats"
-
-    id = Column(Integer, primary_key=True, index=True)
-    chat_id = Column(BigInteger, unique=True, index=True)
-    chat_type = Column(String(50), nullable=False)
-    title = Column(String(255), nullable=True)
-    added_at = Column(DateTime, default=datetime.now)
-    last_activity = Column(DateTime, default=datetime.now)
-    is_active = Column(Boolean, default=True)
-
-
 HOURLY_PARAMETERS = [
     "temperature_2m",
     "relative_humidity_2m",
@@ -192,3 +103,375 @@ TEMPERATURE_UNITS = ["celsius", "fahrenheit"]
 WIND_SPEED_UNITS = ["kmh", "ms", "mph", "kn"]
 PRECIPITATION_UNITS = ["mm", "inch"]
 TIMEFORMAT_OPTIONS = ["iso8601", "unixtime"]
+
+
+# Порядок фіксований: біт прапорця = його позиція, нові прапорці лише в кінець
+DISPLAY_FLAGS = [
+    ("show_temperature", True),
+    ("show_feels_like", True),
+    ("show_humidity", True),
+    ("show_pressure", False),
+    ("show_wind", True),
+    ("show_precipitation", True),
+    ("show_precipitation_probability", True),
+    ("show_cloud_cover", False),
+    ("show_uv_index", True),
+    ("show_visibility", False),
+    ("show_dew_point", False),
+    ("show_solar_radiation", False),
+    ("show_daily_temperature", True),
+    ("show_daily_precipitation", True),
+    ("show_daily_wind", True),
+    ("show_sunrise_sunset", True),
+    ("show_daylight_duration", False),
+    ("show_sunshine_duration", False),
+    ("show_daily_uv", True),
+    ("show_current_weather", True),
+]
+DISPLAY_FLAG_BITS = {name: 1 << index for index, (name, _) in enumerate(DISPLAY_FLAGS)}
+DEFAULT_DISPLAY_FLAGS = sum(
+    DISPLAY_FLAG_BITS[name] for name, default in DISPLAY_FLAGS if default
+)
+
+# Параметр Open-Meteo -> прапорець, що його вмикає (None — запитується завжди)
+HOURLY_PARAMETER_FLAGS = {
+    "temperature_2m": "show_temperature",
+    "apparent_temperature": "show_feels_like",
+    "relative_humidity_2m": "show_humidity",
+    "pressure_msl": "show_pressure",
+    "wind_speed_10m": "show_wind",
+    "wind_direction_10m": "show_wind",
+    "wind_gusts_10m": "show_wind",
+    "precipitation": "show_precipitation",
+    "rain": "show_precipitation",
+    "showers": "show_precipitation",
+    "precipitation_probability": "show_precipitation_probability",
+    "cloud_cover": "show_cloud_cover",
+    "uv_index": "show_uv_index",
+    "visibility": "show_visibility",
+    "dew_point_2m": "show_dew_point",
+    "shortwave_radiation": "show_solar_radiation",
+    "direct_radiation": "show_solar_radiation",
+    "diffuse_radiation": "show_solar_radiation",
+    "weather_code": None,
+    "is_day": None,
+}
+
+DAILY_PARAMETER_FLAGS = {
+    "weather_code": None,
+    "temperature_2m_max": "show_daily_temperature",
+    "temperature_2m_min": "show_daily_temperature",
+    "apparent_temperature_max": "show_daily_temperature",
+    "apparent_temperature_min": "show_daily_temperature",
+    "precipitation_sum": "show_daily_precipitation",
+    "precipitation_probability_max": "show_daily_precipitation",
+    "precipitation_hours": "show_daily_precipitation",
+    "wind_speed_10m_max": "show_daily_wind",
+    "wind_gusts_10m_max": "show_daily_wind",
+    "wind_direction_10m_dominant": "show_daily_wind",
+    "sunrise": "show_sunrise_sunset",
+    "sunset": "show_sunrise_sunset",
+    "daylight_duration": "show_daylight_duration",
+    "sunshine_duration": "show_sunshine_duration",
+    "uv_index_max": "show_daily_uv",
+    "uv_index_clear_sky_max": "show_daily_uv",
+}
+
+CURRENT_PARAMETER_FLAGS = {
+    name: "show_current_weather"
+    for name in (
+        "temperature_2m",
+        "relative_humidity_2m",
+        "apparent_temperature",
+        "is_day",
+        "precipitation",
+        "weather_code",
+        "cloud_cover",
+        "pressure_msl",
+        "wind_speed_10m",
+        "wind_direction_10m",
+    )
+}
+
+API_SIGNATURE_SECTIONS = [
+    ("hourly", HOURLY_PARAMETERS, HOURLY_PARAMETER_FLAGS),
+    ("daily", DAILY_PARAMETERS, DAILY_PARAMETER_FLAGS),
+    ("current", CURRENT_PARAMETERS, CURRENT_PARAMETER_FLAGS),
+]
+
+
+def unpack_display_flags(display_flags: int) -> Dict[str, bool]:
+    return {
+        name: bool(display_flags & bit) for name, bit in DISPLAY_FLAG_BITS.items()
+    }
+
+
+def build_api_signature(display_flags: int) -> str:
+    # Канонічний порядок — порядок у HOURLY/DAILY/CURRENT_PARAMETERS
+    sections = []
+    for _, parameters, flags in API_SIGNATURE_SECTIONS:
+        enabled = [
+            name
+            for name in parameters
+            if name in flags
+            and (flags[name] is None or display_flags & DISPLAY_FLAG_BITS[flags[name]])
+        ]
+        sections.append(",".join(enabled))
+    return "|".join(sections)
+
+
+def parse_api_signature(signature: str) -> Dict[str, str]:
+    sections = signature.split("|")
+    return {
+        section: value
+        for (section, _, _), value in zip(API_SIGNATURE_SECTIONS, sections)
+        if value
+    }
+
+
+def _display_flag_condition(name: str) -> str:
+    return f"(display_flags & {DISPLAY_FLAG_BITS[name]}) <> 0"
+
+
+def _api_signature_sql(flag_condition) -> str:
+    # SQL-дзеркало build_api_signature для згенерованої колонки
+    sections = []
+    for _, parameters, flags in API_SIGNATURE_SECTIONS:
+        parts = []
+        for name in parameters:
+            if name not in flags:
+                continue
+            if flags[name] is None:
+                parts.append(f"'{name},'")
+            else:
+                parts.append(
+                    f"(CASE WHEN {flag_condition(flags[name])} THEN '{name},' ELSE '' END)"
+                )
+        sections.append(f"rtrim({' || '.join(parts)}, ',')")
+    return " || '|' || ".join(sections)
+
+
+def parse_notification_time(value: str) -> int:
+    try:
+        parsed = datetime.strptime(value.strip(), "%H:%M")
+    except (AttributeError, ValueError):
+        raise ValueError("Час повинен бути у форматі HH:MM")
+    return parsed.hour * 60 + parsed.minute
+
+
+def format_notification_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _display_flag(name: str) -> hybrid_property:
+    # Сумісний з колишньою Boolean-колонкою доступ до біта display_flags
+    bit = DISPLAY_FLAG_BITS[name]
+
+    def getter(self) -> bool:
+        flags = self.display_flags
+        if flags is None:
+            flags = DEFAULT_DISPLAY_FLAGS
+        return bool(flags & bit)
+
+    def setter(self, value: bool) -> None:
+        flags = self.display_flags
+        if flags is None:
+            flags = DEFAULT_DISPLAY_FLAGS
+        self.display_flags = flags | bit if value else flags & ~bit
+
+    def expression(cls):
+        return cls.display_flags.op("&")(bit) != 0
+
+    return hybrid_property(getter, setter, expr=expression)
+
+
+class User(Base):
+    __tablename__ = "users"
+
+    telegram_id = Column(BigInteger, primary_key=True, unique=True, index=True)
+    username = Column(String(255), nullable=True)
+    first_name = Column(String(255), nullable=True)
+    last_name = Column(String(255), nullable=True)
+    language_code = Column(String(10), default="uk")
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    state = Column(String(50), nullable=True)
+
+
+class UserWeatherSettings(Base):
+    __tablename__ = "user_weather_settings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    location_name = Column(String(255), nullable=True)
+    elevation = Column(Float, nullable=True)
+    timezone = Column(String(100), default="auto")
+    # IANA-пояс локації з геокодування — підставляється замість "auto"
+    resolved_timezone = Column(String(100), nullable=True)
+
+    temperature_unit = Column(String(20), default="celsius")
+    wind_speed_unit = Column(String(10), default="kmh")
+    precipitation_unit = Column(String(10), default="mm")
+    timeformat = Column(String(20), default="iso8601")
+
+    forecast_days = Column(Integer, default=7)
+    past_days = Column(Integer, default=0)
+
+    # Прапорці відображення упаковані в один Integer, show_* — аксесори до бітів
+    display_flags = Column(
+        Integer,
+        nullable=False,
+        default=DEFAULT_DISPLAY_FLAGS,
+        server_default=str(DEFAULT_DISPLAY_FLAGS),
+    )
+
+    show_temperature = _display_flag("show_temperature")
+    show_feels_like = _display_flag("show_feels_like")
+    show_humidity = _display_flag("show_humidity")
+    show_pressure = _display_flag("show_pressure")
+    show_wind = _display_flag("show_wind")
+    show_precipitation = _display_flag("show_precipitation")
+    show_precipitation_probability = _display_flag("show_precipitation_probability")
+    show_cloud_cover = _display_flag("show_cloud_cover")
+    show_uv_index = _display_flag("show_uv_index")
+    show_visibility = _display_flag("show_visibility")
+    show_dew_point = _display_flag("show_dew_point")
+    show_solar_radiation = _display_flag("show_solar_radiation")
+
+    show_daily_temperature = _display_flag("show_daily_temperature")
+    show_daily_precipitation = _display_flag("show_daily_precipitation")
+    show_daily_wind = _display_flag("show_daily_wind")
+    show_sunrise_sunset = _display_flag("show_sunrise_sunset")
+    show_daylight_duration = _display_flag("show_daylight_duration")
+    show_sunshine_duration = _display_flag("show_sunshine_duration")
+    show_daily_uv = _display_flag("show_daily_uv")
+
+    show_current_weather = _display_flag("show_current_weather")
+
+    notification_enabled = Column(Boolean, default=False)
+    # Хвилина доби (0..1439) замість рядка "HH:MM" — компактно і індексується
+    notification_minute = Column(SmallInteger, nullable=True)
+    # Наступний момент надсилання в UTC; перераховується при кожній зміні розкладу
+    next_fire_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Підтримується самою БД при кожному записі, тому атомарні UPDATE його не оминають
+    api_signature = Column(
+        Text, Computed(_api_signature_sql(_display_flag_condition), persisted=True)
+    )
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        # Планувальник шукає лише серед увімкнених сповіщень
+        Index(
+            "ix_user_weather_settings_next_fire_at",
+            next_fire_at,
+            postgresql_where=notification_enabled.is_(True),
+        ),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
+    @property
+    def notification_time(self) -> Optional[str]:
+        if self.notification_minute is None:
+            return None
+        return format_notification_minute(self.notification_minute)
+
+    @notification_time.setter
+    def notification_time(self, value: Optional[str]) -> None:
+        self.notification_minute = (
+            None if value is None else parse_notification_time(value)
+        )
+
+
+class UserMessage(Base):
+    __tablename__ = "user_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(BigInteger, ForeignKey("users.telegram_id"), nullable=True)
+    chat_id = Column(BigInteger, nullable=False)
+    message_text = Column(Text, nullable=False)
+    location_requested = Column(String(255), nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    weather_response = Column(Text, nullable=True)
+    timestamp = Column(DateTime, default=datetime.now)
+
+
+class BotChat(Base):
+    __tablename__ = "bot_chats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(BigInteger, unique=True, index=True)
+    chat_type = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=True)
+    added_at = Column(DateTime, default=datetime.now)
+    last_activity = Column(DateTime, default=datetime.now)
+    is_active = Column(Boolean, default=True)
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # Момент сповіщення за розкладом; разом з user_id робить постановку ідемпотентною
+    fire_at = Column(DateTime(timezone=True), nullable=False)
+    text = Column(Text, nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Для захопленого рядка — кінець оренди: якщо воркер впав, рядок повернеться в чергу
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "fire_at", name="uq_notification_outbox_user_fire"),
+        Index(
+            "ix_notification_outbox_pending",
+            next_attempt_at,
+            postgresql_where=status == "pending",
+        ),
+    )
+
+
+class WeatherAlertRule(Base):
+    __tablename__ = "weather_alert_rules"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # Порівняння агрегату прогнозу на найближчу добу з порогом, напр. rain > 5 (мм)
+    metric = Column(String(20), nullable=False)
+    operator = Column(String(2), nullable=False)
+    threshold = Column(Float, nullable=False)
+    # Останнє спрацювання: поки не мине пауза, правило повторно не надсилається
+    last_alert_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "metric", "operator", "threshold", name="uq_weather_alert_rule"
+        ),
+    )
@@ -0,0 +1,142 @@
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Tuple
+
+from db.models import WeatherAlertRule
+from services.markdown import escape_markdown
+
+MAX_ALERT_RULES = 10
+
+
+class AlertMetric(NamedTuple):
+    variable: str
+    # Сума за горизонт (опади) або екстремум погодинних значень (температура, вітер)
+    total: bool
+    title: str
+    unit: str
+
+
+# Пороги зберігаються в метричних одиницях, тож прогноз для правил завжди
+# запитується в °C, км/год і мм незалежно від налаштувань користувача
+ALERT_METRICS = {
+    "rain": AlertMetric("precipitation", True, "Опади за добу", "мм"),
+    "snow": AlertMetric("snowfall", True, "Сніг за добу", "см"),
+    "temp": AlertMetric("temperature_2m", False, "Температура", "°C"),
+    "wind": AlertMetric("wind_speed_10m", False, "Вітер", "км/год"),
+}
+METRIC_ALIASES = {
+    "rain": "rain",
+    "дощ": "rain",
+    "опади": "rain",
+    "snow": "snow",
+    "сніг": "snow",
+    "temp": "temp",
+    "температура": "temp",
+    "wind": "wind",
+    "вітер": "wind",
+}
+ALERT_PRESETS = {
+    "frost": ("temp", "<", 0.0),
+    "мороз": ("temp", "<", 0.0),
+    "heat": ("temp", ">", 30.0),
+    "спека": ("temp", ">", 30.0),
+}
+ALERT_PARAMS = {
+    "hourly": ",".join(sorted({metric.variable for metric in ALERT_METRICS.values()})),
+    "forecast_days": 2,
+    "timezone": "GMT",
+    "timeformat": "unixtime",
+}
+RULE_PATTERN = re.compile(r"^(\S+?)\s*([<>])\s*(-?\d+(?:\.\d+)?)$")
+
+
+def parse_alert_rule(text: str) -> Tuple[str, str, float]:
+    text = text.strip().lower().replace(",", ".")
+    if text in ALERT_PRESETS:
+        return ALERT_PRESETS[text]
+
+    match = RULE_PATTERN.match(text)
+    if not match:
+        raise ValueError("Формат правила: показник > або < число, напр. rain > 5")
+    name, operator, threshold = match.groups()
+    metric = METRIC_ALIASES.get(name)
+    if metric is None:
+        raise ValueError(f"Невідомий показник: {name}")
+    return metric, operator, float(threshold)
+
+
+def format_alert_rule(metric: str, operator: str, threshold: float) -> str:
+    info = ALERT_METRICS[metric]
+    return f"{info.title} {operator} {threshold:g} {info.unit}"
+
+
+def summarize_forecast(
+    weather_data: Dict, start: datetime, end: datetime
+) -> Dict[str, Tuple[float, float]]:
+    # Для кожного показника — (мінімум, максимум) на горизонті; для сумарних обидва
+    # дорівнюють сумі. Один прохід по погодинних масивах на клітинку
+    hourly = weather_data.get("hourly") or {}
+    times = hourly.get("time") or []
+    first = bisect_left(times, start.timestamp())
+    last = bisect_left(times, end.timestamp())
+
+    summary = {}
+    for metric, info in ALERT_METRICS.items():
+        values = [
+            value
+            for value in (hourly.get(info.variable) or [])[first:last]
+            if value is not None
+        ]
+        if not values:
+            continue
+        if info.total:
+            total = sum(values)
+            summary[metric] = (total, total)
+        else:
+            summary[metric] = (min(values), max(values))
+    return summary
+
+
+def index_rules(
+    rules: List[WeatherAlertRule],
+) -> Dict[Tuple[str, str], Tuple[List[float], List[WeatherAlertRule]]]:
+    # Правила клітинки, відсортовані за порогом окремо для кожного показника й знака
+    groups: Dict[Tuple[str, str], List[WeatherAlertRule]] = {}
+    for rule in rules:
+        groups.setdefault((rule.metric, rule.operator), []).append(rule)
+
+    index = {}
+    for key, group in groups.items():
+        group.sort(key=lambda rule: rule.threshold)
+        index[key] = ([rule.threshold for rule in group], group)
+    return index
+
+
+def triggered_rules(
+    index: Dict[Tuple[str, str], Tuple[List[float], List[WeatherAlertRule]]],
+    summary: Dict[str, Tuple[float, float]],
+) -> List[Tuple[WeatherAlertRule, float]]:
+    # Бінарний пошук замість перевірки кожного правила: O(log n) на показник
+    # плюс кількість спрацювань, скільки б користувачів не було в клітинці
+    triggered = []
+    for (metric, operator), (thresholds, rules) in index.items():
+        if metric not in summary:
+            continue
+        low, high = summary[metric]
+        if operator == ">":
+            matched, value = rules[: bisect_left(thresholds, high)], high
+        else:
+            matched, value = rules[bisect_right(thresholds, low) :], low
+        triggered.extend((rule, value) for rule in matched)
+    return triggered
+
+
+def render_alert(city: str, matches: List[Tuple[WeatherAlertRule, float]]) -> str:
+    lines = [f"⚠️ Погодне попередження — {escape_markdown(city)}:", ""]
+    for rule, value in sorted(matches, key=lambda match: match[0].id):
+        info = ALERT_METRICS[rule.metric]
+        lines.append(
+            f"• {info.title}: {value:.1f} {info.unit} (умова {rule.operator} {rule.threshold:g})"
+        )
+    return "\n".join(lines)
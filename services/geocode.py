@@ -1,8 +1,18 @@
 import httpx
 import os
 from datetime import datetime
+from typing import List
 from config import GEOAPIFY_KEY
 from bot.logger_config import logger
+from services.cache import TTLCache
+
+# Підказки міст для inline-запитів: координати міст не змінюються, тож
+# відповідь на той самий текст запиту тримаємо добу
+PLACE_SEARCH_LIMIT = 5
+PLACE_CACHE_SIZE = 4096
+PLACE_CACHE_TTL = 86400.0
+
+_place_cache = TTLCache(PLACE_CACHE_SIZE, PLACE_CACHE_TTL)
 
 
 async def geocode_place(place: str) -> dict:
@@ -42,11 +52,73 @@ async def geocode_place(place: str) -> dict:
         raise ValueError("Не вдалося отримати координати місця")
 
     logger.info(f"Geoapify результат: '{place}' -> lat={lat}, lon={lon}")
+    return _place(result)
+
+
+def _place(result: dict) -> dict:
     return {
-        "lat": lat,
-        "lon": lon,
+        "lat": result.get("lat"),
+        "lon": result.get("lon"),
         "city": result.get("city"),
         "state": result.get("state"),
         "country": result.get("country"),
         "formatted": result.get("formatted"),
+        "timezone": (result.get("timezone") or {}).get("name"),
     }
+
+
+def normalize_query(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def rank_places(results: List[dict], limit: int = PLACE_SEARCH_LIMIT) -> List[dict]:
+    # Спершу найвідоміші (importance Geoapify), за рівності — порядок релевантності
+    # сервісу; той самий населений пункт з різних джерел лишається один раз
+    ordered = sorted(
+        results, key=lambda result: -((result.get("rank") or {}).get("importance") or 0)
+    )
+    places, seen = [], set()
+    for result in ordered:
+        lat, lon = result.get("lat"), result.get("lon")
+        if lat is None or lon is None:
+            continue
+        point = (round(lat, 2), round(lon, 2))
+        if point in seen:
+            continue
+        seen.add(point)
+        places.append(_place(result))
+        if len(places) == limit:
+            break
+    return places
+
+
+async def search_places(query: str, limit: int = PLACE_SEARCH_LIMIT) -> List[dict]:
+    key = normalize_query(query)
+    if len(key) < 2:
+        return []
+    cached = _place_cache.get((key, limit))
+    if cached is not None:
+        return cached
+
+    # Текст користувача передається параметром, щоб httpx його екранував
+    params = {
+        "text": key,
+        "type": "city",
+        "limit": limit,
+        "format": "json",
+        "apiKey": GEOAPIFY_KEY,
+    }
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(
+                "https://api.geoapify.com/v1/geocode/autocomplete", params=params
+            )
+            response.raise_for_status()
+            data = response.json()
+    except httpx.HTTPError as e:
+        logger.warning(f"Geoapify підказки для '{key}' недоступні: {str(e)}")
+        raise ValueError("Сервіс геокодування не відповідає. Спробуйте пізніше")
+
+    places = rank_places(data.get("results") or [], limit)
+    _place_cache.put((key, limit), places)
+    return places
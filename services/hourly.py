@@ -0,0 +1,144 @@
+from bisect import bisect_left
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from services.weather import WeatherFormatter
+
+HOURLY_PAGE_SIZES = (6, 12, 24)
+DEFAULT_HOURLY_PAGE = 6
+WEEKDAYS = ("Понеділок", "Вівторок", "Середа", "Четвер", "П'ятниця", "Субота", "Неділя")
+
+# Показники рядка години: змінна Open-Meteo -> підпис
+HOURLY_COLUMNS = (
+    ("temperature_2m", "🌡️"),
+    ("precipitation_probability", "☔"),
+    ("precipitation", "🌧️"),
+    ("wind_speed_10m", "💨"),
+)
+
+
+class SeriesView(Sequence):
+    # Вікно над погодинним масивом з кешу прогнозу: зберігає лише межі,
+    # тож сторінка й вкладені зрізи не копіюють дані
+
+    __slots__ = ("_base", "_start", "_stop")
+
+    def __init__(self, base: Sequence, start: int = 0, stop: Optional[int] = None):
+        length = len(base)
+        stop = length if stop is None else min(max(stop, 0), length)
+        self._base = base
+        self._start = min(max(start, 0), stop)
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Зріз з кроком не підтримується")
+            return SeriesView(self._base, self._start + start, self._start + max(stop, start))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Індекс поза вікном")
+        return self._base[self._start + index]
+
+    def __iter__(self):
+        return islice(self._base, self._start, self._stop)
+
+
+class HourlyView(NamedTuple):
+    offset: int
+    hours: int
+    # Скільки годин прогнозу доступно від поточної
+    total: int
+    series: Dict[str, SeriesView]
+    units: Dict[str, str]
+    utc_offset: int
+
+
+def first_hour_index(weather_data: Dict[str, Any], now: datetime) -> int:
+    # Перша година, що ще не минула; past_days і минулі години дня пропускаються
+    times = (weather_data.get("hourly") or {}).get("time") or []
+    if not times:
+        return 0
+    hour_start = now.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if isinstance(times[0], (int, float)):
+        return bisect_left(times, hour_start.timestamp())
+    # iso8601 у місцевому часі локації: рядки порівнюються лексикографічно
+    local = hour_start + timedelta(seconds=weather_data.get("utc_offset_seconds") or 0)
+    return bisect_left(times, local.strftime("%Y-%m-%dT%H:%M"))
+
+
+def hourly_view(
+    weather_data: Dict[str, Any], offset: int, hours: int, now: datetime
+) -> HourlyView:
+    hourly = weather_data.get("hourly") or {}
+    times = hourly.get("time") or []
+    first = first_hour_index(weather_data, now)
+    total = len(times) - first
+    if hours not in HOURLY_PAGE_SIZES:
+        hours = DEFAULT_HOURLY_PAGE
+    # Прогноз міг скоротитися (минув час) — остання сторінка замість порожньої
+    offset = max(0, min(offset, (max(total, 1) - 1) // hours * hours))
+
+    start = first + offset
+    series = {
+        name: SeriesView(values, start, start + hours)
+        for name, values in hourly.items()
+        if isinstance(values, list)
+    }
+    return HourlyView(
+        offset=offset,
+        hours=hours,
+        total=total,
+        series=series,
+        units=weather_data.get("hourly_units") or {},
+        utc_offset=weather_data.get("utc_offset_seconds") or 0,
+    )
+
+
+def _local_time(value, utc_offset: int) -> datetime:
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value + utc_offset, timezone.utc).replace(tzinfo=None)
+    return datetime.fromisoformat(value)
+
+
+def _format_value(value, unit: str) -> str:
+    if isinstance(value, float):
+        value = f"{value:g}"
+    return f"{value}{unit}" if unit in ("%", "°C", "°F") else f"{value} {unit}".rstrip()
+
+
+def render_hourly_view(location_name: str, view: HourlyView) -> str:
+    lines = [f"⏰ **Почасовий прогноз — {location_name}**"]
+    times = view.series.get("time")
+    if not times:
+        lines.append("\nНемає даних почасового прогнозу")
+        return "\n".join(lines)
+
+    codes = view.series.get("weather_code")
+    day = None
+    for index, value in enumerate(times):
+        moment = _local_time(value, view.utc_offset)
+        if moment.date() != day:
+            day = moment.date()
+            lines.append(f"\n📅 **{WEEKDAYS[day.weekday()]}, {day.strftime('%d.%m')}**")
+
+        parts: List[str] = [moment.strftime("%H:%M")]
+        if codes is not None and codes[index] is not None:
+            parts.append(WeatherFormatter.get_weather_description(codes[index])["emoji"])
+        for name, label in HOURLY_COLUMNS:
+            column = view.series.get(name)
+            if column is None or column[index] is None:
+                continue
+            parts.append(f"{label}{_format_value(column[index], view.units.get(name, ''))}")
+        lines.append(" ".join(parts))
+
+    last = min(view.offset + view.hours, view.total)
+    lines.append(f"\nГодини {view.offset + 1}–{last} з {view.total}")
+    return "\n".join(lines)
@@ -0,0 +1,9 @@
+import re
+from typing import Optional
+
+# Службові символи Markdown (не V2), які можуть трапитися в назвах місць
+MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+
+def escape_markdown(value: Optional[str]) -> Optional[str]:
+    return MARKDOWN_SPECIAL.sub(r"\\\1", value) if value else value
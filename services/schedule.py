@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from bot.logger_config import logger
+
+
+def resolve_timezone(
+    timezone_name: Optional[str],
+    resolved_timezone: Optional[str] = None,
+    longitude: Optional[float] = None,
+) -> tzinfo:
+    # "auto" означає часовий пояс локації: беремо визначений при геокодуванні,
+    # інакше наближаємо зсувом за довготою (15° = 1 година)
+    for name in (timezone_name, resolved_timezone):
+        if not name or name == "auto":
+            continue
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Невідомий часовий пояс: {name}")
+
+    if longitude is not None:
+        hours = max(-12, min(14, round(longitude / 15)))
+        return timezone(timedelta(hours=hours))
+    return timezone.utc
+
+
+def next_fire_at_for(
+    notification_enabled: Optional[bool],
+    notification_minute: Optional[int],
+    timezone_name: Optional[str] = None,
+    resolved_timezone: Optional[str] = None,
+    longitude: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> Optional[datetime]:
+    # Найближчий момент (UTC) після now, коли в локальному часі настає notification_minute
+    if not notification_enabled or notification_minute is None:
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    tz = resolve_timezone(timezone_name, resolved_timezone, longitude)
+    local_now = now.astimezone(tz)
+    hour, minute = divmod(notification_minute, 60)
+
+    local_date = local_now.date()
+    for _ in range(3):
+        # Неіснуючий через перехід на літній час час зсувається вперед (fold=0)
+        candidate = datetime(
+            local_date.year, local_date.month, local_date.day, hour, minute, tzinfo=tz
+        ).astimezone(timezone.utc)
+        if candidate > now:
+            return candidate
+        local_date += timedelta(days=1)
+    return candidate
+
+
+# Канал Postgres NOTIFY, яким записи розкладу доходять до планувальників інших процесів
+SCHEDULE_CHANNEL = "schedule_changes"
+
+
+def schedule_payload(telegram_id: int, next_fire_at: Optional[datetime]) -> str:
+    return f"{telegram_id} {next_fire_at.isoformat() if next_fire_at else '-'}"
+
+
+def parse_schedule_payload(payload: str) -> Tuple[int, Optional[datetime]]:
+    telegram_id, _, moment = payload.partition(" ")
+    next_fire_at = None if moment in ("", "-") else datetime.fromisoformat(moment)
+    return int(telegram_id), next_fire_at
@@ -0,0 +1,72 @@
+from typing import Any, Dict, Iterable, Optional
+
+WEEK_DAYS = 7
+# Поля, які вкладки показують незалежно від налаштувань відображення
+CURRENT_VIEW_FIELDS = (
+    "temperature_2m",
+    "relative_humidity_2m",
+    "apparent_temperature",
+    "weather_code",
+    "wind_speed_10m",
+    "wind_direction_10m",
+)
+DAILY_VIEW_FIELDS = (
+    "weather_code",
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "sunrise",
+    "sunset",
+    "precipitation_sum",
+    "precipitation_probability_max",
+    "wind_speed_10m_max",
+)
+# Секції відповіді Open-Meteo, які вкладка бере лише за потреби
+FORECAST_SECTIONS = ("current", "daily", "hourly")
+
+
+def _merge_fields(existing: Optional[str], required: Iterable[str]) -> str:
+    fields = existing.split(",") if existing else []
+    fields += [name for name in required if name not in fields]
+    return ",".join(fields)
+
+
+def full_window_params(api_params: Dict[str, Any]) -> Dict[str, Any]:
+    # Один запит покриває всі вкладки меню погоди: поточну, сьогодні, 3 дні,
+    # тиждень і почасовий прогноз
+    params = dict(api_params)
+    params["current"] = _merge_fields(params.get("current"), CURRENT_VIEW_FIELDS)
+    params["daily"] = _merge_fields(params.get("daily"), DAILY_VIEW_FIELDS)
+    try:
+        days = int(params.get("forecast_days"))
+    except (TypeError, ValueError):
+        days = WEEK_DAYS
+    params["forecast_days"] = max(days, WEEK_DAYS)
+    return params
+
+
+def project_forecast(
+    weather_data: Dict[str, Any], past_days: int, days: int, include_current: bool
+) -> Dict[str, Any]:
+    # Вкладка як проєкція спільної відповіді: метадані, поточна погода за потреби
+    # і щоденний прогноз від сьогодні на days днів. Почасові масиви відкидаються —
+    # вони тут не рендеряться
+    view = {
+        key: value
+        for key, value in weather_data.items()
+        if not key.startswith(FORECAST_SECTIONS)
+    }
+    if include_current and "current" in weather_data:
+        view["current"] = weather_data["current"]
+        if "current_units" in weather_data:
+            view["current_units"] = weather_data["current_units"]
+
+    daily = weather_data.get("daily")
+    if daily:
+        past_days = max(past_days or 0, 0)
+        view["daily"] = {
+            name: values[past_days : past_days + days]
+            for name, values in daily.items()
+        }
+        if "daily_units" in weather_data:
+            view["daily_units"] = weather_data["daily_units"]
+    return view
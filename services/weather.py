@@ -1,7 +1,18 @@
 import httpx
-from typing import Dict, Any, Optional
+import itertools
+import json
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from bot.logger_config import logger
+from services.cache import TTLCache
+
+# Open-Meteo оновлює моделі щогодини: 15 хв свіжості достатньо, щоб гортання
+# почасового прогнозу й повторні перегляди не робили нових запитів
+FORECAST_CACHE_TTL = 900.0
+FORECAST_CACHE_SIZE = 1024
+# Номер, яким кеш позначає кожен збережений прогноз: похідні кеші ключуються
+# ним, а не хешем усього прогнозу
+FORECAST_VERSION_FIELD = "_version"
 
 
 class WeatherAPIError(Exception):
@@ -12,6 +23,8 @@ class WeatherAPIError(Exception):
 class WeatherService:
 
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    # Довжина URL обмежує кількість координат в одному запиті
+    MAX_BATCH_LOCATIONS = 50
 
     @staticmethod
     async def get_weather(
@@ -29,21 +42,45 @@ class WeatherService:
             logger.warning(f"Некоректний тип параметрів: {params}")
             raise WeatherAPIError("Параметри мають бути словником")
 
-        try:
+        api_params = {"latitude": latitude, "longitude": longitude, **params}
 
-            api_params = {"latitude": latitude, "longitude": longitude, **params}
+        if not (-90 <= float(latitude) <= 90) or not (-180 <= float(longitude) <= 180):
+            logger.warning(
+                f"Координати поза межами: latitude={latitude}, longitude={longitude}"
+            )
+            raise WeatherAPIError("Координати поза допустимими межами")
 
-            if not (-90 <= float(latitude) <= 90) or not (
-                -180 <= float(longitude) <= 180
-            ):
-                logger.warning(
-                    f"Координати поза межами: latitude={latitude}, longitude={longitude}"
-                )
-                raise WeatherAPIError("Координати поза допустимими межами")
+        return await WeatherService._request(api_params, f"{latitude}, {longitude}")
 
-            logger.info(
-                f"Запит погоди для {latitude}, {longitude} з параметрами: {api_params}"
+    @staticmethod
+    async def get_weather_batch(
+        coordinates: List[Tuple[float, float]], params: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        # Open-Meteo приймає координати списком через кому і відповідає масивом
+        # у тому ж порядку — один запит на всі локації з однаковими параметрами
+        if not coordinates:
+            return []
+
+        api_params = {
+            **params,
+            "latitude": ",".join(str(lat) for lat, _ in coordinates),
+            "longitude": ",".join(str(lon) for _, lon in coordinates),
+        }
+        data = await WeatherService._request(
+            api_params, f"{len(coordinates)} локацій"
+        )
+        forecasts = data if isinstance(data, list) else [data]
+        if len(forecasts) != len(coordinates):
+            logger.error(
+                f"Open-Meteo повернув {len(forecasts)} прогнозів на {len(coordinates)} локацій"
             )
+            raise WeatherAPIError("Технічна помилка. Спробуйте пізніше")
+        return forecasts
+
+    @staticmethod
+    async def _request(api_params: Dict[str, Any], target: str) -> Any:
+        try:
+            logger.info(f"Запит погоди для {target} з параметрами: {api_params}")
 
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.get(WeatherService.BASE_URL, params=api_params)
@@ -51,11 +88,11 @@ class WeatherService:
 
                 data = response.json()
 
-                if "error" in data:
+                if isinstance(data, dict) and "error" in data:
                     logger.error(f"Open-Meteo API повернув помилку: {data['error']}")
                     raise WeatherAPIError(f"API помилка: {data['error']}")
 
-                logger.info(f"Успішно отримано дані погоди для {latitude}, {longitude}")
+                logger.info(f"Успішно отримано дані погоди для {target}")
 
                 return data
 
@@ -319,6 +356,35 @@ class WeatherFormatter:
             return dt_str
 
 
+def forecast_key(latitude: float, longitude: float, params: Dict[str, Any]) -> str:
+    return json.dumps(
+        {**params, "latitude": latitude, "longitude": longitude},
+        sort_keys=True,
+        default=str,
+    )
+
+
+# Записи спільні для всіх читачів — отриманий прогноз не змінюється
+forecast_cache = TTLCache(FORECAST_CACHE_SIZE, FORECAST_CACHE_TTL)
+_forecast_versions = itertools.count(1)
+
+
+def _store_forecast(key: str, data: Dict[str, Any]) -> None:
+    data[FORECAST_VERSION_FIELD] = next(_forecast_versions)
+    forecast_cache.put(key, data)
+
+
+async def get_cached_weather(
+    latitude: float, longitude: float, params: Dict[str, Any]
+) -> Dict[str, Any]:
+    key = forecast_key(latitude, longitude, params)
+    data = forecast_cache.get(key)
+    if data is None:
+        data = await get_weather(latitude, longitude, params)
+        _store_forecast(key, data)
+    return data
+
+
 async def get_weather(
     latitude: float, longitude: float, params: Dict[str, Any]
 ) -> Dict[str, Any]:
@@ -327,3 +393,49 @@ async def get_weather(
     )
 
     return await WeatherService.get_weather(latitude, longitude, validated_params)
+
+
+async def get_weather_batch(
+    coordinates: List[Tuple[float, float]], params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    validated = [
+        WeatherService.validate_parameters(
+            {"latitude": latitude, "longitude": longitude, **params}
+        )
+        for latitude, longitude in coordinates
+    ]
+    if not validated:
+        return []
+    clean_params = {
+        key: value
+        for key, value in validated[0].items()
+        if key not in ("latitude", "longitude")
+    }
+    points = [(item["latitude"], item["longitude"]) for item in validated]
+
+    forecasts = []
+    step = WeatherService.MAX_BATCH_LOCATIONS
+    for start in range(0, len(points), step):
+        forecasts.extend(
+            await WeatherService.get_weather_batch(
+                points[start : start + step], clean_params
+            )
+        )
+    return forecasts
+
+
+async def get_cached_weather_batch(
+    coordinates: List[Tuple[float, float]], params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    # Локації без свіжого прогнозу в кеші дозапитуються одним пакетним запитом
+    keys = [forecast_key(latitude, longitude, params) for latitude, longitude in coordinates]
+    forecasts = [forecast_cache.get(key) for key in keys]
+    missing = [index for index, data in enumerate(forecasts) if data is None]
+    if missing:
+        fetched = await get_weather_batch(
+            [coordinates[index] for index in missing], params
+        )
+        for index, data in zip(missing, fetched):
+            _store_forecast(keys[index], data)
+            forecasts[index] = data
+    return forecasts
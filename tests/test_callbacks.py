@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from bot.callbacks import CallbackRouter, SetForecast, SetTimezone, SetUnit, Toggle
+
+
+async def plain_handler(call):
+    return "plain"
+
+
+async def state_handler(call, state):
+    return state
+
+
+async def factory_handler(call, callback_data):
+    return callback_data
+
+
+def test_factories_keep_legacy_format():
+    """Тест що фабрики пакують дані у формат старих кнопок"""
+    assert Toggle(setting="show_wind").pack() == "toggle:show_wind"
+    assert SetUnit(unit_type="wind_speed_unit", value="ms").pack() == "set_unit:wind_speed_unit:ms"
+    assert SetForecast(field="past_days", days=3).pack() == "set_forecast:past_days:3"
+    assert SetTimezone.unpack("set_timezone:Europe/Kyiv").timezone == "Europe/Kyiv"
+
+
+def test_router_resolves_exact_and_factory_routes():
+    """Тест пошуку обробника: точний збіг, звужений маршрут фабрики, префікс"""
+    fallback = AsyncMock()
+    router = CallbackRouter(fallback=fallback)
+    days_handler, units_handler, timeformat_handler = AsyncMock(), AsyncMock(), AsyncMock()
+    router.action("menu:main", plain_handler)
+    router.factory(SetForecast, days_handler, action="days")
+    router.factory(SetUnit, units_handler)
+    router.factory(SetUnit, timeformat_handler, action="timeformat")
+
+    assert router.resolve("menu:main") == (plain_handler, {})
+
+    handler, kwargs = router.resolve("set_forecast:days:7")
+    assert handler is days_handler
+    assert kwargs["callback_data"].days == 7
+
+    assert router.resolve("set_unit:timeformat:unixtime")[0] is timeformat_handler
+    assert router.resolve("set_unit:temperature_unit:celsius")[0] is units_handler
+    # Невідомий маршрут фабрики і пошкоджені дані йдуть у запасний обробник
+    assert router.resolve("set_forecast:past_days:3") == (fallback, {})
+    assert router.resolve("set_forecast:days:many") == (fallback, {})
+    assert router.resolve(None) == (fallback, {})
+
+
+@pytest.mark.asyncio
+async def test_router_dispatch_passes_state_only_when_needed():
+    """Тест що FSM-стан передається лише обробникам, які його приймають"""
+    router = CallbackRouter()
+    router.action("menu:main", plain_handler)
+    router.action("location:set", state_handler)
+    router.factory(Toggle, factory_handler)
+    state = MagicMock()
+
+    assert await router.dispatch(MagicMock(data="menu:main"), state) == "plain"
+    assert await router.dispatch(MagicMock(data="location:set"), state) is state
+    toggle = await router.dispatch(MagicMock(data="toggle:show_uv_index"), state)
+    assert toggle.setting == "show_uv_index"
+    assert await router.dispatch(MagicMock(data="unknown"), state) is None
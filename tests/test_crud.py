@@ -1,14 +1,22 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import User, UserWeatherSettings, UserMessage, BotChat
+from db.models import (
+    User,
+    UserWeatherSettings,
+    UserMessage,
+    BotChat,
+    DISPLAY_FLAG_BITS,
+)
 from db.crud import (
     get_or_create_user,
     create_default_weather_settings,
     get_user_weather_settings,
     update_user_location,
+    update_user_timezone,
     update_user_units,
     toggle_display_setting,
     update_forecast_settings,
@@ -24,6 +32,13 @@ from db.crud import (
     get_user_state,
     set_user_state,
     save_notification_time,
+    advance_next_fire_times,
+    enqueue_notifications,
+    claim_outbox_batch,
+    complete_outbox_batch,
+    deactivate_users,
+    add_alert_rule,
+    claim_alert_rules,
 )
 
 
@@ -72,6 +87,20 @@ def sample_settings():
     )
 
 
+def executed_sql(mock_session, call_index=0):
+    """Скомпільований SQL і параметри виконаного запиту"""
+    stmt = mock_session.execute.call_args_list[call_index].args[0]
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+def returning_row(*values):
+    """Результат UPDATE ... RETURNING з одним рядком"""
+    result = MagicMock()
+    result.first.return_value = values
+    return result
+
+
 # === ТЕСТИ ДЛЯ КОРИСТУВАЧІВ ===
 
 
@@ -79,39 +108,76 @@ def sample_settings():
 async def test_get_or_create_user_new_user(mock_session, sample_user):
     """Тест створення нового користувача"""
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
+    mock_result.one_or_none.return_value = (sample_user, True)
     mock_session.execute.return_value = mock_result
 
-    with patch("db.crud.create_default_weather_settings", new_callable=AsyncMock):
-        user = await get_or_create_user(
-            mock_session,
-            telegram_id=123456789,
-            username="testuser",
-            first_name="Test",
-            last_name="User",
-            language_code="uk",
-        )
+    user = await get_or_create_user(
+        mock_session,
+        telegram_id=123456789,
+        username="testuser",
+        first_name="Test",
+        last_name="User",
+        language_code="uk",
+    )
 
-    mock_session.add.assert_called_once()
-    mock_session.commit.assert_called()
-    assert mock_session.refresh.called
+    assert user is sample_user
+    mock_session.execute.assert_called_once()
+    mock_session.add.assert_not_called()
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_single_upsert_statement(mock_session, sample_user):
+    """Тест що користувач і дефолтні налаштування пишуться одним запитом"""
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = (sample_user, False)
+    mock_session.execute.return_value = mock_result
+
+    await get_or_create_user(mock_session, telegram_id=123456789, username="testuser")
+
+    sql, params = executed_sql(mock_session)
+    assert "ON CONFLICT (telegram_id) DO UPDATE SET username = excluded.username" in sql
+    assert "users.username IS DISTINCT FROM excluded.username" in sql
+    assert "first_name = excluded.first_name" not in sql
+    assert "INSERT INTO user_weather_settings" in sql
+    assert "ON CONFLICT (user_id) DO NOTHING" in sql
+    assert "UNION ALL" in sql
+    # Повернення користувача, що раніше заблокував бота, знову робить його активним
+    assert "users.is_active IS NOT true" in sql
+    assert 123456789 in params.values()
 
 
 @pytest.mark.asyncio
 async def test_get_or_create_user_existing_user(mock_session, sample_user):
     """Тест отримання існуючого користувача"""
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = sample_user
+    mock_result.one_or_none.return_value = (sample_user, None)
     mock_session.execute.return_value = mock_result
 
     user = await get_or_create_user(
-        mock_session, telegram_id=123456789, username="newusername"
+        mock_session, telegram_id=123456789, username="testuser"
     )
 
-    assert user.username == "newusername"
+    assert user.username == "testuser"
+    mock_session.execute.assert_called_once()
     mock_session.commit.assert_called()
 
 
+@pytest.mark.asyncio
+async def test_get_or_create_user_concurrent_insert(mock_session, sample_user):
+    """Тест дочитування користувача, вставленого паралельним запитом"""
+    upsert_result = MagicMock()
+    upsert_result.one_or_none.return_value = None
+    select_result = MagicMock()
+    select_result.scalar_one.return_value = sample_user
+    mock_session.execute.side_effect = [upsert_result, select_result]
+
+    user = await get_or_create_user(mock_session, telegram_id=123456789)
+
+    assert user is sample_user
+    assert mock_session.execute.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_create_default_weather_settings(mock_session):
     """Тест створення дефолтних налаштувань"""
@@ -141,134 +207,233 @@ async def test_get_user_weather_settings_existing(mock_session, sample_settings)
 @pytest.mark.asyncio
 async def test_get_user_weather_settings_create_if_not_exists(mock_session):
     """Тест створення налаштувань, якщо їх немає"""
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = None
-    mock_session.execute.return_value = mock_result
+    missing = MagicMock()
+    missing.scalar_one_or_none.return_value = None
+    created = MagicMock()
+    created.scalar_one.return_value = UserWeatherSettings(user_id=123456789)
+    mock_session.execute.side_effect = [missing, created]
 
-    with patch("db.crud.get_or_create_user", new_callable=AsyncMock):
-        with patch(
-            "db.crud.create_default_weather_settings", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.return_value = UserWeatherSettings(user_id=123456789)
-            settings = await get_user_weather_settings(mock_session, 123456789)
+    with patch("db.crud.get_or_create_user", new_callable=AsyncMock) as mock_upsert:
+        settings = await get_user_weather_settings(mock_session, 123456789)
 
-            mock_create.assert_called_once()
+        mock_upsert.assert_called_once_with(mock_session, 123456789)
+        assert settings.user_id == 123456789
 
 
 @pytest.mark.asyncio
-async def test_update_user_location(mock_session, sample_settings):
+async def test_update_user_location(mock_session):
     """Тест оновлення локації користувача"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(
+        1, False, None, "Europe/Kiev", None, 24.0297
+    )
+
+    await update_user_location(
+        mock_session,
+        telegram_id=123456789,
+        latitude=49.8397,
+        longitude=24.0297,
+        location_name="Lviv",
+        elevation=296.0,
+        timezone="Europe/Kiev",
+    )
+
+    sql, params = executed_sql(mock_session)
+    assert sql.startswith("UPDATE user_weather_settings SET")
+    assert "RETURNING" in sql
+    assert params["latitude"] == 49.8397
+    assert params["longitude"] == 24.0297
+    assert params["location_name"] == "Lviv"
+    assert params["elevation"] == 296.0
+    # Сповіщення вимкнені — розклад скидається
+    _, schedule_params = executed_sql(mock_session, call_index=1)
+    assert schedule_params["next_fire_at"] is None
+    mock_session.commit.assert_called_once()
 
+
+@pytest.mark.asyncio
+async def test_update_user_location_creates_missing_settings(mock_session):
+    """Тест що UPDATE повторюється після створення дефолтних налаштувань"""
+    missing = MagicMock()
+    missing.first.return_value = None
+    mock_session.execute.side_effect = [
+        missing,
+        returning_row(1, False, None, "auto", None, 24.0),
+        MagicMock(),
+    ]
+
+    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
         await update_user_location(
-            mock_session,
-            telegram_id=123456789,
-            latitude=49.8397,
-            longitude=24.0297,
-            location_name="Lviv",
-            elevation=296.0,
-            timezone="Europe/Kiev",
+            mock_session, telegram_id=123456789, latitude=49.8, longitude=24.0
         )
 
-        assert sample_settings.latitude == 49.8397
-        assert sample_settings.longitude == 24.0297
-        assert sample_settings.location_name == "Lviv"
-        assert sample_settings.elevation == 296.0
-        mock_session.commit.assert_called()
+        mock_get.assert_called_once_with(mock_session, 123456789)
+        assert mock_session.execute.call_count == 3
+        mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_update_user_timezone(mock_session):
+    """Тест оновлення часового поясу з перерахунком розкладу"""
+    mock_session.execute.return_value = returning_row(
+        1, True, 8 * 60, "Europe/Kyiv", None, 30.5
+    )
+
+    next_fire_at = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+    with patch("db.crud.next_fire_at_for", return_value=next_fire_at) as mock_next:
+        await update_user_timezone(mock_session, 123456789, "Europe/Kyiv")
+
+    sql, params = executed_sql(mock_session)
+    assert params["timezone"] == "Europe/Kyiv"
+    assert "user_weather_settings.next_fire_at" not in sql
+    assert "user_weather_settings.resolved_timezone" in sql
+    mock_next.assert_called_once_with(True, 8 * 60, "Europe/Kyiv", None, 30.5)
+    schedule_sql, schedule_params = executed_sql(mock_session, call_index=1)
+    assert schedule_params["next_fire_at"] == next_fire_at
+    # Інші процеси дізнаються про зміну через NOTIFY після commit
+    assert "RETURNING pg_notify(" in schedule_sql
+    assert "123456789 2026-01-15T06:00:00+00:00" in schedule_params.values()
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_update_user_units_keeps_schedule(mock_session):
+    """Тест що зміна одиниць не перераховує розклад сповіщень"""
+    mock_session.execute.return_value = returning_row(1)
+
+    await update_user_units(mock_session, 123456789, temperature_unit="fahrenheit")
+
+    sql, _ = executed_sql(mock_session)
+    assert "notification_minute" not in sql
+    mock_session.execute.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_update_user_units(mock_session, sample_settings):
+async def test_update_user_units(mock_session):
     """Тест оновлення одиниць виміру"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(1)
 
-        await update_user_units(
-            mock_session,
-            telegram_id=123456789,
-            temperature_unit="fahrenheit",
-            wind_speed_unit="mph",
-            precipitation_unit="inch",
-            past_days=5,
-        )
+    await update_user_units(
+        mock_session,
+        telegram_id=123456789,
+        temperature_unit="fahrenheit",
+        wind_speed_unit="mph",
+        precipitation_unit="inch",
+        past_days=5,
+    )
 
-        assert sample_settings.temperature_unit == "fahrenheit"
-        assert sample_settings.wind_speed_unit == "mph"
-        assert sample_settings.precipitation_unit == "inch"
-        assert sample_settings.past_days == 5
-        mock_session.commit.assert_called()
+    _, params = executed_sql(mock_session)
+    assert params["temperature_unit"] == "fahrenheit"
+    assert params["wind_speed_unit"] == "mph"
+    assert params["precipitation_unit"] == "inch"
+    assert params["past_days"] == 5
+    mock_session.execute.assert_called_once()
+    mock_session.commit.assert_called()
 
 
 @pytest.mark.asyncio
-async def test_toggle_display_setting(mock_session, sample_settings):
+async def test_update_user_units_ignores_invalid_values(mock_session):
+    """Тест що некоректні одиниці не потрапляють в UPDATE"""
+    mock_session.execute.return_value = returning_row(1)
+
+    await update_user_units(
+        mock_session, telegram_id=123456789, temperature_unit="kelvin"
+    )
+
+    _, params = executed_sql(mock_session)
+    assert "temperature_unit" not in params
+
+
+@pytest.mark.asyncio
+async def test_toggle_display_setting(mock_session):
     """Тест перемикання налаштувань відображення"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(False)
 
-        initial_value = sample_settings.show_temperature
-        new_value = await toggle_display_setting(
-            mock_session, 123456789, "show_temperature"
-        )
+    new_value = await toggle_display_setting(
+        mock_session, 123456789, "show_temperature"
+    )
 
-        assert new_value != initial_value
-        assert sample_settings.show_temperature == new_value
-        mock_session.commit.assert_called()
+    sql, params = executed_sql(mock_session)
+    assert new_value is False
+    assert "display_flags=(user_weather_settings.display_flags #" in sql
+    assert "RETURNING (user_weather_settings.display_flags &" in sql
+    assert params["display_flags_1"] == DISPLAY_FLAG_BITS["show_temperature"]
+    mock_session.execute.assert_called_once()
+    mock_session.commit.assert_called()
 
 
 @pytest.mark.asyncio
-async def test_toggle_display_setting_invalid(mock_session, sample_settings):
+async def test_toggle_notification_enabled(mock_session):
+    """Тест перемикання сповіщень окремою Boolean-колонкою"""
+    mock_session.execute.return_value = returning_row(True, True, 9 * 60, "UTC", None, 0.0)
+
+    new_value = await toggle_display_setting(
+        mock_session, 123456789, "notification_enabled"
+    )
+
+    sql, _ = executed_sql(mock_session)
+    assert new_value is True
+    assert "notification_enabled=NOT coalesce(" in sql
+    assert mock_session.execute.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_toggle_display_setting_invalid(mock_session):
     """Тест перемикання неіснуючого параметра"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    with pytest.raises(ValueError, match="Невідомий параметр"):
+        await toggle_display_setting(mock_session, 123456789, "invalid_setting")
 
-        with pytest.raises(ValueError, match="Невідомий параметр"):
-            await toggle_display_setting(mock_session, 123456789, "invalid_setting")
+    with pytest.raises(ValueError, match="Невідомий параметр"):
+        await toggle_display_setting(mock_session, 123456789, "latitude")
+
+    mock_session.execute.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_update_forecast_settings(mock_session, sample_settings):
+async def test_update_forecast_settings(mock_session):
     """Тест оновлення налаштувань прогнозу"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(1)
 
-        await update_forecast_settings(
-            mock_session, telegram_id=123456789, forecast_days=10, past_days=7
-        )
+    await update_forecast_settings(
+        mock_session, telegram_id=123456789, forecast_days=10, past_days=7
+    )
 
-        assert sample_settings.forecast_days == 10
-        assert sample_settings.past_days == 7
-        mock_session.commit.assert_called()
+    _, params = executed_sql(mock_session)
+    assert params["forecast_days"] == 10
+    assert params["past_days"] == 7
+    mock_session.commit.assert_called()
 
 
 @pytest.mark.asyncio
-async def test_update_notification_settings(mock_session, sample_settings):
+async def test_update_notification_settings(mock_session):
     """Тест оновлення налаштувань сповіщень"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(
+        1, True, 8 * 60 + 30, "UTC", None, None
+    )
 
-        await update_notification_settings(
-            mock_session,
-            telegram_id=123456789,
-            notification_enabled=True,
-            notification_time="08:30",
-        )
+    await update_notification_settings(
+        mock_session,
+        telegram_id=123456789,
+        notification_enabled=True,
+        notification_time="08:30",
+    )
 
-        assert sample_settings.notification_enabled is True
-        assert sample_settings.notification_time == "08:30"
-        mock_session.commit.assert_called()
+    _, params = executed_sql(mock_session)
+    assert params["notification_enabled"] is True
+    assert params["notification_minute"] == 8 * 60 + 30
+    _, schedule_params = executed_sql(mock_session, call_index=1)
+    assert schedule_params["next_fire_at"].tzinfo is not None
+    mock_session.commit.assert_called()
 
 
 @pytest.mark.asyncio
-async def test_update_notification_settings_invalid_time(mock_session, sample_settings):
+async def test_update_notification_settings_invalid_time(mock_session):
     """Тест оновлення з некоректним часом"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    with pytest.raises(ValueError, match="Час повинен бути у форматі HH:MM"):
+        await update_notification_settings(
+            mock_session, telegram_id=123456789, notification_time="25:99"
+        )
 
-        with pytest.raises(ValueError, match="Час повинен бути у форматі HH:MM"):
-            await update_notification_settings(
-                mock_session, telegram_id=123456789, notification_time="25:99"
-            )
+    mock_session.execute.assert_not_called()
 
 
 # === ТЕСТИ ДЛЯ API ПАРАМЕТРІВ ===
@@ -289,6 +454,34 @@ async def test_get_api_parameters(mock_session, sample_settings):
         assert "temperature_2m" in params["hourly"]
 
 
+@pytest.mark.asyncio
+async def test_get_api_parameters_uses_stored_signature(mock_session, sample_settings):
+    """Тест що параметри читаються з готового підпису налаштувань"""
+    sample_settings.api_signature = "temperature_2m,weather_code||"
+
+    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = sample_settings
+
+        params = await get_api_parameters(mock_session, 123456789)
+
+        assert params["hourly"] == "temperature_2m,weather_code"
+        assert "daily" not in params
+        assert "current" not in params
+
+
+@pytest.mark.asyncio
+async def test_get_api_parameters_deterministic(mock_session, sample_settings):
+    """Тест що однакові налаштування дають однакові параметри"""
+    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = sample_settings
+
+        first = await get_api_parameters(mock_session, 123456789)
+        second = await get_api_parameters(mock_session, 123456789)
+
+        assert first == second
+        assert first["hourly"].split(",")[0] == "temperature_2m"
+
+
 @pytest.mark.asyncio
 async def test_get_api_parameters_no_location(mock_session, sample_settings):
     """Тест отримання параметрів без локації"""
@@ -441,15 +634,15 @@ async def test_get_settings(mock_session, sample_settings):
 
 
 @pytest.mark.asyncio
-async def test_update_setting(mock_session, sample_settings):
+async def test_update_setting(mock_session):
     """Тест оновлення налаштування (legacy)"""
-    with patch("db.crud.get_user_weather_settings", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = sample_settings
+    mock_session.execute.return_value = returning_row(1)
 
-        await update_setting(mock_session, 123456789, "temperature_unit", "fahrenheit")
+    await update_setting(mock_session, 123456789, "temperature_unit", "fahrenheit")
 
-        assert sample_settings.temperature_unit == "fahrenheit"
-        mock_session.commit.assert_called()
+    _, params = executed_sql(mock_session)
+    assert params["temperature_unit"] == "fahrenheit"
+    mock_session.commit.assert_called()
 
 
 @pytest.mark.asyncio
@@ -474,14 +667,184 @@ async def test_set_user_state(mock_session):
 
 
 @pytest.mark.asyncio
-async def test_save_notification_time(mock_session, sample_settings):
+async def test_save_notification_time(mock_session):
     """Тест збереження часу сповіщень"""
-    mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = sample_settings
-    mock_session.execute.return_value = mock_result
+    mock_session.execute.return_value = returning_row(
+        1, True, 9 * 60, "auto", "Europe/Kyiv", 30.5
+    )
 
     await save_notification_time(mock_session, 123456789, "09:00")
 
-    assert sample_settings.notification_time == "09:00"
-    assert sample_settings.notification_enabled is True
+    sql, params = executed_sql(mock_session)
+    assert sql.startswith("UPDATE user_weather_settings SET")
+    assert params["notification_minute"] == 9 * 60
+    assert params["notification_enabled"] is True
+    _, schedule_params = executed_sql(mock_session, call_index=1)
+    next_fire_at = schedule_params["next_fire_at"]
+    assert (next_fire_at.hour, next_fire_at.minute) in {(6, 0), (7, 0)}
+    assert mock_session.execute.call_count == 2
     mock_session.commit.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_save_notification_time_invalid(mock_session):
+    """Тест що некоректний час не потрапляє в БД"""
+    with pytest.raises(ValueError, match="Час повинен бути у форматі HH:MM"):
+        await save_notification_time(mock_session, 123456789, "25:99")
+
+    mock_session.execute.assert_not_called()
+
+
+# === ТЕСТИ ДЛЯ ПЛАНУВАЛЬНИКА ===
+
+
+@pytest.mark.asyncio
+async def test_advance_next_fire_times_is_conditional_batch(mock_session):
+    """Тест що перенесення розкладу — один UPDATE, що не затирає новіших записів"""
+    fired_at = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+    next_fire_at = fired_at + timedelta(days=1)
+    mock_result = MagicMock()
+    mock_result.all.return_value = [(123, "")]
+    mock_session.execute.return_value = mock_result
+
+    advanced = await advance_next_fire_times(
+        mock_session, [(123, fired_at, next_fire_at), (456, None, next_fire_at)]
+    )
+
+    sql, params = executed_sql(mock_session)
+    assert advanced == {123}
+    assert mock_session.execute.call_count == 1
+    assert "user_weather_settings.next_fire_at IS NOT DISTINCT FROM advance.fired_at" in sql
+    assert "notification_enabled IS true" in sql
+    assert "pg_notify(" in sql
+    assert [123, 456] in params.values()
+    assert [f"123 {next_fire_at.isoformat()}", f"456 {next_fire_at.isoformat()}"] in params.values()
+    mock_session.commit.assert_not_called()
+
+    assert await advance_next_fire_times(mock_session, []) == set()
+    assert mock_session.execute.call_count == 1
+
+
+# === ТЕСТИ ДЛЯ ЧЕРГИ СПОВІЩЕНЬ ===
+
+
+@pytest.mark.asyncio
+async def test_enqueue_notifications_is_idempotent(mock_session):
+    """Тест що постановка в чергу ігнорує повтор (user_id, fire_at)"""
+    fire_at = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+    await enqueue_notifications(
+        mock_session, [{"user_id": 1, "fire_at": fire_at, "text": "hi"}]
+    )
+
+    sql, _ = executed_sql(mock_session)
+    assert sql.startswith("INSERT INTO notification_outbox")
+    assert "ON CONFLICT ON CONSTRAINT uq_notification_outbox_user_fire DO NOTHING" in sql
+    mock_session.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_notifications_empty(mock_session):
+    """Тест що порожній список не звертається до БД"""
+    await enqueue_notifications(mock_session, [])
+    mock_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_claim_outbox_batch_skips_locked(mock_session):
+    """Тест захоплення порції з SKIP LOCKED і орендою"""
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = []
+    mock_session.execute.return_value = mock_result
+
+    await claim_outbox_batch(mock_session, 300, timedelta(minutes=5))
+
+    sql, params = executed_sql(mock_session)
+    assert sql.startswith("UPDATE notification_outbox SET")
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "attempts=(notification_outbox.attempts +" in sql
+    assert "RETURNING" in sql
+    assert params["param_1"] == 300
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_complete_outbox_batch(mock_session):
+    """Тест позначки надісланих і повторних спроб однією транзакцією"""
+    failures = [
+        {
+            "id": 2,
+            "status": "pending",
+            "next_attempt_at": datetime.now(timezone.utc),
+            "last_error": "timeout",
+        }
+    ]
+    await complete_outbox_batch(mock_session, [1], failures)
+
+    sql, params = executed_sql(mock_session)
+    assert "status=%(status)s" in sql
+    assert params["status"] == "sent"
+    assert mock_session.execute.call_args_list[1].args[1] == failures
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_deactivate_users(mock_session):
+    """Тест вимкнення сповіщень для недоступних отримувачів однією транзакцією"""
+    mock_result = MagicMock()
+    mock_result.rowcount = 2
+    mock_session.execute.return_value = mock_result
+
+    disabled = await deactivate_users(mock_session, [103, 101, 103])
+
+    assert disabled == 2
+    assert mock_session.execute.call_count == 3
+    users_sql, users_params = executed_sql(mock_session, 0)
+    assert users_sql.startswith("UPDATE users SET is_active")
+    assert [101, 103] in users_params.values()
+    settings_sql, _ = executed_sql(mock_session, 1)
+    assert "notification_enabled" in settings_sql
+    assert "pg_notify" in settings_sql
+    outbox_sql, outbox_params = executed_sql(mock_session, 2)
+    assert outbox_sql.startswith("UPDATE notification_outbox SET status")
+    assert "pending" in outbox_params.values()
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_deactivate_users_empty(mock_session):
+    """Тест що порожній список не звертається до БД"""
+    assert await deactivate_users(mock_session, []) == 0
+    mock_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_add_alert_rule_is_idempotent(mock_session):
+    """Тест що повторне правило не додається вдруге"""
+    mock_result = MagicMock()
+    mock_result.first.return_value = None
+    mock_session.execute.return_value = mock_result
+
+    created = await add_alert_rule(mock_session, 123456789, "rain", ">", 5.0)
+
+    assert created is False
+    sql, _ = executed_sql(mock_session)
+    assert "ON CONFLICT ON CONSTRAINT uq_weather_alert_rule DO NOTHING" in sql
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_claim_alert_rules_is_conditional(mock_session):
+    """Тест що правило забирається лише якщо пауза після спрацювання минула"""
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [1]
+    mock_session.execute.return_value = mock_result
+    now = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+
+    claimed = await claim_alert_rules(mock_session, [1, 2], now - timedelta(days=1), now)
+
+    assert claimed == {1}
+    sql, _ = executed_sql(mock_session)
+    assert sql.startswith("UPDATE weather_alert_rules SET last_alert_at")
+    assert "weather_alert_rules.last_alert_at IS NULL OR" in sql
+    assert "RETURNING weather_alert_rules.id" in sql
+    mock_session.commit.assert_not_called()
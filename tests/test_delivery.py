@@ -0,0 +1,153 @@
+import pytest
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from bot.delivery import DeliveryPipeline, TokenBucket, dead_recipient_reason
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Тест що відро не видає більше токенів, ніж дозволяє швидкість"""
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    # Перший токен є одразу, решта п'ять — по 20 мс
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_pause():
+    """Тест що пауза затримує наступний токен"""
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(0.05)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.045
+
+
+@pytest.mark.asyncio
+async def test_pipeline_delivers_all_in_order():
+    """Тест що результати повертаються в порядку повідомлень"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=[None, RuntimeError("blocked"), None])
+    pipeline = DeliveryPipeline(bot, workers=1, rate=1000, chat_rate=1000)
+
+    results = await pipeline.deliver(
+        [(1, "a"), (2, "b"), (3, "c")], parse_mode="Markdown"
+    )
+
+    assert results[0] is None
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] is None
+    bot.send_message.assert_any_call(1, "a", parse_mode="Markdown")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_retries_after_flood_control():
+    """Тест що RetryAfter призупиняє відро і повідомлення надсилається повторно"""
+    bot = MagicMock()
+    retry = TelegramRetryAfter(method=MagicMock(), message="Flood", retry_after=0)
+    bot.send_message = AsyncMock(side_effect=[retry, None])
+    pipeline = DeliveryPipeline(bot, workers=2, rate=1000, chat_rate=1000)
+    pipeline.bucket.pause = MagicMock(wraps=pipeline.bucket.pause)
+
+    results = await pipeline.deliver([(1, "a")])
+
+    assert results == [None]
+    assert bot.send_message.call_count == 2
+    pipeline.bucket.pause.assert_called_once_with(0)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_gives_up_after_max_attempts():
+    """Тест що після вичерпання спроб повертається остання помилка"""
+    bot = MagicMock()
+    retry = TelegramRetryAfter(method=MagicMock(), message="Flood", retry_after=0)
+    bot.send_message = AsyncMock(side_effect=retry)
+    pipeline = DeliveryPipeline(bot, rate=1000, chat_rate=1000, max_attempts=2)
+
+    results = await pipeline.deliver([(1, "a")])
+
+    assert results == [retry]
+    assert bot.send_message.call_count == 2
+
+
+
+@pytest.mark.asyncio
+async def test_pipeline_keeps_chat_buckets_between_calls():
+    """Тест що ліміт на чат діє між окремими викликами deliver"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    pipeline = DeliveryPipeline(bot, workers=1, rate=1000, chat_rate=20)
+
+    await pipeline.deliver([(1, "a")])
+    started = time.monotonic()
+    await pipeline.deliver([(1, "b")])
+
+    # Друга порція чекає на токен чату, а не починає з повного відра
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_pipeline_forgets_full_chat_buckets():
+    """Тест що наповнені відра чатів видаляються"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    pipeline = DeliveryPipeline(bot, workers=1, rate=1000, chat_rate=1000)
+
+    await pipeline.deliver([(1, "a"), (2, "b")])
+    time.sleep(0.01)
+    await pipeline.deliver([(3, "c")])
+
+    assert set(pipeline._chat_buckets) == {3}
+
+
+def test_pipeline_shares_rate_between_members():
+    """Тест що спільний ліміт ділиться між процесами"""
+    pipeline = DeliveryPipeline(MagicMock(), rate=30)
+
+    pipeline.share_rate(3)
+    assert pipeline.bucket.rate == 10
+    assert pipeline.bucket.capacity == 10
+
+    pipeline.share_rate(0)
+    assert pipeline.bucket.rate == 30
+
+
+def test_dead_recipient_reason():
+    """Тест класифікації помилок, після яких отримувач недоступний назавжди"""
+    method = MagicMock()
+    assert (
+        dead_recipient_reason(
+            TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        )
+        == "blocked"
+    )
+    assert (
+        dead_recipient_reason(
+            TelegramForbiddenError(method=method, message="Forbidden: user is deactivated")
+        )
+        == "deactivated"
+    )
+    assert (
+        dead_recipient_reason(
+            TelegramBadRequest(method=method, message="Bad Request: chat not found")
+        )
+        == "chat_not_found"
+    )
+    # Помилка розмітки — проблема тексту, а не отримувача
+    assert (
+        dead_recipient_reason(
+            TelegramBadRequest(method=method, message="Bad Request: can't parse entities")
+        )
+        is None
+    )
+    assert dead_recipient_reason(RuntimeError("timeout")) is None
+    assert dead_recipient_reason(None) is None
@@ -38,6 +38,7 @@ class MockAsyncClient:
         self.response = response
         self.raise_timeout = raise_timeout
         self.raise_request_error = raise_request_error
+        self.params = None
 
     async def __aenter__(self):
         return self
@@ -45,7 +46,8 @@ class MockAsyncClient:
     async def __aexit__(self, exc_type, exc, tb):
         pass
 
-    async def get(self, url):
+    async def get(self, url, params=None):
+        self.params = params
         if self.raise_timeout:
             raise httpx.TimeoutException("timeout")
         if self.raise_request_error:
@@ -64,6 +66,7 @@ async def test_geocode_place_success(monkeypatch):
                 "state": "Kyiv City",
                 "country": "Ukraine",
                 "formatted": "Kyiv, Ukraine",
+                "timezone": {"name": "Europe/Kyiv", "offset_STD": "+02:00"},
             }
         ]
     }
@@ -77,6 +80,7 @@ async def test_geocode_place_success(monkeypatch):
     assert result["lon"] == 30.523
     assert result["city"] == "Kyiv"
     assert result["country"] == "Ukraine"
+    assert result["timezone"] == "Europe/Kyiv"
 
 
 @pytest.mark.asyncio
@@ -142,9 +146,54 @@ async def test_geocode_place_network_error(monkeypatch):
 @pytest.mark.asyncio
 async def test_geocode_place_unexpected_error(monkeypatch):
     class BrokenClient(MockAsyncClient):
-        async def get(self, url):
+        async def get(self, url, params=None):
             raise Exception("unexpected")
 
     monkeypatch.setattr(httpx, "AsyncClient", lambda timeout: BrokenClient())
     with pytest.raises(ValueError, match="Технічна помилка геокодування"):
         await geocode_place("Kyiv")
+
+
+@pytest.mark.asyncio
+async def test_search_places_ranks_and_caches(monkeypatch):
+    from services import geocode
+
+    geocode._place_cache.clear()
+    mock_result = {
+        "results": [
+            {"lat": 50.1, "lon": 30.1, "city": "Kyivets", "rank": {"importance": 0.2}},
+            {"lat": 50.45, "lon": 30.52, "city": "Kyiv", "rank": {"importance": 0.9}},
+            {"lat": 50.451, "lon": 30.521, "city": "Kyiv", "rank": {"importance": 0.5}},
+            {"lat": None, "lon": None, "city": "Nowhere"},
+        ]
+    }
+    requests = []
+
+    def client(timeout):
+        requests.append(MockAsyncClient(response=MockResponse(json_data=mock_result)))
+        return requests[-1]
+
+    monkeypatch.setattr(httpx, "AsyncClient", client)
+    places = await geocode.search_places("  KYIV ")
+    assert [place["city"] for place in places] == ["Kyiv", "Kyivets"]
+    assert await geocode.search_places("kyiv") is places
+    assert await geocode.search_places("k") == []
+    assert len(requests) == 1
+    assert requests[0].params["text"] == "kyiv"
+    assert requests[0].params["type"] == "city"
+    geocode._place_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_search_places_passes_text_as_param(monkeypatch):
+    from services import geocode
+
+    geocode._place_cache.clear()
+    mock_client = MockAsyncClient(response=MockResponse(json_data={"results": []}))
+    monkeypatch.setattr(httpx, "AsyncClient", lambda timeout: mock_client)
+
+    await geocode.search_places("Kyiv&limit=50#x")
+
+    assert mock_client.params["text"] == "kyiv&limit=50#x"
+    assert mock_client.params["limit"] == geocode.PLACE_SEARCH_LIMIT
+    geocode._place_cache.clear()
@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timezone
+
+from services.hourly import SeriesView, first_hour_index, hourly_view, render_hourly_view
+
+NOW = datetime(2026, 1, 15, 22, 30, tzinfo=timezone.utc)
+
+
+def iso_forecast(hours=48, utc_offset=7200):
+    """Почасовий прогноз з 14.01 00:00 місцевого часу (UTC+2) у форматі iso8601"""
+    times = [f"2026-01-{14 + hour // 24:02d}T{hour % 24:02d}:00" for hour in range(hours)]
+    return {
+        "utc_offset_seconds": utc_offset,
+        "hourly_units": {"temperature_2m": "°C", "precipitation": "mm"},
+        "hourly": {
+            "time": times,
+            "temperature_2m": [float(hour) for hour in range(hours)],
+            "precipitation": [0.0] * hours,
+            "weather_code": [3] * hours,
+        },
+    }
+
+
+def test_series_view_slices_without_copy():
+    """Тест що вікно і вкладені зрізи читають той самий список"""
+    base = list(range(10))
+    view = SeriesView(base, 2, 8)
+
+    assert list(view) == [2, 3, 4, 5, 6, 7]
+    assert view[-1] == 7
+    nested = view[1:3]
+    assert isinstance(nested, SeriesView)
+    base[3] = 99
+    assert list(nested) == [99, 4]
+    assert len(SeriesView(base, 8, 20)) == 2
+    with pytest.raises(IndexError):
+        view[6]
+
+
+def test_first_hour_index_for_both_time_formats():
+    """Тест пошуку поточної години для iso8601 (місцевий час) і unixtime"""
+    # 22:30 UTC = 00:30 16.01 за UTC+2 — індекс 48 серед годин з 14.01
+    assert first_hour_index(iso_forecast(hours=72), NOW) == 48
+
+    start = int(datetime(2026, 1, 15, 20, tzinfo=timezone.utc).timestamp())
+    unix = {"hourly": {"time": [start + hour * 3600 for hour in range(10)]}}
+    assert first_hour_index(unix, NOW) == 2
+
+
+def test_hourly_view_pages_from_current_hour():
+    """Тест сторінок від поточної години з обмеженням останньої сторінки"""
+    data = iso_forecast(hours=72)
+
+    view = hourly_view(data, 6, 6, NOW)
+    assert view.total == 24
+    assert list(view.series["temperature_2m"]) == [54.0, 55.0, 56.0, 57.0, 58.0, 59.0]
+
+    assert hourly_view(data, 100, 12, NOW).offset == 12
+    assert hourly_view(data, 0, 5, NOW).hours == 6
+
+
+def test_render_hourly_view_groups_by_day():
+    """Тест рендеру: заголовок дня, час, значення з одиницями та лічильник"""
+    data = iso_forecast(hours=72)
+    text = render_hourly_view("Київ", hourly_view(data, 0, 6, NOW))
+
+    assert "Почасовий прогноз — Київ" in text
+    assert "П'ятниця, 16.01" in text
+    assert "00:00 ☁️ 🌡️48°C 🌧️0 mm" in text
+    assert "05:00" in text and "06:00" not in text
+    assert text.endswith("Години 1–6 з 24")
@@ -616,3 +616,49 @@ class TestTimeformatSelector:
 
         assert iso_button.callback_data == "set_unit:timeformat:iso8601"
         assert unix_button.callback_data == "set_unit:timeformat:unixtime"
+
+
+class TestKeyboardCache:
+    """Тести кешування клавіатур"""
+
+    def test_static_keyboard_built_once(self):
+        """Статична клавіатура повертається тим самим екземпляром"""
+        assert WeatherKeyboards.main_menu() is WeatherKeyboards.main_menu()
+        assert WeatherKeyboards.weather_type_menu() is WeatherKeyboards.weather_type_menu()
+
+    def test_parameterized_keyboard_cached_by_arguments(self):
+        """Параметризовані клавіатури кешуються окремо для кожного значення"""
+        celsius = WeatherKeyboards.temperature_unit_selector("celsius")
+        assert WeatherKeyboards.temperature_unit_selector("celsius") is celsius
+        assert WeatherKeyboards.temperature_unit_selector("fahrenheit") is not celsius
+
+    def test_dict_arguments_cached_by_content(self):
+        """Словники в аргументах порівнюються за вмістом"""
+        first = WeatherKeyboards.display_settings({"show_wind": False, "show_humidity": True})
+        second = WeatherKeyboards.display_settings({"show_humidity": True, "show_wind": False})
+        other = WeatherKeyboards.display_settings({"show_wind": True})
+
+        assert first is second
+        assert other is not first
+        assert first.inline_keyboard[5][0].text.startswith("❌")
+
+    def test_unhashable_arguments_bypass_cache(self):
+        """Нехешовані значення не ламають побудову клавіатури"""
+        keyboard = WeatherKeyboards.forecast_settings({"forecast_days": [7], "past_days": 0})
+        assert isinstance(keyboard, InlineKeyboardMarkup)
+
+    def test_precipitation_selector(self):
+        """Вибір одиниць опадів позначає поточну"""
+        keyboard = WeatherKeyboards.precipitation_unit_selector("inch")
+        assert keyboard.inline_keyboard[1][0].text.startswith("✅")
+        assert keyboard.inline_keyboard[1][0].callback_data == "set_unit:precipitation_unit:inch"
+
+    def test_hourly_pager_navigation(self):
+        """Гортання почасового прогнозу: кнопки лише в доступні боки"""
+        first = WeatherKeyboards.hourly_pager(0, 6, 24)
+        assert [button.text for button in first.inline_keyboard[0]] == ["+6 год ▶️"]
+        assert first.inline_keyboard[0][0].callback_data == "hourly:6:6"
+        assert first.inline_keyboard[1][0].text == "✅ 6 год"
+
+        last = WeatherKeyboards.hourly_pager(18, 6, 24)
+        assert [button.text for button in last.inline_keyboard[0]] == ["◀️ -6 год"]
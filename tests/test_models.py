@@ -10,6 +10,7 @@ from db.models import (
     UserWeatherSettings,
     UserMessage,
     BotChat,
+    WeatherAlertRule,
     HOURLY_PARAMETERS,
     DAILY_PARAMETERS,
     CURRENT_PARAMETERS,
@@ -17,6 +18,11 @@ from db.models import (
     WIND_SPEED_UNITS,
     PRECIPITATION_UNITS,
     TIMEFORMAT_OPTIONS,
+    DEFAULT_DISPLAY_FLAGS,
+    DISPLAY_FLAG_BITS,
+    build_api_signature,
+    unpack_display_flags,
+    parse_api_signature,
 )
 
 
@@ -224,6 +230,59 @@ class TestUserWeatherSettingsModel:
             value = getattr(settings, field)
             assert isinstance(value, bool), f"{field} має бути boolean"
 
+    def test_settings_display_flags_generated(self, db_session):
+        """Тест що show_* читають і пишуть біти display_flags"""
+        user = User(telegram_id=123456789)
+        db_session.add(user)
+        db_session.commit()
+
+        settings = UserWeatherSettings(user_id=123456789)
+        db_session.add(settings)
+        db_session.commit()
+
+        assert settings.display_flags == DEFAULT_DISPLAY_FLAGS
+
+        settings.show_pressure = True
+        db_session.commit()
+
+        assert settings.display_flags == (
+            DEFAULT_DISPLAY_FLAGS | DISPLAY_FLAG_BITS["show_pressure"]
+        )
+
+    def test_settings_display_flag_query(self, db_session):
+        """Тест бітового предиката для масових вибірок"""
+        for telegram_id, show_uv in [(1, True), (2, False), (3, True)]:
+            db_session.add(User(telegram_id=telegram_id))
+            db_session.add(
+                UserWeatherSettings(user_id=telegram_id, show_uv_index=show_uv)
+            )
+        db_session.commit()
+
+        user_ids = [
+            settings.user_id
+            for settings in db_session.query(UserWeatherSettings)
+            .filter(UserWeatherSettings.show_uv_index)
+            .order_by(UserWeatherSettings.user_id)
+        ]
+        assert user_ids == [1, 3]
+
+    def test_settings_api_signature_generated(self, db_session):
+        """Тест що згенерований підпис збігається з build_api_signature"""
+        user = User(telegram_id=123456789)
+        db_session.add(user)
+        db_session.commit()
+
+        settings = UserWeatherSettings(
+            user_id=123456789, show_uv_index=False, show_current_weather=False
+        )
+        db_session.add(settings)
+        db_session.commit()
+
+        assert settings.api_signature == build_api_signature(settings.display_flags)
+        params = parse_api_signature(settings.api_signature)
+        assert "uv_index" not in params["hourly"].split(",")
+        assert "current" not in params
+
     def test_settings_notification_time_format(self, db_session):
         """Тест формату часу сповіщень"""
         user = User(telegram_id=123456789)
@@ -236,6 +295,27 @@ class TestUserWeatherSettingsModel:
 
         assert settings.notification_time == "08:30"
         assert len(settings.notification_time) == 5
+        assert settings.notification_minute == 8 * 60 + 30
+
+    def test_settings_notification_time_cleared(self, db_session):
+        """Тест що порожній час зберігається як NULL"""
+        settings = UserWeatherSettings(user_id=123456789, notification_time="23:59")
+        assert settings.notification_minute == 23 * 60 + 59
+
+        settings.notification_time = None
+        assert settings.notification_minute is None
+        assert settings.notification_time is None
+
+    def test_next_fire_at_partial_index(self):
+        """Тест часткового індексу по увімкнених сповіщеннях"""
+        index = next(
+            index
+            for index in UserWeatherSettings.__table__.indexes
+            if index.name == "ix_user_weather_settings_next_fire_at"
+        )
+
+        assert [column.name for column in index.columns] == ["next_fire_at"]
+        assert index.dialect_options["postgresql"]["where"] is not None
 
 
 class TestUserMessageModel:
@@ -334,6 +414,40 @@ class TestBotChatModel:
             assert chat.chat_type == chat_type
 
 
+class TestWeatherAlertRuleModel:
+    """Тести для моделі WeatherAlertRule"""
+
+    def test_alert_rule_unique_per_user(self, db_session):
+        """Тест що однакове правило користувача зберігається один раз"""
+        db_session.add(User(telegram_id=123456789))
+        db_session.commit()
+
+        db_session.add(
+            WeatherAlertRule(user_id=123456789, metric="rain", operator=">", threshold=5)
+        )
+        db_session.commit()
+        db_session.add(
+            WeatherAlertRule(user_id=123456789, metric="rain", operator=">", threshold=5)
+        )
+        with pytest.raises(IntegrityError):
+            db_session.commit()
+
+    def test_alert_rule_cascade_delete(self, db_session):
+        """Тест видалення правил разом з користувачем"""
+        user = User(telegram_id=123456789)
+        db_session.add(user)
+        db_session.commit()
+        db_session.add(
+            WeatherAlertRule(user_id=123456789, metric="temp", operator="<", threshold=0)
+        )
+        db_session.commit()
+
+        db_session.delete(user)
+        db_session.commit()
+
+        assert db_session.query(WeatherAlertRule).count() == 0
+
+
 class TestConstants:
     """Тести для констант"""
 
@@ -416,6 +530,23 @@ class TestConstants:
         assert len(DAILY_PARAMETERS) == len(set(DAILY_PARAMETERS))
         assert len(CURRENT_PARAMETERS) == len(set(CURRENT_PARAMETERS))
 
+    def test_unpack_display_flags(self):
+        """Тест розпакування маски у словник прапорців"""
+        flags = unpack_display_flags(DEFAULT_DISPLAY_FLAGS)
+
+        assert flags["show_temperature"] is True
+        assert flags["show_pressure"] is False
+        assert len(flags) == len(DISPLAY_FLAG_BITS)
+
+    def test_api_signature_is_canonical(self):
+        """Тест що підпис детермінований і впорядкований як HOURLY_PARAMETERS"""
+        signature = build_api_signature(DEFAULT_DISPLAY_FLAGS)
+        hourly = parse_api_signature(signature)["hourly"].split(",")
+
+        assert signature == build_api_signature(DEFAULT_DISPLAY_FLAGS)
+        assert hourly == sorted(hourly, key=HOURLY_PARAMETERS.index)
+        assert len(hourly) == len(set(hourly))
+
     def test_parameters_are_strings(self):
         """Тест що всі параметри є рядками"""
         for param in HOURLY_PARAMETERS:
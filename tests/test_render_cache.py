@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Chat, Message
+
+from bot.keyboards import WeatherKeyboards
+from bot.render_cache import RenderCache, SkipUnchangedEdits
+
+
+def sent(message_id=10):
+    return Message(
+        message_id=message_id, date=datetime.now(), chat=Chat(id=1, type="private"), text="Меню"
+    )
+
+
+def edit(text, markup=None, message_id=10):
+    return EditMessageText(chat_id=1, message_id=message_id, text=text, reply_markup=markup)
+
+
+@pytest.mark.asyncio
+async def test_identical_edit_is_skipped():
+    """Тест що повторна однакова правка не доходить до Telegram"""
+    middleware = SkipUnchangedEdits()
+    make_request = AsyncMock(return_value=sent())
+    menu = WeatherKeyboards.main_menu()
+
+    await middleware(make_request, MagicMock(), edit("Меню", menu))
+    # Замість запиту повертається останній Message від Telegram
+    assert await middleware(make_request, MagicMock(), edit("Меню", menu)) is make_request.return_value
+    await middleware(make_request, MagicMock(), edit("Меню", WeatherKeyboards.settings_menu()))
+    await middleware(make_request, MagicMock(), edit("Інше", WeatherKeyboards.settings_menu()))
+
+    assert make_request.await_count == 3
+    assert middleware.skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_sent_message_state_is_remembered():
+    """Тест що правка щойно надісланого повідомлення тим самим вмістом пропускається"""
+    middleware = SkipUnchangedEdits()
+    make_request = AsyncMock(return_value=sent())
+    menu = WeatherKeyboards.main_menu()
+
+    await middleware(make_request, MagicMock(), SendMessage(chat_id=1, text="Меню", reply_markup=menu))
+    await middleware(
+        make_request,
+        MagicMock(),
+        EditMessageReplyMarkup(chat_id=1, message_id=10, reply_markup=menu),
+    )
+    await middleware(make_request, MagicMock(), edit("Меню", menu))
+
+    assert make_request.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_not_modified_error_is_remembered_and_raised():
+    """Тест що 'not modified' не ховається, а без відомого Message правка не пропускається"""
+    middleware = SkipUnchangedEdits()
+    make_request = AsyncMock(
+        side_effect=TelegramBadRequest(
+            method=MagicMock(), message="Bad Request: message is not modified"
+        )
+    )
+
+    for _ in range(2):
+        with pytest.raises(TelegramBadRequest):
+            await middleware(make_request, MagicMock(), edit("Меню"))
+
+    assert make_request.await_count == 2
+    assert middleware.skipped == 0
+
+
+@pytest.mark.asyncio
+async def test_inline_message_edits_pass_through():
+    """Тест що inline-повідомлення без chat_id не кешуються"""
+    middleware = SkipUnchangedEdits()
+    make_request = AsyncMock(return_value=True)
+    method = EditMessageText(inline_message_id="abc", text="Меню")
+
+    await middleware(make_request, MagicMock(), method)
+    await middleware(make_request, MagicMock(), method)
+
+    assert make_request.await_count == 2
+
+
+def test_render_cache_bounded_and_expires():
+    """Тест обмеження розміру і TTL кешу"""
+    cache = RenderCache(maxsize=2, ttl=60)
+    cache.put((1, 1), "a", "m")
+    cache.put((1, 2), "b", "m")
+    cache.get((1, 1))
+    cache.put((1, 3), "c", "m")
+
+    assert cache.get((1, 2)) is None
+    assert cache.get((1, 1)) == ("a", "m", None)
+
+    expired = RenderCache(ttl=0)
+    expired.put((1, 1), "a", "m")
+    assert expired.get((1, 1)) is None
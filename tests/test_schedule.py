@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from services.schedule import (
+    next_fire_at_for,
+    parse_schedule_payload,
+    resolve_timezone,
+    schedule_payload,
+)
+
+
+def test_resolve_timezone_explicit():
+    """Тест що явний пояс має пріоритет над визначеним"""
+    tz = resolve_timezone("Europe/Kyiv", "America/New_York", -74.0)
+    assert tz == ZoneInfo("Europe/Kyiv")
+
+
+def test_resolve_timezone_auto_uses_resolved():
+    """Тест що auto бере пояс, визначений при геокодуванні"""
+    assert resolve_timezone("auto", "America/New_York", -74.0) == ZoneInfo(
+        "America/New_York"
+    )
+
+
+def test_resolve_timezone_longitude_fallback():
+    """Тест наближення поясу за довготою"""
+    tz = resolve_timezone("auto", None, 30.5)
+    assert tz.utcoffset(None) == timedelta(hours=2)
+
+
+def test_resolve_timezone_unknown_name():
+    """Тест що невідомий пояс не ламає розрахунок"""
+    assert resolve_timezone("Mars/Olympus", None, None) == timezone.utc
+
+
+def test_next_fire_at_later_today():
+    """Тест сповіщення пізніше сьогодні в локальному часі"""
+    now = datetime(2026, 1, 15, 5, 0, tzinfo=timezone.utc)  # 07:00 у Києві
+    fire_at = next_fire_at_for(True, 8 * 60, "Europe/Kyiv", now=now)
+    assert fire_at == datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+
+
+def test_next_fire_at_tomorrow():
+    """Тест що минулий сьогодні час переноситься на завтра"""
+    now = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+    fire_at = next_fire_at_for(True, 8 * 60, "Europe/Kyiv", now=now)
+    assert fire_at == datetime(2026, 1, 16, 6, 0, tzinfo=timezone.utc)
+
+
+def test_next_fire_at_across_dst():
+    """Тест що локальний час зберігається після переходу на літній час"""
+    now = datetime(2026, 3, 28, 7, 0, tzinfo=timezone.utc)
+    fire_at = next_fire_at_for(True, 8 * 60, "Europe/Kyiv", now=now)
+    assert fire_at == datetime(2026, 3, 29, 5, 0, tzinfo=timezone.utc)
+
+
+def test_next_fire_at_disabled():
+    """Тест що вимкнені сповіщення не плануються"""
+    assert next_fire_at_for(False, 8 * 60, "UTC") is None
+    assert next_fire_at_for(True, None, "UTC") is None
+
+
+def test_schedule_payload_roundtrip():
+    """Тест кодування зміни розкладу для NOTIFY"""
+    moment = datetime(2026, 1, 15, 6, 0, tzinfo=timezone.utc)
+    assert parse_schedule_payload(schedule_payload(42, moment)) == (42, moment)
+    assert parse_schedule_payload(schedule_payload(42, None)) == (42, None)
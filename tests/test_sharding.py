@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from bot.sharding import NUM_SHARDS, ShardLeases, shard_of
+
+
+def leases_with(members, free_shards=range(NUM_SHARDS), owned=()):
+    """ShardLeases з підміненими запитами до pg_locks і advisory locks"""
+    leases = ShardLeases(engine=MagicMock())
+    leases.owned = set(owned)
+    leases._conn = MagicMock()
+    calls = []
+
+    async def fake_scalar(sql, **params):
+        calls.append((sql, params.get("key")))
+        if "count(DISTINCT pid)" in sql:
+            return members
+        if "pg_try_advisory_lock" in sql:
+            return params["key"] in free_shards
+        return True
+
+    leases._scalar = fake_scalar
+    return leases, calls
+
+
+def test_shard_of():
+    """Тест розподілу користувачів за шардами"""
+    assert shard_of(17, 16) == 1
+    assert 0 <= shard_of(123456789) < NUM_SHARDS
+
+
+@pytest.mark.asyncio
+async def test_rebalance_single_process_takes_all():
+    """Тест що єдиний процес забирає всі шарди"""
+    leases, _ = leases_with(members=1)
+
+    assert await leases.rebalance() is True
+    assert leases.owned == set(range(NUM_SHARDS))
+
+
+@pytest.mark.asyncio
+async def test_rebalance_gives_up_excess_to_new_member():
+    """Тест що з появою другого процесу надлишок звільняється"""
+    leases, calls = leases_with(members=2, owned=range(NUM_SHARDS))
+
+    await leases.rebalance()
+
+    assert len(leases.owned) == NUM_SHARDS // 2
+    unlocked = [key for sql, key in calls if "pg_advisory_unlock" in sql]
+    assert len(unlocked) == NUM_SHARDS // 2
+    assert not leases.owned & set(unlocked)
+
+
+@pytest.mark.asyncio
+async def test_rebalance_takes_only_free_shards():
+    """Тест що зайняті іншим процесом шарди не захоплюються"""
+    leases, _ = leases_with(members=2, free_shards={0, 1, 2})
+
+    await leases.rebalance()
+
+    assert leases.owned == {0, 1, 2}
+
+
+@pytest.mark.asyncio
+async def test_rebalance_no_change():
+    """Тест що стабільний розподіл не повідомляє про зміни"""
+    leases, _ = leases_with(members=2, free_shards=set(), owned=range(8))
+
+    assert await leases.rebalance() is False
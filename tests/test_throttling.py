@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiogram.types import CallbackQuery, Message
+from limits import RateLimitItemPerSecond
+
+from bot.throttling import IN_FLIGHT_TEXT, THROTTLED_TEXT, ThrottlingMiddleware
+
+
+def callback(data="weather:current", message_id=10):
+    event = MagicMock(spec=CallbackQuery)
+    event.data = data
+    event.message = MagicMock(message_id=message_id, chat=MagicMock(id=1))
+    event.answer = AsyncMock()
+    return event
+
+
+def context(user_id=1, chat_id=1):
+    return {"event_from_user": MagicMock(id=user_id), "event_chat": MagicMock(id=chat_id)}
+
+
+@pytest.mark.asyncio
+async def test_user_limit_drops_extra_callbacks():
+    """Тест що понад ліміт користувача обробник не викликається"""
+    middleware = ThrottlingMiddleware(user_limit=RateLimitItemPerSecond(2, 60))
+    handler = AsyncMock(return_value="ok")
+    events = [callback(f"weather:{index}") for index in range(3)]
+
+    results = [await middleware(handler, event, context()) for event in events]
+
+    assert results == ["ok", "ok", None]
+    assert handler.await_count == 2
+    events[2].answer.assert_awaited_once_with(THROTTLED_TEXT)
+    # Інший користувач має власний ліміт
+    assert await middleware(handler, callback(), context(user_id=2, chat_id=2)) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_chat_limit_shared_in_group():
+    """Тест спільного ліміту чату для різних користувачів групи"""
+    middleware = ThrottlingMiddleware(chat_limit=RateLimitItemPerSecond(2, 60))
+    handler = AsyncMock()
+    message = MagicMock(spec=Message)
+
+    for user_id in (1, 2, 3):
+        await middleware(handler, message, context(user_id=user_id, chat_id=-100))
+
+    assert handler.await_count == 2
+    assert middleware.throttled == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_callback_waits_for_in_flight():
+    """Тест що повторне натискання не запускає обробку вдруге і чекає на першу"""
+    middleware = ThrottlingMiddleware()
+    release = asyncio.Event()
+
+    async def slow_handler(event, data):
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(middleware(slow_handler, callback(), context()))
+    await asyncio.sleep(0)
+    extra = callback()
+    waiting = asyncio.create_task(middleware(slow_handler, extra, context()))
+    await asyncio.sleep(0)
+    extra.answer.assert_not_awaited()
+
+    release.set()
+    assert await first == "done"
+    assert await waiting is None
+    # Годинник знімається без тексту: результат уже в повідомленні
+    extra.answer.assert_awaited_once_with()
+    assert middleware.coalesced == 1
+    # Після завершення кнопка знову обробляється
+    assert await middleware(slow_handler, callback(), context()) == "done"
+
+
+@pytest.mark.asyncio
+async def test_same_button_under_other_message_not_coalesced():
+    """Тест що та сама кнопка під іншим повідомленням обробляється окремо"""
+    middleware = ThrottlingMiddleware()
+    release = asyncio.Event()
+
+    async def slow_handler(event, data):
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(middleware(slow_handler, callback(), context()))
+    second = asyncio.create_task(
+        middleware(slow_handler, callback(message_id=11), context())
+    )
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(first, second) == ["done", "done"]
+    assert middleware.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_in_flight_wait_times_out():
+    """Тест що довга обробка не тримає повторне натискання без відповіді"""
+    middleware = ThrottlingMiddleware()
+    release = asyncio.Event()
+
+    async def slow_handler(event, data):
+        await release.wait()
+
+    first = asyncio.create_task(middleware(slow_handler, callback(), context()))
+    await asyncio.sleep(0)
+    extra = callback()
+    with patch("bot.throttling.IN_FLIGHT_WAIT", 0.01):
+        await middleware(slow_handler, extra, context())
+
+    extra.answer.assert_awaited_once_with(IN_FLIGHT_TEXT)
+    release.set()
+    await first
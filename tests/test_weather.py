@@ -290,3 +290,74 @@ async def test_get_weather_invalid_latitude_type():
 async def test_get_weather_invalid_params_type():
     with pytest.raises(WeatherAPIError):
         await WeatherService.get_weather(50.45, 30.52, "not_a_dict")
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_joins_coordinates():
+    mock_response = AsyncMock()
+    mock_response.json = lambda: [{"latitude": 50.45}, {"latitude": 49.84}]
+    mock_response.raise_for_status.return_value = None
+
+    with patch("httpx.AsyncClient.get", return_value=mock_response) as mock_get:
+        result = await WeatherService.get_weather_batch(
+            [(50.45, 30.52), (49.84, 24.03)], {"hourly": "temperature_2m"}
+        )
+
+    params = mock_get.call_args.kwargs["params"]
+    assert params["latitude"] == "50.45,49.84"
+    assert params["longitude"] == "30.52,24.03"
+    assert [item["latitude"] for item in result] == [50.45, 49.84]
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_length_mismatch():
+    mock_response = AsyncMock()
+    mock_response.json = lambda: [{"latitude": 50.45}]
+    mock_response.raise_for_status.return_value = None
+
+    with patch("httpx.AsyncClient.get", return_value=mock_response):
+        with pytest.raises(WeatherAPIError):
+            await WeatherService.get_weather_batch(
+                [(50.45, 30.52), (49.84, 24.03)], {}
+            )
+
+
+@pytest.mark.asyncio
+async def test_get_cached_weather_reuses_forecast():
+    """Повторний запит з тими ж параметрами береться з кешу, інші — з API"""
+    from services import weather
+
+    weather.forecast_cache.clear()
+    params = {"hourly": "temperature_2m", "timezone": "auto"}
+    with patch("services.weather.get_weather", AsyncMock(return_value={"hourly": {}})) as mock_get:
+        first = await weather.get_cached_weather(50.45, 30.52, params)
+        assert await weather.get_cached_weather(50.45, 30.52, dict(params)) is first
+        await weather.get_cached_weather(50.45, 30.52, {**params, "timezone": "GMT"})
+
+    assert mock_get.await_count == 2
+    weather.forecast_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_cached_weather_batch_fetches_only_missing():
+    """Пакетний запит лише для локацій без прогнозу в кеші, порядок зберігається"""
+    from services import weather
+
+    weather.forecast_cache.clear()
+    params = {"current": "temperature_2m"}
+    weather.forecast_cache.put(weather.forecast_key(50.0, 30.0, params), {"id": "cached"})
+    with patch(
+        "services.weather.get_weather_batch",
+        AsyncMock(return_value=[{"id": "a"}, {"id": "b"}]),
+    ) as mock_batch:
+        forecasts = await weather.get_cached_weather_batch(
+            [(49.0, 24.0), (50.0, 30.0), (46.5, 30.7)], params
+        )
+        again = await weather.get_cached_weather_batch([(46.5, 30.7)], params)
+
+    assert [item["id"] for item in forecasts] == ["a", "cached", "b"]
+    assert again[0] is forecasts[2]
+    # Кожен збережений прогноз отримує власну версію
+    assert forecasts[0]["_version"] != forecasts[2]["_version"]
+    mock_batch.assert_awaited_once_with([(49.0, 24.0), (46.5, 30.7)], params)
+    weather.forecast_cache.clear()
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import SECRET_HEADER, UpdatePool, WebhookServer, webhook_secret
+
+
+def make_server(pool=None):
+    dp = MagicMock()
+    dp.feed_update = AsyncMock()
+    return WebhookServer(MagicMock(), dp, "secret", pool)
+
+
+def test_webhook_secret_derived_from_token():
+    """Тест що секрет без явного значення стабільний і не містить токена"""
+    derived = webhook_secret("123:ABC")
+    assert derived == webhook_secret("123:ABC")
+    assert "ABC" not in derived
+    assert webhook_secret("123:ABC", "explicit") == "explicit"
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret():
+    """Тест що оновлення без правильного секрету не обробляються"""
+    server = make_server()
+    async with TestClient(TestServer(server.build_app("/webhook"))) as client:
+        response = await client.post(
+            "/webhook", json={"update_id": 1}, headers={SECRET_HEADER: "wrong"}
+        )
+        assert response.status == 401
+        response = await client.post("/webhook", json={"update_id": 1})
+        assert response.status == 401
+
+    server.dp.feed_update.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_webhook_accepts_update_and_processes_in_background():
+    """Тест що оновлення приймається і передається диспетчеру"""
+    server = make_server()
+    async with TestClient(TestServer(server.build_app("/webhook"))) as client:
+        response = await client.post(
+            "/webhook", json={"update_id": 7}, headers={SECRET_HEADER: "secret"}
+        )
+        assert response.status == 200
+        await server.pool.drain()
+
+    update = server.dp.feed_update.call_args.args[1]
+    assert update.update_id == 7
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_updates_while_draining():
+    """Тест що під час зупинки Telegram отримує 503 і повторить доставку"""
+    server = make_server()
+    await server.pool.drain()
+    async with TestClient(TestServer(server.build_app("/webhook"))) as client:
+        response = await client.post(
+            "/webhook", json={"update_id": 1}, headers={SECRET_HEADER: "secret"}
+        )
+        assert response.status == 503
+
+
+@pytest.mark.asyncio
+async def test_update_pool_is_bounded_and_drains():
+    """Тест обмеження одночасних оновлень і дочікування при зупинці"""
+    pool = UpdatePool(limit=1)
+    release = asyncio.Event()
+    finished = []
+
+    async def job(name):
+        await release.wait()
+        finished.append(name)
+
+    await pool.submit(job("first"))
+    second = asyncio.create_task(pool.submit(job("second")))
+    await asyncio.sleep(0.01)
+    # Друге оновлення чекає на вільне місце
+    assert not second.done()
+    assert len(pool) == 1
+
+    release.set()
+    await second
+    await pool.drain(timeout=1)
+
+    assert finished == ["first", "second"]
+    assert pool.closed
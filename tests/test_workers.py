@@ -0,0 +1,139 @@
+import asyncio
+import queue
+import pytest
+from unittest.mock import MagicMock
+
+from aiogram.types import Update
+
+from bot.workers import ChatOrderedPool, HashRing, UpdateIngress, chat_id_of
+
+
+def message_update(update_id, chat_id):
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+                "text": f"msg {update_id}",
+            },
+        }
+    )
+
+
+def test_hash_ring_is_stable_and_moves_few_chats():
+    """Тест що додавання процесу переносить лише частину чатів"""
+    ring = HashRing(range(4))
+    assert all(ring.node_for(chat_id) == ring.node_for(chat_id) for chat_id in range(100))
+    assert {ring.node_for(chat_id) for chat_id in range(1000)} == {0, 1, 2, 3}
+
+    grown = HashRing(range(5))
+    moved = sum(ring.node_for(chat_id) != grown.node_for(chat_id) for chat_id in range(10000))
+    assert moved < 3500
+
+
+def test_chat_id_of_events():
+    """Тест ключа впорядкування для повідомлень і callback без повідомлення"""
+    assert chat_id_of(message_update(1, 42)) == 42
+    callback = Update.model_validate(
+        {
+            "update_id": 2,
+            "callback_query": {
+                "id": "1",
+                "from": {"id": 77, "is_bot": False, "first_name": "Test"},
+                "chat_instance": "x",
+                "data": "menu:main",
+            },
+        }
+    )
+    assert chat_id_of(callback) == 77
+
+
+@pytest.mark.asyncio
+async def test_ingress_routes_by_chat_and_keeps_order():
+    """Тест що оновлення одного чату потрапляють в одну чергу в тому ж порядку"""
+    queues = [queue.Queue() for _ in range(3)]
+    ingress = UpdateIngress(MagicMock(), queues)
+
+    for update_id in range(1, 6):
+        await ingress.feed_update(MagicMock(), message_update(update_id, 42))
+
+    target = queues[ingress.ring.node_for(42)]
+    items = [target.get_nowait() for _ in range(target.qsize())]
+    assert [chat_id for chat_id, _ in items] == [42] * 5
+    restored = [Update.model_validate_json(payload) for _, payload in items]
+    assert [update.update_id for update in restored] == [1, 2, 3, 4, 5]
+    assert restored[0].message.from_user.id == 42
+    assert sum(q.qsize() for q in queues) == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_ordered_pool_serializes_per_chat():
+    """Тест що один чат обробляється по черзі, а різні — паралельно"""
+    pool = ChatOrderedPool(limit=10)
+    events = []
+    gate = asyncio.Event()
+
+    async def job(name, wait=False):
+        events.append(f"start {name}")
+        if wait:
+            await gate.wait()
+        events.append(f"end {name}")
+
+    await pool.submit_for(1, job("a1", wait=True))
+    await pool.submit_for(1, job("a2"))
+    await pool.submit_for(2, job("b1"))
+    await asyncio.sleep(0.01)
+
+    # Чат 2 не чекає на чат 1, а a2 не стартує до завершення a1
+    assert events == ["start a1", "start b1", "end b1"]
+    gate.set()
+    await pool.drain(timeout=1)
+    assert events[3:] == ["end a1", "start a2", "end a2"]
+
+
+@pytest.mark.asyncio
+async def test_flooding_chat_does_not_block_other_chats():
+    """Тест що черга одного чату не займає слоти пулу інших чатів"""
+    pool = ChatOrderedPool(limit=64)
+    gate = asyncio.Event()
+    done = []
+
+    async def job(name, wait=False):
+        if wait:
+            await gate.wait()
+        done.append(name)
+
+    await pool.submit_for(1, job("a0", wait=True))
+    for index in range(1, 100):
+        await asyncio.wait_for(pool.submit_for(1, job(f"a{index}")), timeout=1)
+    await asyncio.wait_for(pool.submit_for(2, job("b")), timeout=1)
+    await asyncio.sleep(0.01)
+
+    assert done == ["b"]
+    # 100 оновлень чату 1 тримають один слот
+    assert len(pool) == 1
+    gate.set()
+    await pool.drain(timeout=1)
+    assert done[1:] == [f"a{index}" for index in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_chat_queue_continues_after_failure():
+    """Тест що помилка оновлення не зупиняє наступні оновлення чату"""
+    pool = ChatOrderedPool(limit=2)
+    done = []
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def job(name):
+        done.append(name)
+
+    await pool.submit_for(1, failing())
+    await pool.submit_for(1, job("next"))
+    await pool.drain(timeout=1)
+
+    assert done == ["next"]